@@ -1,9 +1,42 @@
+import datetime
+
 from environs import Env
 
 env = Env()
 env.read_env()
 
+CACHE_DIRECTORY = env.str("CACHE_DIRECTORY", None)
+# memory, disk (per worker), mmap or database (shared between workers)
+CACHE_BACKEND = env.str("CACHE_BACKEND", "disk" if CACHE_DIRECTORY else "memory")
+CACHE_MAX_ENTRIES = env.int("CACHE_MAX_ENTRIES", 256)
 DATABASE_URI = env.str("DATABASE_URI")
 DEBUG = env.bool("DEBUG", False)
+HTTP_DISABLE_HTTP2 = env.bool("HTTP_DISABLE_HTTP2", False)
+HTTP_KEEPALIVE_DELAY = env.float("HTTP_KEEPALIVE_DELAY", 600)
+HTTP_KEEPALIVE_IDLE_WINDOW = env.float("HTTP_KEEPALIVE_IDLE_WINDOW", 60)
+HTTP_POOL_MAXSIZE = env.int("HTTP_POOL_MAXSIZE", 10)
 INARA_API_KEY = env.str("INARA_API_KEY")
 LOG_LEVEL = env.str("LOG_LEVEL", "WARNING")
+MARKET_SNAPSHOT_PATH = env.str("MARKET_SNAPSHOT_PATH", None)
+# Background refresh of the upstream datasets, before their cache entries expire
+REFRESH_SCHEDULER_ENABLED = env.bool("REFRESH_SCHEDULER_ENABLED", True)
+REFRESH_SCHEDULER_JITTER = env.float("REFRESH_SCHEDULER_JITTER", 0.1)
+REFRESH_INTERVAL_COMMODITIES_NAMES = env.timedelta(
+    "REFRESH_INTERVAL_COMMODITIES_NAMES", datetime.timedelta(minutes=30)
+)
+REFRESH_INTERVAL_COMMODITIES_PRICES = env.timedelta(
+    "REFRESH_INTERVAL_COMMODITIES_PRICES", datetime.timedelta(hours=12)
+)
+REFRESH_INTERVAL_COMMUNITY_GOALS = env.timedelta(
+    "REFRESH_INTERVAL_COMMUNITY_GOALS", datetime.timedelta(minutes=5)
+)
+REFRESH_INTERVAL_GALNET = env.timedelta(
+    "REFRESH_INTERVAL_GALNET", datetime.timedelta(minutes=5)
+)
+REFRESH_INTERVAL_GAME_SERVER_HEALTH = env.timedelta(
+    "REFRESH_INTERVAL_GAME_SERVER_HEALTH", datetime.timedelta(seconds=30)
+)
+REFRESH_INTERVAL_NEWS = env.timedelta(
+    "REFRESH_INTERVAL_NEWS", datetime.timedelta(minutes=5)
+)
+SYSTEMS_INDEX_PATH = env.str("SYSTEMS_INDEX_PATH", None)
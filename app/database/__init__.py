@@ -1 +1,4 @@
+from app.database.cache import CachedValue, CacheLease
 from app.database.community_goal_status import CommunityGoalStatus
+from app.database.galnet_article import StoredGalnetArticle
+from app.database.news_article import StoredNewsArticle
@@ -0,0 +1,22 @@
+from sqlalchemy import LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.database import Base
+
+
+class CachedValue(Base):
+    __tablename__ = "cached_value"
+
+    value: Mapped[bytes] = mapped_column(LargeBinary)
+    stored_at: Mapped[float]
+    ttl: Mapped[float]
+    stale_ttl: Mapped[float]
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+
+
+class CacheLease(Base):
+    __tablename__ = "cache_lease"
+
+    owner: Mapped[str]
+    expires_at: Mapped[float]
+    key: Mapped[str] = mapped_column(String, primary_key=True)
@@ -0,0 +1,47 @@
+from sqlalchemy import DDL, event, inspect
+
+from app.database.database import Base
+
+
+def get_full_text_search_table_name(table_name: str) -> str:
+    """Get the name of the full-text index of a table."""
+    return f"{table_name}_fts"
+
+
+def enable_full_text_search(model: type[Base], columns: list[str]) -> None:
+    """Create a full-text index of the columns when the table is created (SQLite only).
+
+    The index is an FTS5 table using the model table as external content, kept up to
+    date with triggers. Its rowids are the values of the table primary key, which must
+    be a single INTEGER column (an alias of the table rowid, so that it never changes).
+    """
+    table_name = model.__tablename__
+    (primary_key,) = inspect(model).primary_key
+    content_rowid = primary_key.name
+    fts_table = get_full_text_search_table_name(table_name)
+    columns_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+
+    # Names come from the table definitions, not from user input
+    statements = [
+        f"CREATE VIRTUAL TABLE {fts_table} USING fts5({columns_list}, "
+        f"content='{table_name}', content_rowid='{content_rowid}', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER {fts_table}_insert AFTER INSERT ON {table_name} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}(rowid, {columns_list}) VALUES (new.{content_rowid}, {new_values}); "
+        "END",
+        f"CREATE TRIGGER {fts_table}_delete AFTER DELETE ON {table_name} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {columns_list}) "
+        f"VALUES ('delete', old.{content_rowid}, {old_values}); "
+        "END",
+        f"CREATE TRIGGER {fts_table}_update AFTER UPDATE ON {table_name} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}({fts_table}, rowid, {columns_list}) "
+        f"VALUES ('delete', old.{content_rowid}, {old_values}); "
+        f"INSERT INTO {fts_table}(rowid, {columns_list}) VALUES (new.{content_rowid}, {new_values}); "
+        "END",
+    ]
+    for statement in statements:
+        event.listen(
+            model.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite")
+        )
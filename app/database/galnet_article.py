@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import Index, String, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.database import Base
+from app.database.full_text_search import enable_full_text_search
+
+
+class StoredGalnetArticle(Base):
+    __tablename__ = "galnet_article"
+    __table_args__ = (
+        Index("ix_galnet_article_language_published_at", "language", "published_at"),
+        UniqueConstraint("id", "language", name="uq_galnet_article_id_language"),
+    )
+
+    # Alias of the rowid, stable (unlike the rowid of tables without one) so that it
+    # can identify the articles in the full-text index
+    search_id: Mapped[int] = mapped_column(primary_key=True, init=False)
+
+    title: Mapped[str] = mapped_column(Text)
+    content: Mapped[str] = mapped_column(Text)
+    # Content without its HTML markup, for search
+    plain_content: Mapped[str] = mapped_column(Text)
+    slug: Mapped[str] = mapped_column(Text)
+    picture_name: Mapped[str | None] = mapped_column(Text)
+    published_at: Mapped[datetime]
+    id: Mapped[str] = mapped_column(String)
+    language: Mapped[str] = mapped_column(String)
+
+
+enable_full_text_search(StoredGalnetArticle, ["title", "plain_content"])
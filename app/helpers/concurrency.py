@@ -0,0 +1,56 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Coroutine, Iterable
+from typing import Any, overload
+
+
+@overload
+async def gather_or_cancel[T1, T2](
+    first: Coroutine[Any, Any, T1], second: Coroutine[Any, Any, T2], /
+) -> tuple[T1, T2]: ...
+
+
+@overload
+async def gather_or_cancel[T1, T2, T3](
+    first: Coroutine[Any, Any, T1],
+    second: Coroutine[Any, Any, T2],
+    third: Coroutine[Any, Any, T3],
+    /,
+) -> tuple[T1, T2, T3]: ...
+
+
+@overload
+async def gather_or_cancel[T](
+    *coroutines: Coroutine[Any, Any, T],
+) -> tuple[T, ...]: ...
+
+
+async def gather_or_cancel(*coroutines: Coroutine[Any, Any, Any]) -> tuple[Any, ...]:
+    """Run the coroutines concurrently and return their results in order.
+
+    On the first error, the other coroutines are cancelled and the error is raised
+    as-is (not wrapped in an ExceptionGroup) so that callers can catch it as usual.
+    """
+    try:
+        async with asyncio.TaskGroup() as task_group:
+            tasks = [task_group.create_task(coroutine) for coroutine in coroutines]
+    except ExceptionGroup as e:
+        raise e.exceptions[0] from None
+
+    return tuple(task.result() for task in tasks)
+
+
+async def map_bounded[T, R](
+    function: Callable[[T], Awaitable[R]], items: Iterable[T], limit: int
+) -> list[R]:
+    """Call the async function on each item with at most limit calls running at once.
+
+    Results are returned in the order of the items, and the first error cancels the
+    remaining calls like gather_or_cancel().
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item: T) -> R:
+        async with semaphore:
+            return await function(item)
+
+    return list(await gather_or_cancel(*(run(item) for item in items)))
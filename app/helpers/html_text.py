@@ -0,0 +1,56 @@
+from html.parser import HTMLParser
+
+# Elements whose content is not text shown to readers
+IGNORED_TAGS = {"script", "style", "template"}
+# Elements inside words, not separating them
+INLINE_TAGS = {
+    "a",
+    "abbr",
+    "b",
+    "code",
+    "em",
+    "i",
+    "mark",
+    "s",
+    "small",
+    "span",
+    "strong",
+    "sub",
+    "sup",
+    "u",
+}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._ignored_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in IGNORED_TAGS:
+            self._ignored_depth += 1
+        # Other tags separate words (paragraphs, line breaks...)
+        if tag not in INLINE_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in IGNORED_TAGS and self._ignored_depth:
+            self._ignored_depth -= 1
+        if tag not in INLINE_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data: str) -> None:
+        if not self._ignored_depth:
+            self.parts.append(data)
+
+
+def get_text_from_html(value: str) -> str:
+    """Get the text of an HTML fragment, without its tags and with entities decoded.
+
+    Whitespace is collapsed, and tags other than inline ones are replaced by a space.
+    """
+    extractor = _TextExtractor()
+    extractor.feed(value)
+    extractor.close()
+    return " ".join("".join(extractor.parts).split())
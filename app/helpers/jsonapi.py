@@ -0,0 +1,56 @@
+import datetime
+from typing import Any
+
+from app.services.helpers.timestamps import parse_timestamp
+
+type JsonApiResource = dict[str, Any]
+
+
+class JsonApiDocument:
+    """JSON:API document with its resources indexed by type and id.
+
+    Resources of data and included are indexed once, so that resolving a relationship
+    is a dictionary lookup instead of a scan of the document.
+    """
+
+    def __init__(self, document: dict[str, Any]) -> None:
+        self.data: list[JsonApiResource] = document.get("data") or []
+        self.included: list[JsonApiResource] = document.get("included") or []
+        self._resources: dict[tuple[str, str], JsonApiResource] = {
+            (resource["type"], resource["id"]): resource
+            for resource in (*self.included, *self.data)
+        }
+
+    def get_resource(
+        self, resource_type: str, resource_id: str
+    ) -> JsonApiResource | None:
+        """Get the resource with the given type and id, from data or included."""
+        return self._resources.get((resource_type, resource_id))
+
+    def get_related(
+        self, resource: JsonApiResource, relationship: str
+    ) -> JsonApiResource | None:
+        """Get the resource related to another one (for to-one relationships)."""
+        identifier = resource.get("relationships", {}).get(relationship, {}).get("data")
+        if not isinstance(identifier, dict):
+            return None
+        return self.get_resource(identifier["type"], identifier["id"])
+
+    def resolve(
+        self, resource: JsonApiResource, *relationships: str
+    ) -> JsonApiResource | None:
+        """Follow a path of to-one relationships from a resource."""
+        related: JsonApiResource | None = resource
+        for relationship in relationships:
+            if related is None:
+                return None
+            related = self.get_related(related, relationship)
+        return related
+
+
+def get_published_at(resource: JsonApiResource) -> datetime.datetime:
+    """Get the publication date of a CMS resource (as a naive UTC datetime)."""
+    published_at = parse_timestamp(resource["attributes"]["published_at"])
+    if published_at.tzinfo is not None:
+        published_at = published_at.astimezone(datetime.UTC).replace(tzinfo=None)
+    return published_at
@@ -1,18 +1,51 @@
+from urllib.parse import urlsplit
+
 import niquests
 
 from app import __version__
+from app.config import (
+    HTTP_DISABLE_HTTP2,
+    HTTP_KEEPALIVE_DELAY,
+    HTTP_KEEPALIVE_IDLE_WINDOW,
+    HTTP_POOL_MAXSIZE,
+)
 
 CLIENT_PARAMETERS = {
     "headers": {"User-Agent": f"ED-API/{__version__} (github.com/corenting/ED-API)"},
     "timeout": 3,
 }
 
+SHARED_CLIENT_PARAMETERS = {
+    **CLIENT_PARAMETERS,
+    "pool_connections": 1,  # one pool per session as each session targets one host
+    "pool_maxsize": HTTP_POOL_MAXSIZE,
+    "keepalive_delay": HTTP_KEEPALIVE_DELAY,
+    "keepalive_idle_window": HTTP_KEEPALIVE_IDLE_WINDOW,
+    "disable_http2": HTTP_DISABLE_HTTP2,
+}
+
+# Pooled async sessions, one per upstream host, kept for the lifetime of the app
+_shared_async_sessions: dict[str, niquests.AsyncSession] = {}
+
+
+def get_shared_async_niquests_session(url: str) -> niquests.AsyncSession:
+    """Get the pooled async session for the host of the given URL.
 
-def get_niquests_session() -> niquests.Session:
-    """Get an niquests session with proper configuration."""
-    return niquests.Session(**CLIENT_PARAMETERS)
+    Connections (and their TLS/HTTP2 state) are kept alive and reused between
+    requests. The session must not be closed by the caller, it is closed on
+    shutdown by close_shared_async_niquests_sessions().
+    """
+    host = urlsplit(url).netloc
+    session = _shared_async_sessions.get(host)
+    if session is None:
+        session = niquests.AsyncSession(**SHARED_CLIENT_PARAMETERS)
+        _shared_async_sessions[host] = session
+    return session
 
 
-def get_async_niquests_session() -> niquests.AsyncSession:
-    """Get an niquests async session with proper configuration."""
-    return niquests.AsyncSession(**CLIENT_PARAMETERS)
+async def close_shared_async_niquests_sessions() -> None:
+    """Close all the pooled async sessions."""
+    sessions = list(_shared_async_sessions.values())
+    _shared_async_sessions.clear()
+    for session in sessions:
+        await session.close()
@@ -1,13 +1,20 @@
+import asyncio
+import functools
+import signal
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
-from cachier import disable_caching
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from loguru import logger
 
 from app import __version__, config
 from app.constants import STATIC_PATH
 from app.database.database import Base, engine
+from app.helpers.niquests import close_shared_async_niquests_sessions
+from app.models.language import Language
 from app.routers import (
     commodities,
     community_goals,
@@ -19,18 +26,145 @@ from app.routers import (
     ships,
     systems,
 )
+from app.routers.helpers.cache import response_cache
+from app.services.commodities import CommoditiesService
+from app.services.community_goals import CommunityGoalsService
+from app.services.galnet import GalnetService
+from app.services.game_server_health import GameServerHealthService
+from app.services.helpers.cache import services_cache
+from app.services.helpers.cache_backends import DatabaseCacheBackend
+from app.services.helpers.market_snapshot import get_market_snapshot
+from app.services.helpers.scheduler import RefreshJob, RefreshScheduler
+from app.services.helpers.systems_index import get_systems_index
+from app.services.news import NewsService
+from app.services.outfitting import (
+    get_outfitting_catalog,
+    reload_outfitting_catalog,
+)
 
 Base.metadata.create_all(bind=engine)
 
+
+def _get_refresh_jobs() -> list[RefreshJob]:
+    """Get the jobs refreshing the upstream datasets in the background."""
+    commodities_service = CommoditiesService()
+    galnet_service = GalnetService()
+    news_service = NewsService()
+    # Without a shared cache backend, each worker refreshes its own cache
+    is_cache_shared = services_cache.backend is not None
+    return [
+        RefreshJob(
+            "commodities_names",
+            commodities_service.refresh_commodities_names,
+            config.REFRESH_INTERVAL_COMMODITIES_NAMES,
+            per_worker=not is_cache_shared,
+        ),
+        RefreshJob(
+            "commodities_prices",
+            commodities_service.refresh_commodities_prices,
+            config.REFRESH_INTERVAL_COMMODITIES_PRICES,
+            per_worker=not is_cache_shared,
+        ),
+        RefreshJob(
+            "community_goals",
+            CommunityGoalsService().refresh_community_goals,
+            config.REFRESH_INTERVAL_COMMUNITY_GOALS,
+            per_worker=not is_cache_shared,
+        ),
+        RefreshJob(
+            "game_server_health",
+            GameServerHealthService().refresh_game_server_health,
+            config.REFRESH_INTERVAL_GAME_SERVER_HEALTH,
+            per_worker=not is_cache_shared,
+        ),
+        # The first pages of Galnet are read from the articles store (in the database,
+        # so only synced by the leader)
+        *(
+            RefreshJob(
+                f"galnet_{language.value}",
+                functools.partial(galnet_service.sync_articles, language),
+                config.REFRESH_INTERVAL_GALNET,
+            )
+            for language in Language
+        ),
+        # Syncing the news articles stores them for search, and refreshes their cache
+        *(
+            RefreshJob(
+                f"news_{language.value}",
+                functools.partial(news_service.sync_articles, language),
+                config.REFRESH_INTERVAL_NEWS,
+            )
+            for language in Language
+        ),
+    ]
+
+
+async def _reload_outfitting_catalog() -> None:
+    try:
+        await asyncio.to_thread(reload_outfitting_catalog)
+    except Exception:
+        logger.exception("Could not reload the outfitting catalog")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Load the static datasets and start the refresh of the upstream ones on startup.
+
+    Cache entries stored by other versions of the app are removed. The outfitting
+    catalog is reloaded when the worker receives SIGHUP. Upstream connections are
+    released on shutdown.
+    """
+    get_outfitting_catalog()
+    get_systems_index()
+    get_market_snapshot()
+    await services_cache.remove_outdated_backend_entries()
+
+    # Reload tasks are referenced until done, so that they are not garbage collected
+    reload_tasks: set[asyncio.Task[None]] = set()
+
+    def reload_on_signal() -> None:
+        task = asyncio.create_task(_reload_outfitting_catalog())
+        reload_tasks.add(task)
+        task.add_done_callback(reload_tasks.discard)
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, reload_on_signal)
+        reloads_on_signal = True
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # No SIGHUP on Windows, and handlers can only be set from the main thread
+        logger.warning("The outfitting catalog cannot be reloaded on SIGHUP")
+        reloads_on_signal = False
+
+    # Caching is disabled on DEBUG, so there is nothing to refresh. The leader is
+    # elected with a lease in the database, shared by all the workers whatever the
+    # cache backend.
+    refresh_scheduler = RefreshScheduler(
+        _get_refresh_jobs()
+        if config.REFRESH_SCHEDULER_ENABLED and not config.DEBUG
+        else [],
+        DatabaseCacheBackend(),
+        config.REFRESH_SCHEDULER_JITTER,
+    )
+    refresh_scheduler.start()
+    yield
+    await refresh_scheduler.stop()
+    if reloads_on_signal:
+        loop.remove_signal_handler(signal.SIGHUP)
+    await close_shared_async_niquests_sessions()
+
+
 app = FastAPI(
     title="ED-API",
     description="An API for Elite Dangerous 🌌.",
     version=__version__,
+    lifespan=lifespan,
 )
 
 # Disable caching on DEBUG
 if config.DEBUG:
-    disable_caching()
+    services_cache.enabled = False
+    response_cache.enabled = False
 
 
 @app.exception_handler(Exception)
@@ -1,3 +1,4 @@
+import dataclasses
 from datetime import datetime
 from enum import Enum
 
@@ -24,12 +25,27 @@ class CommodityPrice:
     maximum_sell_price: int
 
 
+class CommodityPricesSort(Enum):
+    AVERAGE_BUY_PRICE = "average_buy_price"
+    AVERAGE_SELL_PRICE = "average_sell_price"
+    # Average sell price minus average buy price
+    SPREAD = "spread"
+
+
+@dataclass
+class CommodityPriceResult:
+    """Prices of a commodity requested in a batch, or why they are missing."""
+
+    price: CommodityPrice | None
+    error: str | None
+
+
 class FindCommodityMode(Enum):
     BUY = "buy"
     SELL = "sell"
 
 
-@dataclass
+@dataclasses.dataclass(slots=True)
 class StationWithCommodityDetails(Station):
     last_market_update: datetime | None
     price_percentage_difference: int
@@ -41,3 +57,27 @@ class StationWithCommodityDetails(Station):
 class BestPricesStations:
     best_stations_to_buy: list[StationWithCommodityDetails]
     best_stations_to_sell: list[StationWithCommodityDetails]
+
+
+@dataclasses.dataclass(slots=True)
+class StationWithMarketDetails(Station):
+    last_market_update: datetime | None
+
+
+@dataclass
+class CommodityTrade:
+    commodity: str
+    buy_price: int
+    sell_price: int
+    quantity: int
+    profit: int
+
+
+@dataclass
+class TradeRoute:
+    source: StationWithMarketDetails
+    destination: StationWithMarketDetails
+    distance_in_ly: float
+    trade: CommodityTrade
+    return_trade: CommodityTrade | None
+    profit: int
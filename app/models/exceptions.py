@@ -24,3 +24,15 @@ class OutfittingNotFoundError(Exception):
     def __init__(self, outfitting: str) -> None:
         """Init the exception."""
         self.error_code = f"Outfitting {outfitting} not found"
+
+
+class SystemsIndexUnavailableError(Exception):
+    error_code = "Systems index not available"
+
+
+class MarketSnapshotUnavailableError(Exception):
+    error_code = "Market snapshot not available"
+
+
+class InvalidCursorError(Exception):
+    error_code = "Invalid cursor"
@@ -10,3 +10,9 @@ class GalnetArticle:
     title: str
     uri: str
     published_date: date
+
+
+@dataclass
+class GalnetArticlesPage:
+    articles: list[GalnetArticle]
+    next_cursor: str | None
@@ -1,3 +1,4 @@
+import dataclasses
 from datetime import datetime
 
 from pydantic.dataclasses import dataclass
@@ -19,6 +20,6 @@ class Outfitting:
     display_name: str
 
 
-@dataclass
+@dataclasses.dataclass(slots=True)
 class StationWithOutfittingDetails(Station):
     last_outfitting_update: datetime | None
@@ -1,10 +1,10 @@
 from __future__ import annotations
 
+import dataclasses
 from collections.abc import Iterable
 from datetime import datetime
 
 from aenum import MultiValueEnum
-from pydantic.dataclasses import dataclass
 
 from app.models.stations import StationLandingPadSize
 
@@ -80,7 +80,7 @@ class ShipModel(MultiValueEnum):
         return None
 
 
-@dataclass
+@dataclasses.dataclass(slots=True)
 class StationSellingShip:
     distance_from_reference_system: float
     distance_to_arrival: float
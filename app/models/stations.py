@@ -1,10 +1,9 @@
+import dataclasses
 from datetime import datetime
 from enum import Enum
 from functools import total_ordering
 from typing import Any
 
-from pydantic.dataclasses import dataclass
-
 
 @total_ordering
 class StationLandingPadSize(Enum):
@@ -19,7 +18,23 @@ class StationLandingPadSize(Enum):
         return NotImplemented
 
 
-@dataclass
+class StationService(Enum):
+    BLACK_MARKET = "black_market"
+    DOCKING = "docking"
+    MARKET = "market"
+    MISSIONS = "missions"
+    OUTFITTING = "outfitting"
+    REFUEL = "refuel"
+    REPAIR = "repair"
+    RESTOCK = "restock"
+    SHIPYARD = "shipyard"
+    UNIVERSAL_CARTOGRAPHICS = "universal_cartographics"
+
+
+# Stations are built by the hundred from Spansh results, so they are plain slotted
+# dataclasses, not validated at construction: FastAPI checks them against the
+# response_model when returning them, and pydantic serializes them the same way.
+@dataclasses.dataclass(slots=True)
 class StationDetails:
     distance_to_arrival: float
     has_blackmarket: bool
@@ -45,7 +60,7 @@ class StationDetails:
     type: str
 
 
-@dataclass
+@dataclasses.dataclass(slots=True)
 class Station:
     distance_from_reference_system: float
     distance_to_arrival: float
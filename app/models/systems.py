@@ -52,6 +52,23 @@ class SystemsDistance:
     second_system: System
 
 
+@dataclass
+class SystemsDistanceMatrix:
+    systems: list[System]
+    distances_in_ly: list[list[float]]
+
+
+@dataclass
+class NearbySystem:
+    name: str
+    x: float
+    y: float
+    z: float
+    permit_required: bool
+    population: int
+    distance_in_ly: float
+
+
 @dataclass
 class SystemFactionHistoryDetails:
     influence: float
@@ -1,32 +1,59 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Body, Depends, Query, Response
 from fastapi.exceptions import HTTPException
 
 from app.models.commodities import (
     BestPricesStations,
     Commodity,
     CommodityPrice,
+    CommodityPriceResult,
+    CommodityPricesSort,
     FindCommodityMode,
     StationWithCommodityDetails,
+    TradeRoute,
+)
+from app.models.exceptions import (
+    CommodityNotFoundError,
+    MarketSnapshotUnavailableError,
+    SystemNotFoundError,
+    SystemsIndexUnavailableError,
 )
-from app.models.exceptions import CommodityNotFoundError
 from app.models.stations import StationLandingPadSize
-from app.routers.helpers.responses import get_error_response_doc
-from app.services.commodities import CommoditiesService
+from app.routers.helpers.cache import CachedResponseRoute, cache_response
+from app.routers.helpers.responses import (
+    get_error_response_doc,
+    get_server_timing_header,
+)
+from app.services.commodities import (
+    COMMODITIES_PRICES_TTL,
+    COMMODITIES_TTL,
+    CommoditiesService,
+)
 
-router = APIRouter(prefix="/commodities", tags=["Commodities"])
+MAX_TRADE_ROUTES_DISTANCE_IN_LY = 50
+MAX_TRADE_ROUTES_JUMP_RANGE_IN_LY = 100
+MAX_TRADE_ROUTES = 100
+MAX_COMMODITIES_IN_PRICES_BATCH = 100
+
+router = APIRouter(
+    prefix="/commodities", tags=["Commodities"], route_class=CachedResponseRoute
+)
 
 
 @router.get("/typeahead", response_model=list[str])
-def get_commodities_typeahead(
+async def get_commodities_typeahead(
     input_text: str,
+    limit: Annotated[int | None, Query(ge=1)] = None,
     commodities_service: CommoditiesService = Depends(),
 ) -> list[str]:
     """Get commodities names for autocomplete."""
-    return commodities_service.get_commodities_typeahead(input_text)
+    return await commodities_service.get_commodities_typeahead(input_text, limit)
 
 
 @router.get("", response_model=list[Commodity])
-def get_commodities(
+@cache_response(COMMODITIES_TTL)
+async def get_commodities(
     commodities_service: CommoditiesService = Depends(),
 ) -> list[Commodity]:
     """Get all commodities."""
@@ -38,13 +65,13 @@ def get_commodities(
     response_model=CommodityPrice,
     responses={**get_error_response_doc(400, CommodityNotFoundError)},
 )
-def get_commodity_price(
+async def get_commodity_price(
     commodity: str,
     commodities_service: CommoditiesService = Depends(),
 ) -> CommodityPrice:
     """Get prices for a specific commodity."""
     try:
-        return commodities_service.get_commodity_prices(commodity)
+        return await commodities_service.get_commodity_prices(commodity)
     except CommodityNotFoundError as e:
         raise HTTPException(status_code=400, detail=e.error_code) from e
 
@@ -56,6 +83,7 @@ def get_commodity_price(
 )
 async def get_where_to_sell_commodity(
     commodity: str,
+    response: Response,
     max_age_days: int = 7,
     commodities_service: CommoditiesService = Depends(),
 ) -> BestPricesStations:
@@ -63,26 +91,62 @@ async def get_where_to_sell_commodity(
 
     Will only include prices from stations where market prices where updates between now
     and now - max_age_days.
+    The duration of the buy and sell lookups is available in the Server-Timing header.
     """
+    timings: dict[str, float] = {}
     try:
-        return await commodities_service.get_stations_with_best_prices_for_commodity(
-            commodity, max_age_days
+        best_prices = (
+            await commodities_service.get_stations_with_best_prices_for_commodity(
+                commodity, max_age_days, timings
+            )
         )
     except CommodityNotFoundError as e:
         raise HTTPException(status_code=400, detail=e.error_code) from e
 
+    response.headers["Server-Timing"] = get_server_timing_header(timings)
+    return best_prices
+
 
 @router.get(
     "/prices",
     response_model=list[CommodityPrice],
     responses={**get_error_response_doc(400, CommodityNotFoundError)},
 )
-def get_commodities_prices(
+@cache_response(COMMODITIES_PRICES_TTL)
+async def get_commodities_prices(
     commodities_service: CommoditiesService = Depends(),
     filter: str | None = None,
+    category: str | None = None,
+    is_rare: bool | None = None,
+    sort: CommodityPricesSort | None = None,
+    descending: bool = False,
+    limit: Annotated[int | None, Query(ge=1)] = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
 ) -> list[CommodityPrice]:
-    """Get all commodities prices (with an optional filter) ."""
-    return commodities_service.get_commodities_prices(filter)
+    """Get commodities prices, with optional filters, sort and pagination.
+
+    filter is a prefix of the commodities names and category is matched ignoring case.
+    Prices are sorted by average buy or sell price, or by spread (average sell price
+    minus average buy price), with ties ordered by name.
+    """
+    return await commodities_service.get_commodities_prices(
+        filter, category, is_rare, sort, descending, limit, offset
+    )
+
+
+@router.post("/prices/batch", response_model=dict[str, CommodityPriceResult])
+async def get_commodities_prices_batch(
+    commodities: Annotated[
+        list[str], Body(min_length=1, max_length=MAX_COMMODITIES_IN_PRICES_BATCH)
+    ],
+    commodities_service: CommoditiesService = Depends(),
+) -> dict[str, CommodityPriceResult]:
+    """Get prices for several commodities, by requested name.
+
+    Commodities that cannot be found have an error instead of prices, the other
+    results are still returned.
+    """
+    return await commodities_service.get_commodities_prices_batch(commodities)
 
 
 @router.get("/find", response_model=list[StationWithCommodityDetails])
@@ -109,3 +173,54 @@ async def find_commodity(
         min_quantity,
         max_age_days,
     )
+
+
+@router.get(
+    "/routes",
+    response_model=list[TradeRoute],
+    responses={
+        **get_error_response_doc(400, SystemNotFoundError),
+        **get_error_response_doc(
+            503, MarketSnapshotUnavailableError, SystemsIndexUnavailableError
+        ),
+    },
+)
+async def get_trade_routes(
+    reference_system: str,
+    cargo_capacity: Annotated[int, Query(gt=0)],
+    jump_range_in_ly: Annotated[
+        float, Query(gt=0, le=MAX_TRADE_ROUTES_JUMP_RANGE_IN_LY)
+    ],
+    max_distance_in_ly: Annotated[
+        float, Query(ge=0, le=MAX_TRADE_ROUTES_DISTANCE_IN_LY)
+    ] = 20,
+    min_landing_pad_size: StationLandingPadSize = StationLandingPadSize.SMALL,
+    max_age_days: int = 7,
+    round_trip: bool = False,
+    limit: Annotated[int, Query(ge=1, le=MAX_TRADE_ROUTES)] = 10,
+    commodities_service: CommoditiesService = Depends(),
+) -> list[TradeRoute]:
+    """Get the most profitable trade routes near a reference system, best first.
+
+    Routes start at a station at most max_distance_in_ly ly away from the reference
+    system and end at a station one jump away, buying a full cargo (or what the
+    markets allow) of the most profitable commodity. With round_trip, a commodity is
+    also traded on the way back.
+    Will only include prices from stations where market prices where updates between now
+    and now - max_age_days. Requires the local market snapshot and systems index.
+    """
+    try:
+        return await commodities_service.get_trade_routes(
+            reference_system,
+            max_distance_in_ly,
+            jump_range_in_ly,
+            cargo_capacity,
+            min_landing_pad_size,
+            max_age_days,
+            round_trip,
+            limit,
+        )
+    except SystemNotFoundError as e:
+        raise HTTPException(status_code=400, detail=e.error_code) from e
+    except (MarketSnapshotUnavailableError, SystemsIndexUnavailableError) as e:
+        raise HTTPException(status_code=503, detail=e.error_code) from e
@@ -1,14 +1,20 @@
 from fastapi import APIRouter, Depends
 
 from app.models.community_goals import CommunityGoal
-from app.services.community_goals import CommunityGoalsService
+from app.routers.helpers.cache import CachedResponseRoute, cache_response
+from app.services.community_goals import COMMUNITY_GOALS_TTL, CommunityGoalsService
 
-router = APIRouter(prefix="/community_goals", tags=["Community Goals"])
+router = APIRouter(
+    prefix="/community_goals",
+    tags=["Community Goals"],
+    route_class=CachedResponseRoute,
+)
 
 
 @router.get("", response_model=list[CommunityGoal])
+@cache_response(COMMUNITY_GOALS_TTL)
 async def get_community_goals(
     community_goals_service: CommunityGoalsService = Depends(),
 ) -> list[CommunityGoal]:
     """Get latest community goals informations."""
-    return community_goals_service.get_community_goals()
+    return await community_goals_service.get_community_goals()
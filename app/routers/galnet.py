@@ -1,19 +1,68 @@
+import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.exceptions import HTTPException
 
+from app.models.exceptions import InvalidCursorError
 from app.models.galnet import GalnetArticle
 from app.models.language import Language
-from app.services.galnet import GalnetService
+from app.routers.helpers.cache import CachedResponseRoute, cache_response
+from app.routers.helpers.responses import get_error_response_doc
+from app.services.galnet import GALNET_TTL, GalnetService
 
-router = APIRouter(prefix="/galnet", tags=["News & Galnet"])
+router = APIRouter(
+    prefix="/galnet", tags=["News & Galnet"], route_class=CachedResponseRoute
+)
 
 
-@router.get("", response_model=list[GalnetArticle])
+@router.get("/search", response_model=list[GalnetArticle])
+async def search_articles(
+    q: Annotated[str, Query(min_length=1)],
+    lang: Language = Language.ENGLISH,
+    published_after: datetime.date | None = None,
+    published_before: datetime.date | None = None,
+    page: Annotated[int, Query(ge=1)] = 1,
+    galnet_service: GalnetService = Depends(),
+) -> list[GalnetArticle]:
+    """Search Galnet articles (synced locally), best matches first.
+
+    Articles must contain all the words of q, and be published between
+    published_after and published_before (included) if specified.
+    """
+    return await galnet_service.search_articles(
+        q, lang, published_after, published_before, page
+    )
+
+
+@router.get(
+    "",
+    response_model=list[GalnetArticle],
+    responses={**get_error_response_doc(400, InvalidCursorError)},
+)
+@cache_response(GALNET_TTL)
 async def get_latest_articles(
+    request: Request,
+    response: Response,
     lang: Language = Language.ENGLISH,
     page: Annotated[int, Query(ge=1)] = 1,
+    cursor: str | None = None,
     galnet_service: GalnetService = Depends(),
 ) -> list[GalnetArticle]:
-    """Get latest Galnet news."""
-    return await galnet_service.get_articles(lang, page)
+    """Get latest Galnet news.
+
+    When articles are served from the local archive, the next page is linked in the
+    Link header (rel="next"), its cursor being faster than page numbers.
+    """
+    try:
+        articles_page = await galnet_service.get_articles(lang, page, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=e.error_code) from e
+
+    if articles_page.next_cursor is not None:
+        next_url = request.url.remove_query_params("page").include_query_params(
+            cursor=articles_page.next_cursor
+        )
+        # Relative to the request URL, as the response is cached for all the hosts
+        response.headers["Link"] = f'<{next_url.path}?{next_url.query}>; rel="next"'
+    return articles_page.articles
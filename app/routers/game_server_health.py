@@ -1,12 +1,21 @@
 from fastapi import APIRouter, Depends
 
 from app.models.game_server_health import GameServerHealth
-from app.services.game_server_health import GameServerHealthService
+from app.routers.helpers.cache import CachedResponseRoute, cache_response
+from app.services.game_server_health import (
+    GAME_SERVER_HEALTH_TTL,
+    GameServerHealthService,
+)
 
-router = APIRouter(prefix="/game_server_health", tags=["Game server health"])
+router = APIRouter(
+    prefix="/game_server_health",
+    tags=["Game server health"],
+    route_class=CachedResponseRoute,
+)
 
 
 @router.get("", response_model=GameServerHealth)
+@cache_response(GAME_SERVER_HEALTH_TTL)
 async def get_server_health(
     game_server_health_service: GameServerHealthService = Depends(),
 ) -> GameServerHealth:
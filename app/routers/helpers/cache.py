@@ -0,0 +1,170 @@
+import dataclasses
+import datetime
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.config import CACHE_MAX_ENTRIES
+from app.services.helpers.cache import services_cache, track_cached_values_usage
+
+RESPONSE_TTL_ATTRIBUTE = "response_ttl"
+
+# Headers set from the cached body when sending it
+UNCACHED_HEADERS = {"content-length", "content-type"}
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class CachedResponse:
+    body: bytes
+    media_type: str | None
+    headers: dict[str, str]
+    etag: str
+    expires_at: float
+    # Keys of the service cache values the response is built from
+    cached_values_keys: frozenset[str]
+
+    def get_headers(self, now: float) -> dict[str, str]:
+        """Get the caching headers of the response."""
+        max_age = max(0, int(self.expires_at - now))
+        return {
+            **self.headers,
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={max_age}",
+        }
+
+    def matches(self, if_none_match: str) -> bool:
+        """Check if the response matches an If-None-Match header (weak comparison)."""
+        etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        return "*" in etags or self.etag in etags
+
+
+class ResponseCache:
+    """In-memory LRU of serialized responses, keyed on path and query."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.enabled = True
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+
+    def get(self, key: str, now: float) -> CachedResponse | None:
+        """Get the response for the key, or None if it is missing or expired."""
+        cached_response = self._entries.get(key)
+        if cached_response is None or cached_response.expires_at <= now:
+            return None
+
+        self._entries.move_to_end(key)
+        return cached_response
+
+    def set(self, key: str, cached_response: CachedResponse) -> None:
+        """Store the response for the key."""
+        self._entries[key] = cached_response
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_cached_value(self, cached_value_key: str) -> None:
+        """Remove the responses built from a service cache value."""
+        keys = [
+            key
+            for key, cached_response in self._entries.items()
+            if cached_value_key in cached_response.cached_values_keys
+        ]
+        for key in keys:
+            del self._entries[key]
+
+
+response_cache = ResponseCache(max_entries=CACHE_MAX_ENTRIES)
+# Responses are not kept once the values they are built from are refreshed
+services_cache.add_invalidation_callback(response_cache.invalidate_cached_value)
+
+
+def cache_response[T: Callable[..., Any]](
+    ttl: datetime.timedelta,
+) -> Callable[[T], T]:
+    """Cache the responses of an endpoint (of a router using CachedResponseRoute)."""
+
+    def decorator(endpoint: T) -> T:
+        setattr(endpoint, RESPONSE_TTL_ATTRIBUTE, ttl)
+        return endpoint
+
+    return decorator
+
+
+def _get_cache_key(request: Request) -> str:
+    # Sort the parameters so that their order does not matter
+    query = sorted(request.query_params.multi_items())
+    return f"{request.url.path}?{query!r}"
+
+
+class CachedResponseRoute(APIRoute):
+    """Route serving the serialized responses of endpoints decorated with cache_response().
+
+    Responses are stored for the TTL of the endpoint, or until the first of the service
+    cache values they are built from expires or is refreshed (those already stale are
+    not stored), with a strong ETag (hash of the body) so that clients can revalidate
+    them with If-None-Match, and a Cache-Control header telling them how long they can
+    be used.
+    Only successful responses are cached.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        """Get the route handler, wrapped with the cache if the endpoint uses it."""
+        route_handler = super().get_route_handler()
+        ttl: datetime.timedelta | None = getattr(
+            self.endpoint, RESPONSE_TTL_ATTRIBUTE, None
+        )
+        if ttl is None:
+            return route_handler
+
+        async def cached_route_handler(request: Request) -> Response:
+            if not response_cache.enabled or request.method != "GET":
+                return await route_handler(request)
+
+            now = time.time()
+            key = _get_cache_key(request)
+            cached_response = response_cache.get(key, now)
+            if cached_response is None:
+                with track_cached_values_usage() as cached_values_usage:
+                    response = await route_handler(request)
+                if response.status_code != 200:
+                    return response
+
+                # The response is not fresher than the cached values it is built from
+                expires_at = min(
+                    now + ttl.total_seconds(), cached_values_usage.expires_at
+                )
+                if expires_at <= time.time():
+                    return response
+
+                body = bytes(response.body)
+                cached_response = CachedResponse(
+                    body=body,
+                    media_type=response.media_type,
+                    headers={
+                        name: value
+                        for name, value in response.headers.items()
+                        if name not in UNCACHED_HEADERS
+                    },
+                    etag=f'"{hashlib.sha256(body).hexdigest()}"',
+                    expires_at=expires_at,
+                    cached_values_keys=frozenset(cached_values_usage.keys),
+                )
+                response_cache.set(key, cached_response)
+
+            headers = cached_response.get_headers(now)
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match is not None and cached_response.matches(if_none_match):
+                return Response(status_code=304, headers=headers)
+
+            return Response(
+                content=cached_response.body,
+                media_type=cached_response.media_type,
+                headers=headers,
+            )
+
+        return cached_route_handler
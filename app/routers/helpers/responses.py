@@ -1,18 +1,36 @@
 from app.routers.error_responses import HTTPError
 
 
-def get_error_response_doc(status_code: int, exception: type[Exception]) -> dict:
-    """Get the OpenAPI documentation for an exception to use in FastAPI doc decorator."""
-    error_code = getattr(exception, "error_code", "Unknown error")
+def get_error_response_doc(
+    status_code: int, exception: type[Exception], *other_exceptions: type[Exception]
+) -> dict:
+    """Get the OpenAPI documentation for exceptions to use in FastAPI doc decorator.
+
+    Exceptions with the same status code are documented in the same response.
+    """
+    error_codes = [
+        getattr(exception, "error_code", "Unknown error")
+        for exception in (exception, *other_exceptions)
+    ]
+    if len(error_codes) == 1:
+        examples = {"example": HTTPError(detail=error_codes[0]).model_dump_json()}
+    else:
+        examples = {
+            "examples": {
+                error_code: {"value": HTTPError(detail=error_code).model_dump_json()}
+                for error_code in error_codes
+            }
+        }
 
     return {
         status_code: {
-            "detail": error_code,
+            "detail": " or ".join(error_codes),
             "model": HTTPError,
-            "content": {
-                "application/json": {
-                    "example": HTTPError(detail=error_code).model_dump_json()
-                },
-            },
+            "content": {"application/json": examples},
         }
     }
+
+
+def get_server_timing_header(timings: dict[str, float]) -> str:
+    """Get the value of a Server-Timing header for the given durations in milliseconds."""
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings.items())
@@ -1,16 +1,42 @@
-from fastapi import APIRouter, Depends
+import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
 
 from app.models.language import Language
 from app.models.news import NewsArticle
-from app.services.news import NewsService
+from app.routers.helpers.cache import CachedResponseRoute, cache_response
+from app.services.news import NEWS_TTL, NewsService
 
-router = APIRouter(prefix="/news", tags=["News & Galnet"])
+router = APIRouter(
+    prefix="/news", tags=["News & Galnet"], route_class=CachedResponseRoute
+)
 
 
 @router.get("", response_model=list[NewsArticle])
+@cache_response(NEWS_TTL)
 async def get_latest_articles(
     lang: Language = Language.ENGLISH,
     news_service: NewsService = Depends(),
 ) -> list[NewsArticle]:
     """Get latest news."""
     return await news_service.get_articles(lang)
+
+
+@router.get("/search", response_model=list[NewsArticle])
+async def search_articles(
+    q: Annotated[str, Query(min_length=1)],
+    lang: Language = Language.ENGLISH,
+    published_after: datetime.date | None = None,
+    published_before: datetime.date | None = None,
+    page: Annotated[int, Query(ge=1)] = 1,
+    news_service: NewsService = Depends(),
+) -> list[NewsArticle]:
+    """Search news articles (synced locally), best matches first.
+
+    Articles must contain all the words of q, and be published between
+    published_after and published_before (included) if specified.
+    """
+    return await news_service.search_articles(
+        q, lang, published_after, published_before, page
+    )
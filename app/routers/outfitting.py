@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from app.models.exceptions import OutfittingNotFoundError
 from app.models.outfitting import StationWithOutfittingDetails
@@ -12,10 +14,11 @@ router = APIRouter(prefix="/outfitting", tags=["Outfitting"])
 @router.get("/typeahead", response_model=list[str])
 async def get_outfitting_typeahead(
     input_text: str,
+    limit: Annotated[int | None, Query(ge=1)] = None,
     outfitting_service: OutfittingService = Depends(),
 ) -> list[str]:
     """Get outfitting items names for autocomplete."""
-    return outfitting_service.get_outfitting_typeahead(input_text)
+    return outfitting_service.get_outfitting_typeahead(input_text, limit)
 
 
 @router.get(
@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import RedirectResponse, Response
 
 from app.models.ships import ShipModel, StationSellingShip
@@ -27,10 +29,11 @@ async def get_ship_picture(
 @router.get("/typeahead", response_model=list[str])
 async def get_ships_typeahead(
     input_text: str,
+    limit: Annotated[int | None, Query(ge=1)] = None,
     ships_service: ShipsService = Depends(),
 ) -> list[str]:
     """Get ships names for autocomplete."""
-    return await ships_service.get_ships_typeahead(input_text)
+    return await ships_service.get_ships_typeahead(input_text, limit)
 
 
 @router.get("/search", response_model=list[StationSellingShip])
@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
 from fastapi.exceptions import HTTPException
 
-from app.models.exceptions import SystemNotFoundError
-from app.models.stations import StationDetails
-from app.models.systems import SystemDetails, SystemFactionHistory, SystemsDistance
+from app.models.exceptions import SystemNotFoundError, SystemsIndexUnavailableError
+from app.models.stations import StationDetails, StationService
+from app.models.systems import (
+    NearbySystem,
+    SystemDetails,
+    SystemFactionHistory,
+    SystemsDistance,
+    SystemsDistanceMatrix,
+)
 from app.routers.helpers.responses import get_error_response_doc
 from app.services.systems import SystemsService
 
 router = APIRouter(prefix="/systems", tags=["Systems"])
 
+MAX_SYSTEMS_IN_DISTANCE_MATRIX = 25
+MAX_NEARBY_SYSTEMS_RADIUS_IN_LY = 200
+MAX_NEARBY_SYSTEMS = 1000
+MAX_NEAREST_POPULATED_SYSTEMS = 100
+
 
 @router.get("/typeahead", response_model=list[str])
 async def get_systems_typeahead(
@@ -38,6 +51,27 @@ async def get_systems_distance_calculator(
         raise HTTPException(status_code=400, detail=e.error_code) from e
 
 
+@router.get(
+    "/distance_matrix",
+    response_model=SystemsDistanceMatrix,
+    responses={**get_error_response_doc(400, SystemNotFoundError)},
+)
+async def get_systems_distance_matrix(
+    systems: Annotated[
+        list[str], Query(min_length=2, max_length=MAX_SYSTEMS_IN_DISTANCE_MATRIX)
+    ],
+    systems_service: SystemsService = Depends(),
+) -> SystemsDistanceMatrix:
+    """Get distances between each pair of the specified systems.
+
+    distances_in_ly[i][j] is the distance between systems[i] and systems[j].
+    """
+    try:
+        return await systems_service.get_systems_distance_matrix(systems)
+    except SystemNotFoundError as e:
+        raise HTTPException(status_code=400, detail=e.error_code) from e
+
+
 @router.get(
     "/{system_name}",
     response_model=SystemDetails,
@@ -61,13 +95,68 @@ async def get_system_details(
 )
 async def get_system_stations(
     system_name: str,
+    services: Annotated[list[StationService] | None, Query()] = None,
     systems_service: SystemsService = Depends(),
 ) -> list[StationDetails]:
-    """Get details of a specified system."""
+    """Get the stations of a specified system.
+
+    If services are specified, only the stations with all of them are returned.
+    """
+    try:
+        return await systems_service.get_system_stations(system_name, services or ())
+    except SystemNotFoundError as e:
+        raise HTTPException(status_code=400, detail=e.error_code) from e
+
+
+@router.get(
+    "/{system_name}/nearby",
+    response_model=list[NearbySystem],
+    responses={
+        **get_error_response_doc(400, SystemNotFoundError),
+        **get_error_response_doc(503, SystemsIndexUnavailableError),
+    },
+)
+async def get_nearby_systems(
+    system_name: str,
+    radius: Annotated[float, Query(gt=0, le=MAX_NEARBY_SYSTEMS_RADIUS_IN_LY)],
+    limit: Annotated[int, Query(ge=1, le=MAX_NEARBY_SYSTEMS)] = 100,
+    systems_service: SystemsService = Depends(),
+) -> list[NearbySystem]:
+    """Get the systems at most radius ly away from a specified system, closest first.
+
+    Requires the local systems index.
+    """
+    try:
+        return await systems_service.get_nearby_systems(system_name, radius, limit)
+    except SystemNotFoundError as e:
+        raise HTTPException(status_code=400, detail=e.error_code) from e
+    except SystemsIndexUnavailableError as e:
+        raise HTTPException(status_code=503, detail=e.error_code) from e
+
+
+@router.get(
+    "/{system_name}/nearest_populated",
+    response_model=list[NearbySystem],
+    responses={
+        **get_error_response_doc(400, SystemNotFoundError),
+        **get_error_response_doc(503, SystemsIndexUnavailableError),
+    },
+)
+async def get_nearest_populated_systems(
+    system_name: str,
+    count: Annotated[int, Query(ge=1, le=MAX_NEAREST_POPULATED_SYSTEMS)] = 10,
+    systems_service: SystemsService = Depends(),
+) -> list[NearbySystem]:
+    """Get the populated systems closest to a specified system, closest first.
+
+    Requires the local systems index.
+    """
     try:
-        return await systems_service.get_system_stations(system_name)
+        return await systems_service.get_nearest_populated_systems(system_name, count)
     except SystemNotFoundError as e:
         raise HTTPException(status_code=400, detail=e.error_code) from e
+    except SystemsIndexUnavailableError as e:
+        raise HTTPException(status_code=503, detail=e.error_code) from e
 
 
 @router.get(
@@ -1,70 +1,82 @@
+import asyncio
 import csv
 import datetime
-import difflib
+import functools
+import math
+import time
+from collections.abc import AsyncIterator
 from typing import Any
 
 import niquests
-from cachier import cachier
-from dateutil.parser import parse
 from loguru import logger
 
 from app.constants import DATA_PATH, SPANSH_STATIONS_SEARCH_URL
-from app.helpers.niquests import get_async_niquests_session, get_niquests_session
+from app.helpers.concurrency import gather_or_cancel
+from app.helpers.niquests import get_shared_async_niquests_session
 from app.models.commodities import (
     BestPricesStations,
     Commodity,
     CommodityPrice,
+    CommodityPriceResult,
+    CommodityPricesSort,
+    CommodityTrade,
     FindCommodityMode,
     StationWithCommodityDetails,
+    StationWithMarketDetails,
+    TradeRoute,
+)
+from app.models.exceptions import (
+    CommodityNotFoundError,
+    ContentFetchingError,
+    MarketSnapshotUnavailableError,
+    SystemNotFoundError,
+    SystemsIndexUnavailableError,
 )
-from app.models.exceptions import CommodityNotFoundError, ContentFetchingError
 from app.models.stations import StationLandingPadSize
+from app.services.helpers.cache import async_cached
+from app.services.helpers.commodity_index import CommodityIndex, CommodityPriceTable
 from app.services.helpers.fleet_carriers import is_fleet_carrier
+from app.services.helpers.market_snapshot import (
+    MarketOffer,
+    MarketSnapshot,
+    MarketStation,
+    get_market_snapshot,
+)
 from app.services.helpers.settlements import is_settlement
 from app.services.helpers.spansh import (
     get_formatted_reference_system,
     get_max_age_values_for_request_body,
     get_request_body_common_filters,
     get_station_max_landing_pad_size,
+    iter_spansh_search_results,
 )
+from app.services.helpers.systems_index import get_systems_index
+from app.services.helpers.timestamps import parse_timestamp
+from app.services.helpers.trade_routes import Route, Trade, get_best_routes
+from app.services.helpers.typeahead import TypeaheadIndex
 
 SPANSH_COMMODITIES_TYPEAHEAD_SERVICE_URL = (
     "https://spansh.co.uk/api/stations/field_values/market"
 )
 ARDENT_INSIGHT_COMMODITIES_URL = "https://api.ardent-insight.com/v2/commodities"
+# Only the market of the stations is used
+SPANSH_MARKET_SEARCH_OMITTED_FIELDS = ("modules", "ships")
+COMMODITIES_TTL = datetime.timedelta(days=1)
+COMMODITIES_PRICES_TTL = datetime.timedelta(days=1)
+# Same number of results as the Spansh searches
+FIND_COMMODITY_RESULTS_COUNT = 50
+BEST_PRICES_RESULTS_COUNT = 25
 
 
-def _compare_commodity_names(name_1: str, name_2: str) -> bool:
-    return name_1.lower().replace("_", "").replace("-", "").replace(
-        " ", ""
-    ) == name_2.lower().replace("_", "").replace("-", "").replace(" ", "")
-
-
-def _get_commodity_from_name(
-    name: str, commodities: list[Commodity]
-) -> Commodity | None:
-    """Get the commodity with the specified name using difflib for handling small differences."""
-    # First check simple matches
-    for name_from_csv in (x.api_name for x in commodities):
-        if _compare_commodity_names(name_from_csv, name):
-            return next(x for x in commodities if x.api_name == name_from_csv)
-
-    # Else use difflib
-    match = difflib.get_close_matches(name, [x.name for x in commodities])
-    if match is None or len(match) == 0:
-        return None
-
-    valid_name = match[0]
-    return next(x for x in commodities if x.name == valid_name)
-
+@async_cached(ttl=datetime.timedelta(minutes=60), stale_ttl=datetime.timedelta(days=1))
+async def _get_commodities_names_from_spansh() -> TypeaheadIndex:
+    session = get_shared_async_niquests_session(
+        SPANSH_COMMODITIES_TYPEAHEAD_SERVICE_URL
+    )
+    res = await session.get(SPANSH_COMMODITIES_TYPEAHEAD_SERVICE_URL)
+    res.raise_for_status()
 
-@cachier(stale_after=datetime.timedelta(minutes=60))
-def _get_commodities_names_from_spansh() -> list[str]:
-    with get_niquests_session() as session:
-        res = session.get(SPANSH_COMMODITIES_TYPEAHEAD_SERVICE_URL)
-        res.raise_for_status()
-
-    return res.json()["values"]
+    return TypeaheadIndex(res.json()["values"])
 
 
 def _read_commodities_csv_file(path: str, is_rare: bool) -> list[Commodity]:
@@ -85,108 +97,129 @@ def _read_commodities_csv_file(path: str, is_rare: bool) -> list[Commodity]:
     return items
 
 
-@cachier(stale_after=datetime.timedelta(days=1))
-def _get_commodities_data_from_csv() -> list[Commodity]:
-    """Get the list of commodities by reading the CSV files."""
+@functools.cache
+def _get_commodity_index() -> CommodityIndex:
+    """Get the index of commodities by reading the CSV files."""
     commodities = _read_commodities_csv_file(f"{DATA_PATH}/commodities.csv", False)
     rares = _read_commodities_csv_file(f"{DATA_PATH}/rare_commodities.csv", True)
-    return commodities + rares
+    return CommodityIndex(commodities + rares)
 
 
-@cachier(stale_after=datetime.timedelta(days=1))
-def _get_commodities_prices_from_ardent_insight_api() -> list[CommodityPrice]:
+@async_cached(ttl=COMMODITIES_PRICES_TTL, stale_ttl=COMMODITIES_PRICES_TTL)
+async def _get_commodities_prices_from_ardent_insight_api() -> CommodityPriceTable:
     prices = []
-    commodities: list[Commodity] = _get_commodities_data_from_csv()  # type: ignore (cachier wrapper looses type hints)
-
-    with get_niquests_session() as session:
-        api_res = session.get(ARDENT_INSIGHT_COMMODITIES_URL)
-        data = api_res.json()
-
-        for entry in data:
-            # Get commodity itself from CSV data
-            commodity = _get_commodity_from_name(entry["commodityName"], commodities)
-            if commodity is None:
-                logger.warning(
-                    f"Could not find a commodity matching the name {entry['commodityName']} from Ardent Insight in the list of commodities from CSV file. Skipping it."
-                )
-                continue
-
-            prices.append(
-                CommodityPrice(
-                    commodity=commodity,
-                    average_buy_price=entry.get("avgBuyPrice", 0) or 0,
-                    average_sell_price=entry.get("avgSellPrice", 0) or 0,
-                    minimum_buy_price=entry.get("minBuyPrice", 0) or 0,
-                    maximum_sell_price=entry.get("maxSellPrice", 0) or 0,
-                )
+    commodity_index = _get_commodity_index()
+
+    session = get_shared_async_niquests_session(ARDENT_INSIGHT_COMMODITIES_URL)
+    api_res = await session.get(ARDENT_INSIGHT_COMMODITIES_URL)
+    api_res.raise_for_status()
+    data = api_res.json()
+
+    for entry in data:
+        # Get commodity itself from CSV data
+        commodity = commodity_index.find(entry["commodityName"])
+        if commodity is None:
+            logger.warning(
+                f"Could not find a commodity matching the name {entry['commodityName']} from Ardent Insight in the list of commodities from CSV file. Skipping it."
+            )
+            continue
+
+        prices.append(
+            CommodityPrice(
+                commodity=commodity,
+                average_buy_price=entry.get("avgBuyPrice", 0) or 0,
+                average_sell_price=entry.get("avgSellPrice", 0) or 0,
+                minimum_buy_price=entry.get("minBuyPrice", 0) or 0,
+                maximum_sell_price=entry.get("maxSellPrice", 0) or 0,
             )
+        )
 
-    return prices
+    return CommodityPriceTable(prices, commodity_index)
 
 
 class CommoditiesService:
     """Main class for the commodities service."""
 
-    def get_commodities_typeahead(self, input_text: str) -> list[str]:
+    async def get_commodities_typeahead(
+        self, input_text: str, limit: int | None = None
+    ) -> list[str]:
         """Get commodities names for autocomplete."""
         try:
-            commodities: list[str] = _get_commodities_names_from_spansh()  # type: ignore (cachier wrapper looses type hints)
+            commodities = await _get_commodities_names_from_spansh()
         except niquests.exceptions.RequestException as e:
             raise ContentFetchingError() from e
 
-        return [
-            item for item in commodities if item.lower().startswith(input_text.lower())
-        ]
+        return commodities.search(input_text, limit)
+
+    async def refresh_commodities_names(self) -> None:
+        """Refresh the cached commodities names, ahead of their expiration."""
+        await _get_commodities_names_from_spansh.refresh()
+
+    async def refresh_commodities_prices(self) -> None:
+        """Refresh the cached commodities prices, ahead of their expiration."""
+        await _get_commodities_prices_from_ardent_insight_api.refresh()
 
     def get_commodities(self) -> list[Commodity]:
         """Get all commodities."""
-        try:
-            res: list[Commodity] = _get_commodities_data_from_csv()  # type: ignore (cachier wrapper looses type hints)
-        except niquests.exceptions.RequestException as e:
-            raise ContentFetchingError() from e
-        else:
-            return res
+        return list(_get_commodity_index().commodities)
 
-    def get_commodities_prices(self, filter: str | None) -> list[CommodityPrice]:
-        """Get all commodities prices (with an optional filter) ."""
+    async def get_commodities_prices(
+        self,
+        filter: str | None,
+        category: str | None = None,
+        is_rare: bool | None = None,
+        sort: CommodityPricesSort | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[CommodityPrice]:
+        """Get a page of commodities prices (with optional filters and sort).
+
+        filter is a prefix of the commodities names, and category is matched ignoring
+        case.
+        """
         try:
-            res: list[CommodityPrice] = (
-                _get_commodities_prices_from_ardent_insight_api()  # type: ignore (cachier wrapper looses type hints)
-            )
+            res = await _get_commodities_prices_from_ardent_insight_api()
         except niquests.exceptions.RequestException as e:
             raise ContentFetchingError() from e
-        else:
-            if filter:
-                return [
-                    item
-                    for item in res
-                    if item.commodity.name.lower().startswith(filter.lower())
-                ]
-            return res
-
-    def get_commodity_prices(self, commodity_name: str) -> CommodityPrice:
+
+        return res.search(filter, category, is_rare, sort, descending, limit, offset)
+
+    async def get_commodity_prices(self, commodity_name: str) -> CommodityPrice:
         """Get prices for a specific commodity."""
         try:
-            res: list[CommodityPrice] = (
-                _get_commodities_prices_from_ardent_insight_api()  # type: ignore (cachier wrapper looses type hints)
-            )
+            res = await _get_commodities_prices_from_ardent_insight_api()
         except niquests.exceptions.RequestException as e:
             raise ContentFetchingError() from e
 
-        matching_commodity = next(
-            (
-                price
-                for price in res
-                if _compare_commodity_names(price.commodity.name, commodity_name)
-                or _compare_commodity_names(price.commodity.api_name, commodity_name)
-            ),
-            None,
-        )
+        matching_commodity = res.get(commodity_name)
         if matching_commodity is None:
             raise CommodityNotFoundError(commodity_name)
 
         return matching_commodity
 
+    async def get_commodities_prices_batch(
+        self, commodities_names: list[str]
+    ) -> dict[str, CommodityPriceResult]:
+        """Get prices for several commodities, by requested name.
+
+        Commodities that cannot be found are reported with an error instead of prices.
+        """
+        try:
+            res = await _get_commodities_prices_from_ardent_insight_api()
+        except niquests.exceptions.RequestException as e:
+            raise ContentFetchingError() from e
+
+        return {
+            name: CommodityPriceResult(
+                price=price,
+                error=(
+                    CommodityNotFoundError(name).error_code if price is None else None
+                ),
+            )
+            for name, price in res.get_many(commodities_names).items()
+        }
+
     async def find_commodity(
         self,
         mode: FindCommodityMode,
@@ -203,84 +236,327 @@ class CommoditiesService:
         and now - max_age_days.
         """
         # First get commodity price
-        current_commodity_price = self.get_commodity_prices(commodity)
-
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.post(
-                    SPANSH_STATIONS_SEARCH_URL,
-                    json=self._find_commodity_generate_request_body(
-                        mode,
-                        reference_system,
-                        current_commodity_price.commodity.name,
-                        min_quantity,
-                        max_age_days,
-                    ),
-                )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        current_commodity_price = await self.get_commodity_prices(commodity)
+
+        # Use the local market snapshot if it can answer
+        market_snapshot = self._get_market_snapshot(
+            current_commodity_price.commodity.name, max_age_days
+        )
+        systems_index = get_systems_index()
+        reference = (
+            systems_index.get_system(reference_system)
+            if market_snapshot is not None and systems_index is not None
+            else None
+        )
+        if market_snapshot is not None and reference is not None:
+            offers = await asyncio.to_thread(
+                market_snapshot.get_nearest_offers,
+                current_commodity_price.commodity.name,
+                mode,
+                (reference.x, reference.y, reference.z),
+                min_quantity,
+                min_landing_pad_size,
+                self._get_min_market_update(max_age_days),
+                FIND_COMMODITY_RESULTS_COUNT,
+            )
+            return [
+                self._map_market_offer_to_model(offer, current_commodity_price, mode)
+                for offer in offers
+            ]
 
-        return self._map_spansh_stations_to_model(
-            api_response, current_commodity_price, mode, min_landing_pad_size
+        results = iter_spansh_search_results(
+            SPANSH_STATIONS_SEARCH_URL,
+            self._find_commodity_generate_request_body(
+                mode,
+                reference_system,
+                current_commodity_price.commodity.name,
+                min_quantity,
+                max_age_days,
+            ),
+            omitted_fields=SPANSH_MARKET_SEARCH_OMITTED_FIELDS,
+        )
+        return await self._map_spansh_stations_to_model(
+            results, current_commodity_price, mode, min_landing_pad_size
         )
 
     async def get_stations_with_best_prices_for_commodity(
-        self, commodity_name: str, max_age_days: int
+        self,
+        commodity_name: str,
+        max_age_days: int,
+        timings: dict[str, float] | None = None,
     ) -> BestPricesStations:
         """Get the best stations to buy and sell a specific commodity.
 
         Will only include prices from stations where market prices where updates between now
         and now - max_age_days.
+        If timings is specified, the duration in milliseconds of each leg (buy and sell)
+        is stored in it.
         """
+        if timings is None:
+            timings = {}
+
         # First get commodity price
-        current_commodity_price = self.get_commodity_prices(commodity_name)
+        current_commodity_price = await self.get_commodity_prices(commodity_name)
 
-        return BestPricesStations(
-            best_stations_to_buy=await self._get_station_with_best_prices_for_commodity_and_mode(
-                current_commodity_price, max_age_days, FindCommodityMode.BUY
+        # Then get both legs at the same time
+        best_stations_to_buy, best_stations_to_sell = await gather_or_cancel(
+            self._get_station_with_best_prices_for_commodity_and_mode(
+                current_commodity_price, max_age_days, FindCommodityMode.BUY, timings
             ),
-            best_stations_to_sell=await self._get_station_with_best_prices_for_commodity_and_mode(
-                current_commodity_price, max_age_days, FindCommodityMode.SELL
+            self._get_station_with_best_prices_for_commodity_and_mode(
+                current_commodity_price, max_age_days, FindCommodityMode.SELL, timings
             ),
         )
+        logger.debug(f"Best prices for {commodity_name} fetched, timings: {timings}")
+
+        return BestPricesStations(
+            best_stations_to_buy=best_stations_to_buy,
+            best_stations_to_sell=best_stations_to_sell,
+        )
 
     async def _get_station_with_best_prices_for_commodity_and_mode(
         self,
         commodity: CommodityPrice,
         max_age_days: int,
         mode: FindCommodityMode,
+        timings: dict[str, float],
     ) -> list[StationWithCommodityDetails]:
         """Get the best stations to buy or sell a specific commodity.
 
         Will only include prices from stations where market prices where updates between now
         and now - max_age_days.
         """
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.post(
-                    SPANSH_STATIONS_SEARCH_URL,
-                    json=self._find_commodity_best_prices_generate_request_body(
-                        mode, commodity.commodity.name, max_age_days
-                    ),
+        start = time.perf_counter()
+        market_snapshot = self._get_market_snapshot(
+            commodity.commodity.name, max_age_days
+        )
+        if market_snapshot is not None:
+            offers = await asyncio.to_thread(
+                market_snapshot.get_best_offers,
+                commodity.commodity.name,
+                mode,
+                self._get_min_market_update(max_age_days),
+                BEST_PRICES_RESULTS_COUNT,
+            )
+            timings[mode.value] = (time.perf_counter() - start) * 1000
+            return [
+                self._map_market_offer_to_model(offer, commodity, mode)
+                for offer in offers
+            ]
+
+        results = iter_spansh_search_results(
+            SPANSH_STATIONS_SEARCH_URL,
+            self._find_commodity_best_prices_generate_request_body(
+                mode, commodity.commodity.name, max_age_days
+            ),
+            omitted_fields=SPANSH_MARKET_SEARCH_OMITTED_FIELDS,
+        )
+        stations = await self._map_spansh_stations_to_model(
+            results, commodity, mode, StationLandingPadSize.SMALL
+        )
+        timings[mode.value] = (time.perf_counter() - start) * 1000
+        return stations
+
+    async def get_trade_routes(
+        self,
+        reference_system: str,
+        max_distance_in_ly: float,
+        jump_range_in_ly: float,
+        cargo_capacity: int,
+        min_landing_pad_size: StationLandingPadSize,
+        max_age_days: int,
+        round_trip: bool,
+        limit: int,
+    ) -> list[TradeRoute]:
+        """Get the most profitable trade routes near a reference system, best first.
+
+        Routes start at most max_distance_in_ly ly away from the reference system, with
+        a destination one jump away. For round trips, a commodity is also traded on the
+        way back. Will only include prices from stations where market prices where
+        updates between now and now - max_age_days.
+
+        :raises MarketSnapshotUnavailableError: The local market snapshot is not available
+        :raises SystemsIndexUnavailableError: The local systems index is not available
+        :raises SystemNotFoundException: Unable to retrieve the system
+        """
+        market_snapshot = get_market_snapshot()
+        if market_snapshot is None:
+            raise MarketSnapshotUnavailableError()
+
+        systems_index = get_systems_index()
+        if systems_index is None:
+            raise SystemsIndexUnavailableError()
+
+        reference = systems_index.get_system(reference_system)
+        if reference is None:
+            raise SystemNotFoundError(reference_system)
+
+        return await asyncio.to_thread(
+            self._get_trade_routes_from_market_snapshot,
+            market_snapshot,
+            (reference.x, reference.y, reference.z),
+            max_distance_in_ly,
+            jump_range_in_ly,
+            cargo_capacity,
+            min_landing_pad_size,
+            self._get_min_market_update(max_age_days),
+            round_trip,
+            limit,
+        )
+
+    def _get_trade_routes_from_market_snapshot(
+        self,
+        market_snapshot: MarketSnapshot,
+        origin: tuple[float, float, float],
+        max_distance_in_ly: float,
+        jump_range_in_ly: float,
+        cargo_capacity: int,
+        min_landing_pad_size: StationLandingPadSize,
+        updated_after: datetime.datetime,
+        round_trip: bool,
+        limit: int,
+    ) -> list[TradeRoute]:
+        # Destinations can be one jump further than the sources
+        quotes = market_snapshot.get_quotes_within(
+            origin,
+            max_distance_in_ly + jump_range_in_ly,
+            min_landing_pad_size,
+            updated_after,
+        )
+        distances = {
+            quote.station: math.dist(
+                origin, market_snapshot.get_station_coordinates(quote.station)
+            )
+            for commodity_quotes in quotes.values()
+            for quote in commodity_quotes
+        }
+        sources = {
+            station
+            for station, distance in distances.items()
+            if distance <= max_distance_in_ly
+        }
+
+        routes = get_best_routes(
+            quotes,
+            sources,
+            market_snapshot.get_station_coordinates,
+            jump_range_in_ly,
+            cargo_capacity,
+            round_trip,
+            limit,
+        )
+        return [
+            self._map_route_to_model(route, market_snapshot, distances)
+            for route in routes
+        ]
+
+    def _map_route_to_model(
+        self,
+        route: Route,
+        market_snapshot: MarketSnapshot,
+        distances: dict[int, float],
+    ) -> TradeRoute:
+        return TradeRoute(
+            source=self._map_market_station_to_model(
+                market_snapshot.get_station(route.source, distances[route.source])
+            ),
+            destination=self._map_market_station_to_model(
+                market_snapshot.get_station(
+                    route.destination, distances[route.destination]
                 )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+            ),
+            distance_in_ly=round(
+                math.dist(
+                    market_snapshot.get_station_coordinates(route.source),
+                    market_snapshot.get_station_coordinates(route.destination),
+                ),
+                2,
+            ),
+            trade=self._map_trade_to_model(route.trade),
+            return_trade=(
+                self._map_trade_to_model(route.return_trade)
+                if route.return_trade is not None
+                else None
+            ),
+            profit=route.profit,
+        )
+
+    def _map_market_station_to_model(
+        self, station: MarketStation
+    ) -> StationWithMarketDetails:
+        return StationWithMarketDetails(
+            distance_from_reference_system=station.distance_from_reference_system,
+            distance_to_arrival=station.distance_to_arrival,
+            is_fleet_carrier=station.is_fleet_carrier,
+            is_planetary=station.is_planetary,
+            is_settlement=is_settlement(station.type),
+            last_market_update=station.market_updated_at,
+            max_landing_pad_size=station.max_landing_pad_size,
+            name=station.name,
+            system_name=station.system_name,
+            type=station.type,
+        )
+
+    def _map_trade_to_model(self, trade: Trade) -> CommodityTrade:
+        return CommodityTrade(
+            commodity=trade.commodity_name,
+            buy_price=trade.buy_price,
+            sell_price=trade.sell_price,
+            quantity=trade.quantity,
+            profit=trade.profit,
+        )
+
+    def _get_min_market_update(self, max_age_days: int) -> datetime.datetime:
+        return datetime.datetime.now(tz=datetime.UTC) - datetime.timedelta(
+            days=max_age_days
+        )
 
-        return self._map_spansh_stations_to_model(
-            api_response, commodity, mode, StationLandingPadSize.SMALL
+    def _get_market_snapshot(
+        self, commodity_name: str, max_age_days: int
+    ) -> MarketSnapshot | None:
+        """Get the local market snapshot, if it is recent enough and has the commodity."""
+        market_snapshot = get_market_snapshot()
+        if (
+            market_snapshot is None
+            or market_snapshot.updated_at < self._get_min_market_update(max_age_days)
+            or not market_snapshot.has_commodity(commodity_name)
+        ):
+            return None
+        return market_snapshot
+
+    def _map_market_offer_to_model(
+        self,
+        offer: MarketOffer,
+        current_commodity_price: CommodityPrice,
+        mode: FindCommodityMode,
+    ) -> StationWithCommodityDetails:
+        return StationWithCommodityDetails(
+            distance_from_reference_system=offer.station.distance_from_reference_system,
+            distance_to_arrival=offer.station.distance_to_arrival,
+            is_fleet_carrier=offer.station.is_fleet_carrier,
+            is_planetary=offer.station.is_planetary,
+            is_settlement=is_settlement(offer.station.type),
+            last_market_update=offer.station.market_updated_at,
+            max_landing_pad_size=offer.station.max_landing_pad_size,
+            name=offer.station.name,
+            price=offer.price,
+            price_percentage_difference=self._get_price_difference(
+                current_commodity_price, offer.price, mode
+            ),
+            quantity=offer.quantity,
+            system_name=offer.station.system_name,
+            type=offer.station.type,
         )
 
-    def _map_spansh_stations_to_model(
+    async def _map_spansh_stations_to_model(
         self,
-        api_response: niquests.Response,
+        results: AsyncIterator[dict[str, Any]],
         current_commodity_price: CommodityPrice,
         mode: FindCommodityMode,
         min_landing_pad_size: StationLandingPadSize,
     ) -> list[StationWithCommodityDetails]:
         res: list[StationWithCommodityDetails] = []
-        for item in api_response.json()["results"]:
+        async for item in results:
             commodity_in_market = next(
                 market_item
                 for market_item in item["market"]
@@ -304,7 +580,7 @@ class CommoditiesService:
                     distance_from_reference_system=item["distance"],
                     distance_to_arrival=item["distance_to_arrival"],
                     is_planetary=item["is_planetary"],
-                    last_market_update=parse(item["market_updated_at"])
+                    last_market_update=parse_timestamp(item["market_updated_at"])
                     if item.get("market_updated_at")
                     else None,  # type: ignore
                     max_landing_pad_size=station_landing_pad_size,
@@ -1,7 +1,5 @@
 import datetime
 
-from cachier import cachier
-from dateutil.parser import parse
 from loguru import logger
 
 from app import __version__
@@ -9,15 +7,19 @@ from app.config import DEBUG, INARA_API_KEY
 from app.database.community_goal_status import CommunityGoalStatus
 from app.database.database import Session
 from app.helpers.fcm import send_fcm_notification
-from app.helpers.niquests import get_niquests_session
+from app.helpers.niquests import get_shared_async_niquests_session
 from app.models.community_goals import CommunityGoal
 from app.models.exceptions import ContentFetchingError
+from app.services.helpers.cache import async_cached
+from app.services.helpers.timestamps import parse_timestamp
 
+INARA_API_URL = "https://inara.cz/inapi/v1/"
 INARA_STATUS_OK = 200
+COMMUNITY_GOALS_TTL = datetime.timedelta(minutes=10)
 
 
-@cachier(stale_after=datetime.timedelta(minutes=10))
-def _get_community_goals_from_inara() -> dict:
+@async_cached(ttl=COMMUNITY_GOALS_TTL, stale_ttl=COMMUNITY_GOALS_TTL)
+async def _get_community_goals_from_inara() -> dict:
     request_body = {
         "header": {
             "appName": "EDCompanion",
@@ -35,16 +37,20 @@ def _get_community_goals_from_inara() -> dict:
     }
 
     # Get API
-    with get_niquests_session() as session:
-        res = session.post("https://inara.cz/inapi/v1/", json=request_body)
+    session = get_shared_async_niquests_session(INARA_API_URL)
+    res = await session.post(INARA_API_URL, json=request_body)
 
     return res.json()
 
 
 class CommunityGoalsService:
-    def get_community_goals(self) -> list[CommunityGoal]:
+    async def refresh_community_goals(self) -> None:
+        """Refresh the cached community goals, ahead of their expiration."""
+        await _get_community_goals_from_inara.refresh()
+
+    async def get_community_goals(self) -> list[CommunityGoal]:
         """Get latest community goals informations."""
-        inara_res: dict = _get_community_goals_from_inara()  # type: ignore (cachier wrapper looses type hints)
+        inara_res = await _get_community_goals_from_inara()
         if (
             inara_res.get("header", {}).get("eventStatus", None) != INARA_STATUS_OK
             and inara_res.get("events", [{}])[0].get("eventStatus") != INARA_STATUS_OK
@@ -60,8 +66,8 @@ class CommunityGoalsService:
                 contributors=event["contributorsNum"],
                 current_tier=event["tierReached"],
                 description=event["goalDescriptionText"],
-                end_date=parse(event["goalExpiry"]),
-                last_update=parse(event["lastUpdate"]),
+                end_date=parse_timestamp(event["goalExpiry"]),
+                last_update=parse_timestamp(event["lastUpdate"]),
                 objective=event["goalObjectiveText"],
                 ongoing=not event["isCompleted"],
                 reward=event["goalRewardText"],
@@ -165,12 +171,12 @@ class CommunityGoalsService:
                 db_item.current_tier = item.current_tier
                 db_item.title = item.title
 
-    def send_notifications(self) -> None:
+    async def send_notifications(self) -> None:
         """Send a FCM notification with CGs changes."""
         logger.info("Checking for CGs changes...")
 
         # First get latest data
-        goals: list[CommunityGoal] = self.get_community_goals()
+        goals: list[CommunityGoal] = await self.get_community_goals()
         data_to_save = [
             CommunityGoalStatus(
                 id=goal.id,
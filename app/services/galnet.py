@@ -1,15 +1,73 @@
+import asyncio
+import base64
+import binascii
+import datetime
+
 import niquests
-from dateutil.parser import parse
+from loguru import logger
+from sqlalchemy import and_, func, or_, select
 
+from app.database.database import Session
+from app.database.galnet_article import StoredGalnetArticle
 from app.helpers.frontier import get_frontier_api_url_for_language
-from app.helpers.niquests import get_async_niquests_session
-from app.models.exceptions import ContentFetchingError
-from app.models.galnet import GalnetArticle
+from app.helpers.html_text import get_text_from_html
+from app.helpers.jsonapi import JsonApiDocument, JsonApiResource, get_published_at
+from app.helpers.niquests import get_shared_async_niquests_session
+from app.models.exceptions import ContentFetchingError, InvalidCursorError
+from app.models.galnet import GalnetArticle, GalnetArticlesPage
 from app.models.language import Language
+from app.services.helpers.article_search import (
+    get_search_terms,
+    search_articles,
+    store_articles,
+)
+
+GALNET_TTL = datetime.timedelta(minutes=10)
+
+
+def _encode_cursor(article: StoredGalnetArticle) -> str:
+    """Get the cursor of the page following the given article."""
+    value = f"{article.published_at.isoformat()}|{article.id}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime.datetime, str]:
+    """Get the publication date and id of the last article of the previous page.
+
+    :raises InvalidCursorError: The cursor is not one returned by the API
+    """
+    try:
+        published_at, article_id = (
+            base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        )
+        return datetime.datetime.fromisoformat(published_at), article_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError() from e
+
+
+def _get_stored_article(
+    item: JsonApiResource, language: Language
+) -> StoredGalnetArticle:
+    """Get the article to store from a CMS article."""
+    content = item["attributes"]["body"]["value"]
+    return StoredGalnetArticle(
+        title=item["attributes"]["title"],
+        content=content,
+        plain_content=get_text_from_html(content),
+        slug=item["attributes"]["field_slug"],
+        picture_name=item["attributes"]["field_galnet_image"],
+        published_at=get_published_at(item),
+        id=item["id"],
+        language=language.value,
+    )
 
 
 class GalnetService:
-    """Main class for the Galnet service."""
+    """Main class for the Galnet service.
+
+    Articles are served from the local store (filled by sync_articles()) when it has
+    articles for the language, else from the Frontier CMS.
+    """
 
     BASE_PICTURE_PATH = "http://hosting.zaonce.net/elite-dangerous/galnet"
     NUMBER_OF_ARTICLES = 50
@@ -20,41 +78,214 @@ class GalnetService:
         """
         return (page - 1) * self.NUMBER_OF_ARTICLES
 
-    async def get_articles(self, language: Language, page: int) -> list[GalnetArticle]:
+    def _get_picture_url(self, picture_name: str | None) -> str:
+        # Get picture, if null default to neutral one
+        picture_name = picture_name or "NewsImageDiplomacyPressConference"
+        return f"{self.BASE_PICTURE_PATH}/{picture_name}.png"
+
+    def _get_article(self, article: StoredGalnetArticle) -> GalnetArticle:
+        return GalnetArticle(
+            content=article.content,
+            uri=f"https://www.elitedangerous.com/news/galnet/{article.slug}",
+            title=article.title,
+            published_date=article.published_at.date(),
+            picture=self._get_picture_url(article.picture_name),
+        )
+
+    def _get_article_from_cms(self, item: JsonApiResource) -> GalnetArticle:
+        attributes = item["attributes"]
+        return GalnetArticle(
+            content=attributes["body"]["value"],
+            uri=f"https://www.elitedangerous.com/news/galnet/{attributes['field_slug']}",
+            title=attributes["title"],
+            published_date=get_published_at(item).date(),
+            picture=self._get_picture_url(attributes["field_galnet_image"]),
+        )
+
+    async def get_articles(
+        self, language: Language, page: int, cursor: str | None = None
+    ) -> GalnetArticlesPage:
         """Get the latest Galnet articles.
 
+        Pages are selected with the cursor returned with the previous page, or with
+        their number if there is no cursor.
+
+        :raises ContentFetchingException: Unable to retrieve the articles
+        :raises InvalidCursorError: The cursor is not one returned by the API
+        """
+        after = None if cursor is None else _decode_cursor(cursor)
+        stored_articles = await asyncio.to_thread(
+            self._get_stored_articles, language, page, after
+        )
+        if stored_articles is None:
+            return GalnetArticlesPage(
+                articles=await self._get_articles_from_cms(
+                    language, self._get_offset_for_articles(page)
+                ),
+                next_cursor=None,
+            )
+
+        next_cursor = (
+            _encode_cursor(stored_articles[-1])
+            if len(stored_articles) == self.NUMBER_OF_ARTICLES
+            else None
+        )
+        return GalnetArticlesPage(
+            articles=[self._get_article(article) for article in stored_articles],
+            next_cursor=next_cursor,
+        )
+
+    def _get_stored_articles(
+        self,
+        language: Language,
+        page: int,
+        after: tuple[datetime.datetime, str] | None,
+    ) -> list[StoredGalnetArticle] | None:
+        """Get a page of articles from the local store, or None if it is empty."""
+        query = (
+            select(StoredGalnetArticle)
+            .where(StoredGalnetArticle.language == language.value)
+            .order_by(
+                StoredGalnetArticle.published_at.desc(), StoredGalnetArticle.id.desc()
+            )
+            .limit(self.NUMBER_OF_ARTICLES)
+        )
+        if after is None:
+            query = query.offset(self._get_offset_for_articles(page))
+        else:
+            # Keyset pagination: articles after the last one of the previous page
+            published_at, article_id = after
+            query = query.where(
+                or_(
+                    StoredGalnetArticle.published_at < published_at,
+                    and_(
+                        StoredGalnetArticle.published_at == published_at,
+                        StoredGalnetArticle.id < article_id,
+                    ),
+                )
+            )
+
+        with Session() as session:
+            articles = list(session.scalars(query))
+
+        if not articles and self._get_latest_published_at(language) is None:
+            return None
+        return articles
+
+    def _get_latest_published_at(self, language: Language) -> datetime.datetime | None:
+        """Get the publication date of the latest stored article."""
+        with Session() as session:
+            return session.scalar(
+                select(func.max(StoredGalnetArticle.published_at)).where(
+                    StoredGalnetArticle.language == language.value
+                )
+            )
+
+    async def _get_articles_page_from_cms(
+        self,
+        language: Language,
+        offset: int,
+        published_since: datetime.datetime | None = None,
+        oldest_first: bool = False,
+    ) -> list[JsonApiResource]:
+        """Get a page of articles from the CMS, newest first (unless oldest_first).
+
         :raises ContentFetchingException: Unable to retrieve the articles
         """
+        sort = "published_at" if oldest_first else "-published_at"
         url = (
-            f"{get_frontier_api_url_for_language(language)}/galnet_article?&sort=-published_at"
-            f"&page[offset]={self._get_offset_for_articles(page)}&page[limit]={self.NUMBER_OF_ARTICLES}"
+            f"{get_frontier_api_url_for_language(language)}/galnet_article?&sort={sort}"
+            f"&page[offset]={offset}&page[limit]={self.NUMBER_OF_ARTICLES}"
         )
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.get(url)
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        if published_since is not None:
+            url += (
+                "&filter[since][condition][path]=published_at"
+                "&filter[since][condition][operator]=%3E%3D"
+                f"&filter[since][condition][value]={published_since.isoformat()}Z"
+            )
 
-        articles = api_response.json()
+        session = get_shared_async_niquests_session(url)
+        try:
+            api_response = await session.get(url)
+            api_response.raise_for_status()
+        except niquests.exceptions.RequestException as e:
+            raise ContentFetchingError() from e
 
-        # Build response
-        response_list: list[GalnetArticle] = []
+        return JsonApiDocument(api_response.json()).data
 
-        # Get picture, if null default to neutral one
+    async def _get_articles_from_cms(
+        self, language: Language, offset: int
+    ) -> list[GalnetArticle]:
+        """Get a page of articles from the CMS.
 
-        for item in articles["data"]:
-            picture_name = (
-                item["attributes"]["field_galnet_image"]
-                or "NewsImageDiplomacyPressConference"
+        :raises ContentFetchingException: Unable to retrieve the articles
+        """
+        items = await self._get_articles_page_from_cms(language, offset)
+        return [self._get_article_from_cms(item) for item in items]
+
+    async def sync_articles(self, language: Language) -> int:
+        """Store the articles published since the latest stored one, and return their count.
+
+        :raises ContentFetchingException: Unable to retrieve the articles
+        """
+        published_since = await asyncio.to_thread(
+            self._get_latest_published_at, language
+        )
+
+        # Articles published at the same time as the latest one are fetched again.
+        # Pages are fetched oldest first, so that if one cannot be fetched, the next
+        # sync starts from the articles it has.
+        stored_count = 0
+        offset = 0
+        while True:
+            items = await self._get_articles_page_from_cms(
+                language, offset, published_since, oldest_first=True
             )
-            new_item = GalnetArticle(
-                content=item["attributes"]["body"]["value"],
-                uri=f"https://www.elitedangerous.com/news/galnet/{item['attributes']['field_slug']}",
-                title=item["attributes"]["title"],
-                published_date=parse(item["attributes"]["published_at"]).date(),  # type: ignore
-                picture=f"{self.BASE_PICTURE_PATH}/{picture_name}.png",
+            await asyncio.to_thread(self._store_articles, items, language)
+            stored_count += len(items)
+
+            if len(items) < self.NUMBER_OF_ARTICLES:
+                break
+            offset += self.NUMBER_OF_ARTICLES
+
+        logger.info(f"{stored_count} Galnet articles synced for {language.value}")
+        return stored_count
+
+    def _store_articles(self, items: list[JsonApiResource], language: Language) -> None:
+        with Session.begin() as session:
+            store_articles(
+                session,
+                StoredGalnetArticle,
+                [_get_stored_article(item, language) for item in items],
             )
-            response_list.append(new_item)
 
-        return response_list
+    async def search_articles(
+        self,
+        query: str,
+        language: Language,
+        published_after: datetime.date | None,
+        published_before: datetime.date | None,
+        page: int,
+    ) -> list[GalnetArticle]:
+        """Search the stored Galnet articles, best matches first."""
+        terms = get_search_terms(query)
+        if not terms:
+            return []
+
+        def search() -> list[GalnetArticle]:
+            with Session() as session:
+                return [
+                    self._get_article(article)
+                    for article in search_articles(
+                        session,
+                        StoredGalnetArticle,
+                        terms,
+                        language,
+                        published_after,
+                        published_before,
+                        limit=self.NUMBER_OF_ARTICLES,
+                        offset=self._get_offset_for_articles(page),
+                    )
+                ]
+
+        return await asyncio.to_thread(search)
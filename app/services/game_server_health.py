@@ -1,8 +1,22 @@
+import datetime
+
 import niquests
 from loguru import logger
 
-from app.helpers.niquests import get_async_niquests_session
+from app.helpers.niquests import get_shared_async_niquests_session
 from app.models.game_server_health import GameServerHealth
+from app.services.helpers.cache import async_cached
+
+GAME_SERVER_HEALTH_URL = "https://ed-server-status.orerve.net/"
+GAME_SERVER_HEALTH_TTL = datetime.timedelta(minutes=1)
+
+
+@async_cached(ttl=GAME_SERVER_HEALTH_TTL, stale_ttl=GAME_SERVER_HEALTH_TTL)
+async def _get_game_server_status() -> str:
+    session = get_shared_async_niquests_session(GAME_SERVER_HEALTH_URL)
+    api_response = await session.get(GAME_SERVER_HEALTH_URL)
+    api_response.raise_for_status()
+    return api_response.json()["status"]
 
 
 class GameServerHealthService:
@@ -13,14 +27,14 @@ class GameServerHealthService:
 
         :raises ContentFetchingException: Unable to retrieve the health
         """
-        url = "https://ed-server-status.orerve.net/"
+        try:
+            status = await _get_game_server_status()
+        except niquests.exceptions.RequestException:
+            logger.opt(exception=True).warning("Could not fetch game server health")
+            return GameServerHealth(status="Unknown")
 
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.get(url)
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException:
-                logger.opt(exception=True).warning("Could not fetch game server health")
-                return GameServerHealth(status="Unknown")
+        return GameServerHealth(status=status)
 
-        return GameServerHealth(status=api_response.json()["status"])
+    async def refresh_game_server_health(self) -> None:
+        """Refresh the cached game server health, ahead of its expiration."""
+        await _get_game_server_status.refresh()
@@ -0,0 +1,108 @@
+import datetime
+import re
+
+from sqlalchemy import and_, column, literal_column, or_, select, table, tuple_
+from sqlalchemy.orm import Session as DatabaseSession
+
+from app.database.full_text_search import get_full_text_search_table_name
+from app.database.galnet_article import StoredGalnetArticle
+from app.database.news_article import StoredNewsArticle
+from app.models.language import Language
+
+TERM_REGEX = re.compile(r"\w+")
+
+# Weight of the title compared to the content when ranking matches
+TITLE_WEIGHT = 10.0
+
+
+def get_search_terms(query: str) -> list[str]:
+    """Get the words to search for in a query, ignoring punctuation and operators."""
+    return TERM_REGEX.findall(query)
+
+
+def store_articles[T: (StoredGalnetArticle, StoredNewsArticle)](
+    session: DatabaseSession, model: type[T], articles: list[T]
+) -> None:
+    """Add the articles, or update the stored ones with the same id and language."""
+    if not articles:
+        return
+
+    stored_articles = {
+        (article.id, article.language): article
+        for article in session.scalars(
+            select(model).where(
+                tuple_(model.id, model.language).in_(
+                    [(article.id, article.language) for article in articles]
+                )
+            )
+        )
+    }
+    for article in articles:
+        stored_article = stored_articles.get((article.id, article.language))
+        if stored_article is None:
+            session.add(article)
+            stored_articles[article.id, article.language] = article
+            continue
+
+        for table_column in model.__table__.columns:
+            if not table_column.primary_key:
+                setattr(
+                    stored_article, table_column.key, getattr(article, table_column.key)
+                )
+
+
+def search_articles[T: (StoredGalnetArticle, StoredNewsArticle)](
+    session: DatabaseSession,
+    model: type[T],
+    terms: list[str],
+    language: Language,
+    published_after: datetime.date | None,
+    published_before: datetime.date | None,
+    limit: int,
+    offset: int,
+) -> list[T]:
+    """Get the stored articles containing all the terms, best matches first.
+
+    On SQLite, articles are matched with their full-text index and ranked with BM25
+    (title matches weighting more than content ones). On other databases, they are
+    matched with LIKE, title matches first then most recent first.
+    """
+    filters = [model.language == language.value]
+    if published_after is not None:
+        filters.append(model.published_at >= published_after)
+    if published_before is not None:
+        filters.append(
+            model.published_at < published_before + datetime.timedelta(days=1)
+        )
+
+    if session.get_bind().dialect.name == "sqlite":
+        fts_table_name = get_full_text_search_table_name(model.__tablename__)
+        fts_table = table(fts_table_name, column("rowid"))
+        # Quote each term so that it is not parsed as an FTS5 operator, and match
+        # words starting with it (like LIKE does)
+        match_query = " ".join(f'"{term}"*' for term in terms)
+        rank = literal_column(f"bm25({fts_table_name}, {TITLE_WEIGHT}, 1.0)")
+        query = (
+            select(model)
+            .join(fts_table, fts_table.c.rowid == model.search_id)
+            .where(literal_column(fts_table_name).op("MATCH")(match_query), *filters)
+            .order_by(rank, model.published_at.desc())
+        )
+    else:
+        filters.extend(
+            or_(
+                model.title.icontains(term, autoescape=True),
+                model.plain_content.icontains(term, autoescape=True),
+            )
+            for term in terms
+        )
+        title_matches = and_(
+            *(model.title.icontains(term, autoescape=True) for term in terms)
+        )
+        query = (
+            select(model)
+            .where(*filters)
+            .order_by(title_matches.desc(), model.published_at.desc())
+        )
+
+    return list(session.scalars(query.limit(limit).offset(offset)))
@@ -0,0 +1,432 @@
+import asyncio
+import contextlib
+import contextvars
+import dataclasses
+import datetime
+import functools
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Collection, Iterator
+
+from loguru import logger
+
+from app import __version__
+from app.config import CACHE_BACKEND, CACHE_DIRECTORY, CACHE_MAX_ENTRIES
+from app.services.helpers.cache_backends import (
+    CacheBackend,
+    CacheEntry,
+    get_cache_backend,
+)
+
+# Bump when the classes of cached values change without a new app version
+CACHE_SCHEMA_VERSION = 1
+
+
+@dataclasses.dataclass(slots=True)
+class CachedValuesUsage:
+    """Cached values used to compute a result (e.g. a response)."""
+
+    keys: set[str] = dataclasses.field(default_factory=set)
+    # Until when all of them are fresh, so is the result
+    expires_at: float = math.inf
+
+    def add(self, key: str, expires_at: float) -> None:
+        """Record the use of the value of a key, fresh until expires_at."""
+        self.keys.add(key)
+        self.expires_at = min(self.expires_at, expires_at)
+
+
+_cached_values_usage: contextvars.ContextVar[CachedValuesUsage | None] = (
+    contextvars.ContextVar("cached_values_usage", default=None)
+)
+
+
+@contextlib.contextmanager
+def track_cached_values_usage() -> Iterator[CachedValuesUsage]:
+    """Record the cached values used in the block (by all the AsyncCache instances)."""
+    usage = CachedValuesUsage()
+    token = _cached_values_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _cached_values_usage.reset(token)
+
+
+def _record_cached_value_usage(key: str, expires_at: float) -> None:
+    usage = _cached_values_usage.get()
+    if usage is not None:
+        usage.add(key, expires_at)
+
+
+class AsyncCache:
+    """Asyncio-aware cache with an in-memory LRU and an optional second tier.
+
+    - Concurrent misses on a key share the same upstream call (single-flight)
+    - Expired entries are still returned during their stale period while they are
+      refreshed in the background (stale-while-revalidate)
+    - With a backend shared between workers, an entry refreshed by a worker is used by
+      the others, and only the worker owning the refresh lease calls the upstream API
+    - Results built from an entry can be dropped when it is replaced or invalidated,
+      with invalidation callbacks
+    """
+
+    REFRESHES_KEY_PREFIX = "refreshes:"
+
+    REFRESH_LEASE_DURATION = 30
+    REFRESH_POLL_INTERVAL = 0.2
+
+    def __init__(self, max_entries: int, backend: CacheBackend | None = None) -> None:
+        self.enabled = True
+        self.max_entries = max_entries
+        self.backend = backend
+        # Values are pickled in the backend, so those stored by another version of
+        # the app (with different classes) are not loaded
+        self.backend_key_prefix = f"{__version__}.{CACHE_SCHEMA_VERSION}:"
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._pending_fetches: dict[str, asyncio.Task] = {}
+        # Fetches with a caller waiting for their result (or error)
+        self._awaited_fetches: set[asyncio.Task] = set()
+        self._invalidation_callbacks: list[Callable[[str], None]] = []
+
+    async def get_or_fetch[T](
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[T]],
+        ttl: datetime.timedelta,
+        stale_ttl: datetime.timedelta = datetime.timedelta(),
+    ) -> T:
+        """Get the value for the key, calling fetch if it is missing or expired."""
+        if not self.enabled:
+            return await fetch()
+
+        now = time.time()
+        entry = await self._get_entry(key)
+        if entry is not None and entry.is_fresh(now):
+            _record_cached_value_usage(key, entry.stored_at + entry.ttl)
+            return entry.value
+
+        task = self._get_fetch_task(key, fetch, ttl, stale_ttl, force=False)
+        if entry is not None and entry.is_usable(now):
+            # The value is already stale
+            _record_cached_value_usage(key, now)
+            return entry.value
+
+        value = await self._wait_for_fetch(task)
+        self._record_fetched_value_usage(key, ttl)
+        return value
+
+    async def refresh[T](
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[T]],
+        ttl: datetime.timedelta,
+        stale_ttl: datetime.timedelta = datetime.timedelta(),
+    ) -> T:
+        """Fetch and store the value for the key, even if the current one is fresh."""
+        value = await self._wait_for_fetch(
+            self._get_fetch_task(key, fetch, ttl, stale_ttl, force=True)
+        )
+        self._record_fetched_value_usage(key, ttl)
+        return value
+
+    def _record_fetched_value_usage(self, key: str, ttl: datetime.timedelta) -> None:
+        entry = self._entries.get(key)
+        _record_cached_value_usage(
+            key,
+            entry.stored_at + entry.ttl
+            if entry is not None
+            else time.time() + ttl.total_seconds(),
+        )
+
+    async def _wait_for_fetch[T](self, task: asyncio.Task[T]) -> T:
+        self._awaited_fetches.add(task)
+        # Shield so that a cancelled request does not cancel the fetch for others
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: str) -> None:
+        """Remove the key from the memory tier."""
+        self._entries.pop(key, None)
+        self._call_invalidation_callbacks(key)
+
+    def add_invalidation_callback(self, callback: Callable[[str], None]) -> None:
+        """Call callback with the keys of the entries replaced or invalidated."""
+        self._invalidation_callbacks.append(callback)
+
+    def _call_invalidation_callbacks(self, key: str) -> None:
+        for callback in self._invalidation_callbacks:
+            try:
+                callback(key)
+            except Exception:
+                logger.opt(exception=True).warning(
+                    f"Invalidation callback failed for cache entry {key}"
+                )
+
+    async def announce_refreshes(self, name: str, keys: Collection[str]) -> None:
+        """Let the other workers know that the entries of the keys were refreshed.
+
+        They drop their older copies of the entries with sync_refreshes(name). Each
+        name should only be announced by a single worker at a time.
+        """
+        refreshed_at = {
+            key: entry.stored_at
+            for key in keys
+            if (entry := self._entries.get(key)) is not None
+        }
+        if self.backend is None or not refreshed_at:
+            return
+
+        await self._store_in_backend(
+            self.REFRESHES_KEY_PREFIX + name,
+            CacheEntry(value=refreshed_at, stored_at=time.time(), ttl=0, stale_ttl=0),
+        )
+
+    async def sync_refreshes(self, name: str) -> None:
+        """Drop the entries older than those announced by announce_refreshes(name).
+
+        They are then read again from the backend.
+        """
+        if self.backend is None:
+            return
+
+        refreshes = await self._get_entry_from_backend(self.REFRESHES_KEY_PREFIX + name)
+        if refreshes is None:
+            return
+
+        for key, refreshed_at in refreshes.value.items():
+            entry = self._entries.get(key)
+            if entry is not None and entry.stored_at < refreshed_at:
+                self.invalidate(key)
+
+    async def remove_outdated_backend_entries(self) -> None:
+        """Remove the entries stored in the backend by other versions of the app."""
+        if self.backend is None:
+            return
+
+        try:
+            await self.backend.remove_outdated_entries(self.backend_key_prefix)
+        except Exception:
+            logger.opt(exception=True).warning(
+                "Could not remove outdated cache entries"
+            )
+
+    async def _get_entry(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+
+        entry = await self._get_entry_from_backend(key)
+        if entry is not None:
+            self._store_in_memory(key, entry)
+        return entry
+
+    async def _get_entry_from_backend(self, key: str) -> CacheEntry | None:
+        if self.backend is None:
+            return None
+
+        try:
+            return await self.backend.get(self.backend_key_prefix + key)
+        except Exception:
+            logger.opt(exception=True).warning(f"Could not read cache entry {key}")
+            return None
+
+    def _store_in_memory(self, key: str, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_fetch_task[T](
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[T]],
+        ttl: datetime.timedelta,
+        stale_ttl: datetime.timedelta,
+        force: bool,
+    ) -> asyncio.Task[T]:
+        """Get the running fetch for the key, or start a new one."""
+        task = self._pending_fetches.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch, ttl, stale_ttl, force))
+            self._pending_fetches[key] = task
+            task.add_done_callback(functools.partial(self._on_fetch_done, key))
+        return task
+
+    async def _fetch[T](
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[T]],
+        ttl: datetime.timedelta,
+        stale_ttl: datetime.timedelta,
+        force: bool,
+    ) -> T:
+        if self.backend is None:
+            return await self._fetch_and_store(key, fetch, ttl, stale_ttl)
+
+        fetch_started_at = time.time()
+
+        # Another worker may already have refreshed the entry
+        if not force:
+            entry = await self._get_entry_from_backend(key)
+            if entry is not None and entry.is_fresh(fetch_started_at):
+                self._store_in_memory(key, entry)
+                return entry.value
+
+        # Else refresh it, unless another worker is already doing it
+        if not await self._acquire_refresh_lease(key):
+            entry = await self._wait_for_refresh(key, fetch_started_at)
+            if entry is not None:
+                return entry.value
+
+        # The lease is ours, or the other worker did not complete the refresh in time
+        try:
+            return await self._fetch_and_store(key, fetch, ttl, stale_ttl)
+        finally:
+            await self._release_refresh_lease(key)
+
+    async def _wait_for_refresh(
+        self, key: str, refresh_started_at: float
+    ) -> CacheEntry | None:
+        """Wait for another worker to store a new entry for the key.
+
+        Return None if the other worker released the lease without storing an entry
+        (the lease is then acquired), or if it did not complete the refresh in time.
+        """
+        deadline = refresh_started_at + self.REFRESH_LEASE_DURATION
+        while time.time() < deadline:
+            await asyncio.sleep(self.REFRESH_POLL_INTERVAL)
+            entry = await self._get_entry_from_backend(key)
+            if entry is not None and entry.stored_at >= refresh_started_at:
+                self._store_in_memory(key, entry)
+                return entry
+
+            # The refresh of the other worker failed
+            if await self._acquire_refresh_lease(key):
+                return None
+
+        logger.warning(f"Refresh of cache entry {key} by another worker timed out")
+        return None
+
+    async def _acquire_refresh_lease(self, key: str) -> bool:
+        if self.backend is None:
+            return True
+
+        try:
+            return await self.backend.acquire_refresh_lease(
+                key, self.REFRESH_LEASE_DURATION
+            )
+        except Exception:
+            logger.opt(exception=True).warning(f"Could not get lease for {key}")
+            return True
+
+    async def _release_refresh_lease(self, key: str) -> None:
+        if self.backend is None:
+            return
+
+        try:
+            await self.backend.release_refresh_lease(key)
+        except Exception:
+            logger.opt(exception=True).warning(f"Could not release lease for {key}")
+
+    async def _fetch_and_store[T](
+        self,
+        key: str,
+        fetch: Callable[[], Awaitable[T]],
+        ttl: datetime.timedelta,
+        stale_ttl: datetime.timedelta,
+    ) -> T:
+        value = await fetch()
+        entry = CacheEntry(
+            value=value,
+            stored_at=time.time(),
+            ttl=ttl.total_seconds(),
+            stale_ttl=stale_ttl.total_seconds(),
+        )
+        self._store_in_memory(key, entry)
+        self._call_invalidation_callbacks(key)
+        await self._store_in_backend(key, entry)
+        return value
+
+    async def _store_in_backend(self, key: str, entry: CacheEntry) -> None:
+        if self.backend is None:
+            return
+
+        try:
+            await self.backend.set(self.backend_key_prefix + key, entry)
+        except Exception:
+            logger.opt(exception=True).warning(f"Could not write cache entry {key}")
+
+    def _on_fetch_done(self, key: str, task: asyncio.Task) -> None:
+        self._pending_fetches.pop(key, None)
+        is_awaited = task in self._awaited_fetches
+        self._awaited_fetches.discard(task)
+
+        # Log errors of background refreshes, that nobody is waiting for
+        if not is_awaited and not task.cancelled() and task.exception() is not None:
+            logger.opt(exception=task.exception()).warning(
+                f"Could not fetch value for cache entry {key}"
+            )
+
+
+services_cache = AsyncCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    backend=get_cache_backend(CACHE_BACKEND, CACHE_DIRECTORY),
+)
+
+
+class CachedFunction[**P, T]:
+    """Async function with its results cached, keyed on its arguments."""
+
+    def __init__(
+        self,
+        function: Callable[P, Awaitable[T]],
+        ttl: datetime.timedelta,
+        stale_ttl: datetime.timedelta,
+        cache: AsyncCache,
+    ) -> None:
+        functools.update_wrapper(self, function)
+        self.function = function
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cache = cache
+        self._prefix = f"{function.__module__}.{function.__qualname__}"
+
+    def _get_key(self, args: tuple, kwargs: dict) -> str:
+        return f"{self._prefix}:{args!r}:{sorted(kwargs.items())!r}"
+
+    async def __call__(self, *args: P.args, **kwargs: P.kwargs) -> T:
+        """Get the cached result, calling the function if it is missing or expired."""
+        return await self.cache.get_or_fetch(
+            self._get_key(args, kwargs),
+            lambda: self.function(*args, **kwargs),
+            self.ttl,
+            self.stale_ttl,
+        )
+
+    async def refresh(self, *args: P.args, **kwargs: P.kwargs) -> T:
+        """Call the function and cache its result, even if the cached one is fresh."""
+        return await self.cache.refresh(
+            self._get_key(args, kwargs),
+            lambda: self.function(*args, **kwargs),
+            self.ttl,
+            self.stale_ttl,
+        )
+
+
+def async_cached[**P, T](
+    ttl: datetime.timedelta,
+    stale_ttl: datetime.timedelta = datetime.timedelta(),
+    cache: AsyncCache = services_cache,
+) -> Callable[[Callable[P, Awaitable[T]]], CachedFunction[P, T]]:
+    """Cache the results of an async function, keyed on its arguments.
+
+    Results are fresh for ttl, then served for stale_ttl more while being refreshed.
+    The decorated function has a refresh() method to update its cached result ahead of
+    its expiration.
+    """
+
+    def decorator(function: Callable[P, Awaitable[T]]) -> CachedFunction[P, T]:
+        return CachedFunction(function, ttl, stale_ttl, cache)
+
+    return decorator
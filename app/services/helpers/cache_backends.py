@@ -0,0 +1,347 @@
+import asyncio
+import dataclasses
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Protocol, cast
+
+import aiofiles
+import aiofiles.os
+from sqlalchemy import CursorResult, delete, update
+from sqlalchemy.exc import IntegrityError
+
+from app.database.cache import CachedValue, CacheLease
+from app.database.database import Session
+
+
+class InvalidCacheBackendError(Exception):
+    def __init__(self, name: str) -> None:
+        """Init the exception."""
+        super().__init__(
+            f"Invalid cache backend {name} (should be memory, disk, mmap or database, "
+            "CACHE_DIRECTORY being required for disk and mmap)"
+        )
+
+
+@dataclasses.dataclass(slots=True)
+class CacheEntry:
+    value: Any
+    stored_at: float
+    ttl: float
+    stale_ttl: float
+
+    def is_fresh(self, now: float) -> bool:
+        """Check if the entry can be used as-is."""
+        return now < self.stored_at + self.ttl
+
+    def is_usable(self, now: float) -> bool:
+        """Check if the entry can be used while it is being refreshed."""
+        return now < self.stored_at + self.ttl + self.stale_ttl
+
+
+class CacheBackend(Protocol):
+    """Second tier of the cache, used when an entry is not in memory.
+
+    Backends shared between workers also coordinate refreshes with leases, so that
+    only one worker calls the upstream API for a given key at a time.
+    """
+
+    async def get(self, key: str) -> CacheEntry | None:
+        """Get an entry, or None if it does not exist."""
+        ...
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry."""
+        ...
+
+    async def remove_outdated_entries(self, key_prefix: str) -> None:
+        """Remove the entries whose key does not start with key_prefix."""
+        ...
+
+    async def acquire_refresh_lease(self, key: str, duration: float) -> bool:
+        """Try to become the owner of the refresh of a key for at most duration seconds."""
+        ...
+
+    async def renew_refresh_lease(self, key: str, duration: float) -> bool:
+        """Keep a lease for duration more seconds, return False if it was lost."""
+        ...
+
+    async def release_refresh_lease(self, key: str) -> None:
+        """Release a lease acquired with acquire_refresh_lease()."""
+        ...
+
+
+def _get_file_name(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _get_temporary_path(path: Path) -> Path:
+    """Get a path to write a file before renaming it, unique to the writer."""
+    return path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+
+
+class DiskCacheBackend:
+    """Store the cache entries as pickle files in a directory.
+
+    Meant for a single worker: refreshes are not coordinated.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    async def get(self, key: str) -> CacheEntry | None:
+        """Get an entry, or None if it does not exist."""
+        try:
+            async with aiofiles.open(
+                self.directory / _get_file_name(key), "rb"
+            ) as cache_file:
+                content = await cache_file.read()
+        except FileNotFoundError:
+            return None
+
+        # Files are only written by set() below
+        return pickle.loads(content)  # noqa: S301
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry."""
+        path = self.directory / _get_file_name(key)
+        temporary_path = _get_temporary_path(path)
+        async with aiofiles.open(temporary_path, "wb") as cache_file:
+            await cache_file.write(pickle.dumps(entry))
+        await aiofiles.os.replace(temporary_path, path)
+
+    async def remove_outdated_entries(self, key_prefix: str) -> None:
+        """Nothing to remove, as the keys cannot be told from the file names."""
+
+    async def acquire_refresh_lease(self, key: str, duration: float) -> bool:
+        """Always succeed, as the directory is not shared."""
+        return True
+
+    async def renew_refresh_lease(self, key: str, duration: float) -> bool:
+        """Always succeed, as the directory is not shared."""
+        return True
+
+    async def release_refresh_lease(self, key: str) -> None:
+        """Nothing to release."""
+
+
+class MmapCacheBackend:
+    """Store the cache entries in memory-mapped files shared by the workers of a node.
+
+    Each file starts with the entry metadata, so that it can be checked without
+    unpickling the value. Leases are file locks, released automatically by the
+    system if the worker owning them dies.
+    """
+
+    HEADER = struct.Struct("<ddd")  # stored_at, ttl, stale_ttl
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._leases: dict[str, int] = {}
+
+    async def get(self, key: str) -> CacheEntry | None:
+        """Get an entry, or None if it does not exist."""
+        return await asyncio.to_thread(self._get, key)
+
+    def _get(self, key: str) -> CacheEntry | None:
+        try:
+            cache_file = open(self.directory / _get_file_name(key), "rb")
+        except FileNotFoundError:
+            return None
+
+        with cache_file:
+            if os.fstat(cache_file.fileno()).st_size <= self.HEADER.size:
+                return None
+
+            with mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                stored_at, ttl, stale_ttl = self.HEADER.unpack_from(mapping)
+                with memoryview(mapping) as view:
+                    # Files are only written by _set() below
+                    value = pickle.loads(view[self.HEADER.size :])  # noqa: S301
+
+        return CacheEntry(
+            value=value, stored_at=stored_at, ttl=ttl, stale_ttl=stale_ttl
+        )
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry."""
+        await asyncio.to_thread(self._set, key, entry)
+
+    def _set(self, key: str, entry: CacheEntry) -> None:
+        path = self.directory / _get_file_name(key)
+
+        # Write then rename so that readers never see a partial file
+        temporary_path = _get_temporary_path(path)
+        with open(temporary_path, "wb") as cache_file:
+            cache_file.write(
+                self.HEADER.pack(entry.stored_at, entry.ttl, entry.stale_ttl)
+            )
+            cache_file.write(pickle.dumps(entry.value))
+        temporary_path.replace(path)
+
+    async def remove_outdated_entries(self, key_prefix: str) -> None:
+        """Nothing to remove, as the keys cannot be told from the file names."""
+
+    async def acquire_refresh_lease(self, key: str, duration: float) -> bool:
+        """Try to lock the key, the lock is kept until released (duration is unused)."""
+        return await asyncio.to_thread(self._acquire_refresh_lease, key)
+
+    def _acquire_refresh_lease(self, key: str) -> bool:
+        if key in self._leases:
+            return False
+
+        lock_file = os.open(
+            self.directory / f"{_get_file_name(key)}.lock", os.O_CREAT | os.O_RDWR
+        )
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(lock_file)
+            return False
+
+        self._leases[key] = lock_file
+        return True
+
+    async def renew_refresh_lease(self, key: str, duration: float) -> bool:
+        """Check that the key is still locked, locks being kept until released."""
+        return key in self._leases
+
+    async def release_refresh_lease(self, key: str) -> None:
+        """Release a lease acquired with acquire_refresh_lease()."""
+        await asyncio.to_thread(self._release_refresh_lease, key)
+
+    def _release_refresh_lease(self, key: str) -> None:
+        lock_file = self._leases.pop(key, None)
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            os.close(lock_file)
+
+
+class DatabaseCacheBackend:
+    """Store the cache entries in the app database, shared by all the workers."""
+
+    def __init__(self) -> None:
+        self.owner = str(uuid.uuid4())
+
+    async def get(self, key: str) -> CacheEntry | None:
+        """Get an entry, or None if it does not exist."""
+        return await asyncio.to_thread(self._get, key)
+
+    def _get(self, key: str) -> CacheEntry | None:
+        with Session() as session:
+            cached_value = session.get(CachedValue, key)
+            if cached_value is None:
+                return None
+
+            return CacheEntry(
+                # Values are only written by _set() below
+                value=pickle.loads(cached_value.value),  # noqa: S301
+                stored_at=cached_value.stored_at,
+                ttl=cached_value.ttl,
+                stale_ttl=cached_value.stale_ttl,
+            )
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry."""
+        await asyncio.to_thread(self._set, key, entry)
+
+    def _set(self, key: str, entry: CacheEntry) -> None:
+        with Session.begin() as session:
+            session.merge(
+                CachedValue(
+                    key=key,
+                    value=pickle.dumps(entry.value),
+                    stored_at=entry.stored_at,
+                    ttl=entry.ttl,
+                    stale_ttl=entry.stale_ttl,
+                )
+            )
+
+    async def remove_outdated_entries(self, key_prefix: str) -> None:
+        """Remove the entries whose key does not start with key_prefix."""
+        await asyncio.to_thread(self._remove_outdated_entries, key_prefix)
+
+    def _remove_outdated_entries(self, key_prefix: str) -> None:
+        with Session.begin() as session:
+            session.execute(
+                delete(CachedValue).where(
+                    ~CachedValue.key.startswith(key_prefix, autoescape=True)
+                )
+            )
+
+    async def acquire_refresh_lease(self, key: str, duration: float) -> bool:
+        """Try to become the owner of the refresh of a key for at most duration seconds."""
+        return await asyncio.to_thread(self._acquire_refresh_lease, key, duration)
+
+    def _acquire_refresh_lease(self, key: str, duration: float) -> bool:
+        now = time.time()
+
+        # Remove the lease of a worker that did not release it in time
+        with Session.begin() as session:
+            session.execute(
+                delete(CacheLease).where(
+                    CacheLease.key == key, CacheLease.expires_at < now
+                )
+            )
+
+        try:
+            with Session.begin() as session:
+                session.add(
+                    CacheLease(key=key, owner=self.owner, expires_at=now + duration)
+                )
+        except IntegrityError:
+            return False
+        else:
+            return True
+
+    async def renew_refresh_lease(self, key: str, duration: float) -> bool:
+        """Keep a lease for duration more seconds, return False if it was lost."""
+        return await asyncio.to_thread(self._renew_refresh_lease, key, duration)
+
+    def _renew_refresh_lease(self, key: str, duration: float) -> bool:
+        # The lease is lost once another worker removed it (after it expired)
+        with Session.begin() as session:
+            result = cast(
+                CursorResult,
+                session.execute(
+                    update(CacheLease)
+                    .where(CacheLease.key == key, CacheLease.owner == self.owner)
+                    .values(expires_at=time.time() + duration)
+                ),
+            )
+            return result.rowcount == 1
+
+    async def release_refresh_lease(self, key: str) -> None:
+        """Release a lease acquired with acquire_refresh_lease()."""
+        await asyncio.to_thread(self._release_refresh_lease, key)
+
+    def _release_refresh_lease(self, key: str) -> None:
+        with Session.begin() as session:
+            session.execute(
+                delete(CacheLease).where(
+                    CacheLease.key == key, CacheLease.owner == self.owner
+                )
+            )
+
+
+def get_cache_backend(name: str, directory: str | None) -> CacheBackend | None:
+    """Get the cache backend with the given name (memory, disk, mmap or database)."""
+    match name:
+        case "memory":
+            return None
+        case "database":
+            return DatabaseCacheBackend()
+        case "disk" if directory is not None:
+            return DiskCacheBackend(directory)
+        case "mmap" if directory is not None:
+            return MmapCacheBackend(directory)
+        case _:
+            raise InvalidCacheBackendError(name)
@@ -0,0 +1,109 @@
+import array
+import json
+import mmap
+import struct
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+MAGIC = b"EDAPICOL"
+HEADER_LENGTH = struct.Struct("<Q")
+ALIGNMENT = 8
+
+
+def _get_padding(position: int) -> int:
+    return -position % ALIGNMENT
+
+
+def write_columns(
+    path: str | Path,
+    columns: dict[str, array.array],
+    metadata: dict[str, Any] | None = None,
+) -> None:
+    """Write arrays as the columns of a file that can be memory-mapped.
+
+    The file is written next to the destination then renamed, so that readers never
+    see a partial file.
+    """
+    path = Path(path)
+    header: dict[str, Any] = {"columns": {}, "metadata": metadata or {}}
+
+    position = 0
+    for name, column in columns.items():
+        position += _get_padding(position)
+        header["columns"][name] = {
+            "typecode": column.typecode,
+            "offset": position,
+            "length": len(column) * column.itemsize,
+        }
+        position += len(column) * column.itemsize
+
+    encoded_header = json.dumps(header).encode()
+    data_start = len(MAGIC) + HEADER_LENGTH.size + len(encoded_header)
+    data_start += _get_padding(data_start)
+
+    temporary_path = path.with_suffix(".tmp")
+    with open(temporary_path, "wb") as output_file:
+        output_file.write(MAGIC)
+        output_file.write(HEADER_LENGTH.pack(len(encoded_header)))
+        output_file.write(encoded_header)
+        output_file.write(b"\0" * (data_start - output_file.tell()))
+        for name, column in columns.items():
+            output_file.write(
+                b"\0"
+                * (data_start + header["columns"][name]["offset"] - output_file.tell())
+            )
+            column.tofile(output_file)
+    temporary_path.replace(path)
+
+
+def encode_strings(values: Iterable[str]) -> tuple[array.array, array.array]:
+    """Get the columns storing strings: their UTF-8 bytes, and their offsets in them.
+
+    The offsets column has an extra item (the end of the last string), so that the
+    string at a position is always between two offsets.
+    """
+    data = bytearray()
+    offsets = array.array("Q", [0])
+    for value in values:
+        data += value.encode()
+        offsets.append(len(data))
+    return array.array("B", data), offsets
+
+
+def decode_string(data: memoryview, offsets: memoryview, position: int) -> str:
+    """Get the string at a position from columns written by encode_strings()."""
+    return bytes(data[offsets[position] : offsets[position + 1]]).decode()
+
+
+class ColumnarFile:
+    """Memory-mapped file written by write_columns(), columns being read lazily."""
+
+    def __init__(self, path: str | Path) -> None:
+        with open(path, "rb") as input_file:
+            self._mapping = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mapping[: len(MAGIC)] != MAGIC:
+            raise InvalidColumnarFileError(str(path))
+
+        (header_length,) = HEADER_LENGTH.unpack_from(self._mapping, len(MAGIC))
+        header_start = len(MAGIC) + HEADER_LENGTH.size
+        header = json.loads(self._mapping[header_start : header_start + header_length])
+        self._data_start = header_start + header_length
+        self._data_start += _get_padding(self._data_start)
+        self._columns: dict[str, dict[str, Any]] = header["columns"]
+        self.metadata: dict[str, Any] = header["metadata"]
+
+    def column(self, name: str) -> memoryview:
+        """Get a column as a memoryview of its values (without copying them)."""
+        column = self._columns[name]
+        start = self._data_start + column["offset"]
+        return memoryview(self._mapping)[start : start + column["length"]].cast(
+            column["typecode"]
+        )
+
+
+class InvalidColumnarFileError(Exception):
+    def __init__(self, path: str) -> None:
+        """Init the exception."""
+        super().__init__(f"{path} is not a columnar file")
@@ -0,0 +1,182 @@
+import difflib
+import itertools
+from collections import Counter
+from collections.abc import Callable, Iterable
+
+from app.models.commodities import Commodity, CommodityPrice, CommodityPricesSort
+
+FUZZY_MATCH_CUTOFF = 0.6
+FUZZY_MATCH_CANDIDATES = 10
+
+COMMODITY_PRICES_SORT_KEYS: dict[
+    CommodityPricesSort, Callable[[CommodityPrice], int]
+] = {
+    CommodityPricesSort.AVERAGE_BUY_PRICE: lambda price: price.average_buy_price,
+    CommodityPricesSort.AVERAGE_SELL_PRICE: lambda price: price.average_sell_price,
+    CommodityPricesSort.SPREAD: lambda price: (
+        price.average_sell_price - price.average_buy_price
+    ),
+}
+
+
+def normalize_commodity_name(name: str) -> str:
+    """Normalize a commodity name to compare names from different sources."""
+    return name.lower().replace("_", "").replace("-", "").replace(" ", "")
+
+
+def _get_trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class CommodityIndex:
+    """Precomputed lookups over the list of commodities.
+
+    Exact lookups (by id, api name or name, ignoring case and separators) are
+    dictionary accesses. Fuzzy lookups only compare the name with the commodities
+    sharing the most trigrams with it.
+    """
+
+    def __init__(self, commodities: Iterable[Commodity]) -> None:
+        self.commodities = tuple(commodities)
+        self.by_id = {item.id: item for item in self.commodities}
+        self._by_api_name = {
+            normalize_commodity_name(item.api_name): item for item in self.commodities
+        }
+        self._by_name = {
+            normalize_commodity_name(item.name): item for item in self.commodities
+        }
+
+        self._trigrams: dict[str, list[int]] = {}
+        for position, item in enumerate(self.commodities):
+            for trigram in _get_trigrams(item.name.lower()):
+                self._trigrams.setdefault(trigram, []).append(position)
+
+    def get(self, name: str) -> Commodity | None:
+        """Get the commodity with the specified name or api name."""
+        normalized_name = normalize_commodity_name(name)
+        return self._by_api_name.get(normalized_name) or self._by_name.get(
+            normalized_name
+        )
+
+    def find(self, name: str) -> Commodity | None:
+        """Get the commodity with the specified name, allowing small differences."""
+        return self.get(name) or self._find_close_match(name)
+
+    def _find_close_match(self, name: str) -> Commodity | None:
+        lowercase_name = name.lower()
+        shared_trigrams = Counter(
+            position
+            for trigram in _get_trigrams(lowercase_name)
+            for position in self._trigrams.get(trigram, ())
+        )
+
+        best_match: Commodity | None = None
+        best_ratio = 0.0
+        for position, _ in shared_trigrams.most_common(FUZZY_MATCH_CANDIDATES):
+            candidate = self.commodities[position]
+            ratio = difflib.SequenceMatcher(
+                None, lowercase_name, candidate.name.lower()
+            ).ratio()
+            if ratio >= FUZZY_MATCH_CUTOFF and ratio > best_ratio:
+                best_match, best_ratio = candidate, ratio
+
+        return best_match
+
+
+class CommodityPriceTable:
+    """Commodities prices, indexed by commodity.
+
+    The sort orders and the positions of the prices by category and rarity are
+    computed once, so that searches only iterate over the positions.
+    """
+
+    def __init__(self, prices: Iterable[CommodityPrice], index: CommodityIndex) -> None:
+        self.prices = list(prices)
+        self.index = index
+        self._by_commodity_id = {price.commodity.id: price for price in self.prices}
+        self._lowercase_names = [price.commodity.name.lower() for price in self.prices]
+
+        self._by_category: dict[str, set[int]] = {}
+        self._by_rarity: dict[bool, set[int]] = {True: set(), False: set()}
+        for position, price in enumerate(self.prices):
+            self._by_category.setdefault(price.commodity.category.lower(), set()).add(
+                position
+            )
+            self._by_rarity[price.commodity.is_rare].add(position)
+
+        # Ties are ordered by name, in both directions
+        by_name = sorted(
+            range(len(self.prices)),
+            key=lambda position: self._lowercase_names[position],
+        )
+        self._sort_orders: dict[tuple[CommodityPricesSort, bool], list[int]] = {}
+        for sort, sort_key in COMMODITY_PRICES_SORT_KEYS.items():
+            for descending in (False, True):
+                self._sort_orders[sort, descending] = sorted(
+                    by_name,
+                    key=lambda position, sort_key=sort_key, descending=descending: (
+                        -sort_key(self.prices[position])
+                        if descending
+                        else sort_key(self.prices[position])
+                    ),
+                )
+
+    def get(self, commodity_name: str) -> CommodityPrice | None:
+        """Get the prices of the commodity with the specified name or api name."""
+        commodity = self.index.get(commodity_name)
+        if commodity is None:
+            return None
+        return self._by_commodity_id.get(commodity.id)
+
+    def search(
+        self,
+        name_prefix: str | None = None,
+        category: str | None = None,
+        is_rare: bool | None = None,
+        sort: CommodityPricesSort | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[CommodityPrice]:
+        """Get a page of the prices matching the filters (ignoring case).
+
+        Prices are in the order of the source data when they are not sorted.
+        """
+        positions: Iterable[int] = (
+            self._sort_orders[sort, descending]
+            if sort is not None
+            else range(len(self.prices))
+        )
+        if category is not None:
+            category_positions = self._by_category.get(category.lower(), set())
+            positions = (
+                position for position in positions if position in category_positions
+            )
+        if is_rare is not None:
+            rarity_positions = self._by_rarity[is_rare]
+            positions = (
+                position for position in positions if position in rarity_positions
+            )
+        if name_prefix:
+            lowercase_prefix = name_prefix.lower()
+            positions = (
+                position
+                for position in positions
+                if self._lowercase_names[position].startswith(lowercase_prefix)
+            )
+
+        stop = offset + limit if limit is not None else None
+        return [
+            self.prices[position]
+            for position in itertools.islice(positions, offset, stop)
+        ]
+
+    def get_many(
+        self, commodity_names: Iterable[str]
+    ) -> dict[str, CommodityPrice | None]:
+        """Get the prices of several commodities, by requested name.
+
+        Duplicated names are only looked up once, and unknown ones are mapped to None.
+        """
+        return {name: self.get(name) for name in dict.fromkeys(commodity_names)}
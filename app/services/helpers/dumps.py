@@ -0,0 +1,21 @@
+import gzip
+import json
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+
+def iter_dump_items(path: str | Path) -> Iterator[dict[str, Any]]:
+    """Iterate over the items of an EDSM or Spansh JSON dump (gzipped or not).
+
+    These dumps are a JSON array with one item per line, so they are read line by line
+    instead of being loaded at once.
+    """
+    path = Path(path)
+    open_function = gzip.open if path.suffix == ".gz" else open
+    with open_function(path, "rt", encoding="utf-8") as dump_file:
+        for line in dump_file:
+            content = line.strip().rstrip(",")
+            if content in ("", "[", "]"):
+                continue
+            yield json.loads(content)
@@ -0,0 +1,85 @@
+import math
+from collections.abc import Iterator
+
+# Points are grouped in cubic cells of this size (in ly) for spatial queries
+GRID_CELL_SIZE = 100.0
+
+# Cells coordinates are packed in an int, with this many bits per axis
+GRID_CELL_BITS = 21
+GRID_CELL_OFFSET = 1 << (GRID_CELL_BITS - 1)
+
+# Smallest size of the cells of other grids, so that the coordinates of the cells of
+# the galaxy (at most about 100,000 ly from Sol) fit in the bits of each axis
+MIN_GRID_CELL_SIZE = 0.1
+
+
+def _get_cell_coordinate(coordinate: float, cell_size: float) -> int:
+    return math.floor(coordinate / cell_size)
+
+
+def _pack_cell_key(cell_x: int, cell_y: int, cell_z: int) -> int:
+    return (
+        ((cell_x + GRID_CELL_OFFSET) << (2 * GRID_CELL_BITS))
+        | ((cell_y + GRID_CELL_OFFSET) << GRID_CELL_BITS)
+        | (cell_z + GRID_CELL_OFFSET)
+    )
+
+
+def get_cell_key(
+    x: float, y: float, z: float, cell_size: float = GRID_CELL_SIZE
+) -> int:
+    """Get the key of the cell containing a point.
+
+    Keys are sorted on (x, y, z), so the cells of a column of the grid along z have
+    contiguous keys. Grids with other cell sizes (of at least MIN_GRID_CELL_SIZE) use
+    the same keys.
+    """
+    return _pack_cell_key(
+        _get_cell_coordinate(x, cell_size),
+        _get_cell_coordinate(y, cell_size),
+        _get_cell_coordinate(z, cell_size),
+    )
+
+
+def iter_cube_cell_key_ranges(
+    x: float, y: float, z: float, half_side: float, cell_size: float = GRID_CELL_SIZE
+) -> Iterator[tuple[int, int]]:
+    """Iterate over the cells overlapping a cube, as ranges of cell keys.
+
+    There is one range (first and last keys, inclusive) per column of the grid along z.
+    """
+    min_z, max_z = (
+        _get_cell_coordinate(z - half_side, cell_size),
+        _get_cell_coordinate(z + half_side, cell_size),
+    )
+    for cell_x in range(
+        _get_cell_coordinate(x - half_side, cell_size),
+        _get_cell_coordinate(x + half_side, cell_size) + 1,
+    ):
+        for cell_y in range(
+            _get_cell_coordinate(y - half_side, cell_size),
+            _get_cell_coordinate(y + half_side, cell_size) + 1,
+        ):
+            yield (
+                _pack_cell_key(cell_x, cell_y, min_z),
+                _pack_cell_key(cell_x, cell_y, max_z),
+            )
+
+
+def get_cube_columns_count(half_side: float) -> int:
+    """Get the maximum number of grid columns overlapped by a cube."""
+    return (math.ceil(2 * half_side / GRID_CELL_SIZE) + 1) ** 2
+
+
+def get_grown_half_side(half_side: float, found_count: int, wanted_count: int) -> float:
+    """Get the half side of a cube expected to contain enough points.
+
+    Assumes a uniform density around the center of the cube, found_count points having
+    been found in the current one. The growth is bounded, so that a sparse area does
+    not make the cube needlessly large.
+    """
+    if not found_count:
+        return half_side * 2.0
+    return half_side * min(
+        2.0, max(1.25, 1.1 * (wanted_count / found_count) ** (1 / 3))
+    )
@@ -0,0 +1,164 @@
+import codecs
+import enum
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any
+
+WHITESPACE = " \t\n\r"
+
+
+class InvalidJsonStreamError(Exception):
+    def __init__(self, position: int) -> None:
+        """Init the exception."""
+        super().__init__(f"Invalid JSON document at character {position}")
+
+
+class _State(enum.Enum):
+    OBJECT_START = enum.auto()
+    KEY = enum.auto()
+    COLON = enum.auto()
+    VALUE = enum.auto()
+    AFTER_VALUE = enum.auto()
+    ARRAY_START = enum.auto()
+    ITEM = enum.auto()
+    AFTER_ITEM = enum.auto()
+    DONE = enum.auto()
+
+
+class JsonArrayStreamParser:
+    """Incremental parser of the items of an array in a top-level JSON object.
+
+    Text is fed as it is received, and each item of the array is returned as soon as it
+    is complete, so that the whole document is never in memory. The other values of the
+    object are decoded then discarded.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._offset = 0
+        self._state = _State.OBJECT_START
+        self._current_key: str | None = None
+        self._is_final = False
+
+    def feed(self, text: str) -> list[Any]:
+        """Add text to the document and get the array items completed by it."""
+        self._buffer = self._buffer[self._position :] + text
+        self._offset += self._position
+        self._position = 0
+        return self._parse()
+
+    def close(self) -> list[Any]:
+        """Mark the end of the document, and get the last array items.
+
+        :raises InvalidJsonStreamError: The document is incomplete or invalid
+        """
+        self._is_final = True
+        items = self._parse()
+        if self._state != _State.DONE:
+            raise InvalidJsonStreamError(self._offset + self._position)
+        return items
+
+    def _parse(self) -> list[Any]:
+        items: list[Any] = []
+        while self._state != _State.DONE:
+            self._skip_whitespace()
+            if self._position >= len(self._buffer):
+                break
+
+            character = self._buffer[self._position]
+            match self._state:
+                case _State.OBJECT_START:
+                    self._expect(character, "{")
+                    self._state = _State.KEY
+                case _State.KEY if character == "}":
+                    self._position += 1
+                    self._state = _State.DONE
+                case _State.KEY:
+                    decoded, key = self._decode()
+                    if not decoded:
+                        break
+                    self._current_key = key
+                    self._state = _State.COLON
+                case _State.COLON:
+                    self._expect(character, ":")
+                    self._state = (
+                        _State.ARRAY_START
+                        if self._current_key == self.key
+                        else _State.VALUE
+                    )
+                case _State.VALUE:
+                    decoded, _ = self._decode()
+                    if not decoded:
+                        break
+                    self._state = _State.AFTER_VALUE
+                case _State.AFTER_VALUE:
+                    self._expect(character, ",}")
+                    self._state = _State.KEY if character == "," else _State.DONE
+                case _State.ARRAY_START:
+                    self._expect(character, "[")
+                    self._state = _State.ITEM
+                case _State.ITEM if character == "]":
+                    self._position += 1
+                    self._state = _State.AFTER_VALUE
+                case _State.ITEM:
+                    decoded, item = self._decode()
+                    if not decoded:
+                        break
+                    items.append(item)
+                    self._state = _State.AFTER_ITEM
+                case _State.AFTER_ITEM:
+                    self._expect(character, ",]")
+                    self._state = (
+                        _State.ITEM if character == "," else _State.AFTER_VALUE
+                    )
+
+        return items
+
+    def _skip_whitespace(self) -> None:
+        while (
+            self._position < len(self._buffer)
+            and self._buffer[self._position] in WHITESPACE
+        ):
+            self._position += 1
+
+    def _expect(self, character: str, expected: str) -> None:
+        if character not in expected:
+            raise InvalidJsonStreamError(self._offset + self._position)
+        self._position += 1
+
+    def _decode(self) -> tuple[bool, Any]:
+        """Decode the value at the current position, if it has been fully received."""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._position)
+        except json.JSONDecodeError as e:
+            if self._is_final:
+                raise InvalidJsonStreamError(self._offset + e.pos) from e
+            return False, None
+
+        # A number or literal may continue in the next chunk
+        if end == len(self._buffer) and not self._is_final:
+            return False, None
+
+        self._position = end
+        return True, value
+
+
+async def iter_json_array_items(
+    chunks: AsyncIterable[bytes], key: str
+) -> AsyncIterator[Any]:
+    """Iterate over the items of the array under key in a streamed JSON object.
+
+    :raises InvalidJsonStreamError: The document is incomplete or invalid
+    """
+    parser = JsonArrayStreamParser(key)
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    async for chunk in chunks:
+        for item in parser.feed(text_decoder.decode(chunk)):
+            yield item
+
+    parser.feed(text_decoder.decode(b"", final=True))
+    for item in parser.close():
+        yield item
@@ -0,0 +1,517 @@
+import array
+import bisect
+import dataclasses
+import datetime
+import functools
+import heapq
+import math
+import os
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from loguru import logger
+
+from app.config import MARKET_SNAPSHOT_PATH
+from app.models.commodities import FindCommodityMode
+from app.models.stations import StationLandingPadSize
+from app.services.helpers.columnar import (
+    ColumnarFile,
+    decode_string,
+    encode_strings,
+    write_columns,
+)
+from app.services.helpers.dumps import iter_dump_items
+from app.services.helpers.fleet_carriers import is_fleet_carrier
+from app.services.helpers.grid import (
+    GRID_CELL_SIZE,
+    get_cell_key,
+    get_cube_columns_count,
+    get_grown_half_side,
+    iter_cube_cell_key_ranges,
+)
+from app.services.helpers.timestamps import parse_timestamp
+
+# Landing pad sizes, by code in the snapshot file (in size order)
+LANDING_PAD_SIZES = (
+    StationLandingPadSize.SMALL,
+    StationLandingPadSize.MEDIUM,
+    StationLandingPadSize.LARGE,
+)
+
+# Types of the stations on the surface of a body in the Spansh dumps
+PLANETARY_STATION_TYPES = {
+    "Odyssey Settlement",
+    "Planetary Outpost",
+    "Planetary Port",
+    "Settlement",
+    "Surface Settlement",
+}
+
+
+def _get_commodity_key(name: str) -> str:
+    return name.lower()
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class MarketStation:
+    """A station with a market, from the market snapshot."""
+
+    distance_from_reference_system: float
+    distance_to_arrival: float
+    is_fleet_carrier: bool
+    is_planetary: bool
+    market_updated_at: datetime.datetime
+    max_landing_pad_size: StationLandingPadSize
+    name: str
+    system_name: str
+    type: str
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class MarketOffer:
+    """A station buying or selling a commodity, from the market snapshot."""
+
+    station: MarketStation
+    price: int
+    quantity: int
+
+
+class MarketQuote(NamedTuple):
+    """Prices and quantities of a commodity at a station (by position in the snapshot)."""
+
+    station: int
+    buy_price: int
+    supply: int
+    sell_price: int
+    demand: int
+
+
+class MarketSnapshot:
+    """Local snapshot of stations markets, built from a dump by build_market_snapshot().
+
+    The file contains the stations with a market (one column per attribute), and their
+    offers: one row per station and commodity, with its prices and quantities.
+    Offers are grouped by commodity, and sorted by grid cell (of the station system)
+    in each commodity, so that the offers for a commodity around a point are found with
+    binary searches, like in the systems index.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self._file = ColumnarFile(path)
+        self.updated_at = datetime.datetime.fromtimestamp(
+            self._file.metadata["updated_at"], tz=datetime.UTC
+        )
+        self._commodities: dict[str, int] = {
+            _get_commodity_key(name): index
+            for index, name in enumerate(self._file.metadata["commodities"])
+        }
+        self._station_types: list[str] = self._file.metadata["station_types"]
+
+        self._commodities_starts = self._file.column("commodities_starts")
+        self._names = self._file.column("names")
+        self._name_offsets = self._file.column("name_offsets")
+        self._system_names = self._file.column("system_names")
+        self._system_name_offsets = self._file.column("system_name_offsets")
+        self._x = self._file.column("x")
+        self._y = self._file.column("y")
+        self._z = self._file.column("z")
+        self._distances_to_arrival = self._file.column("distances_to_arrival")
+        self._landing_pads = self._file.column("landing_pads")
+        self._types = self._file.column("types")
+        self._is_planetary = self._file.column("is_planetary")
+        self._is_fleet_carrier = self._file.column("is_fleet_carrier")
+        self._market_updated_at = self._file.column("market_updated_at")
+        self._offers_stations = self._file.column("offers_stations")
+        self._offers_cells = self._file.column("offers_cells")
+        self._offers_buy_prices = self._file.column("offers_buy_prices")
+        self._offers_sell_prices = self._file.column("offers_sell_prices")
+        self._offers_supplies = self._file.column("offers_supplies")
+        self._offers_demands = self._file.column("offers_demands")
+
+    def has_commodity(self, commodity_name: str) -> bool:
+        """Check if the commodity is traded in the snapshot."""
+        return _get_commodity_key(commodity_name) in self._commodities
+
+    def _get_offers_range(self, commodity_name: str) -> tuple[int, int]:
+        index = self._commodities.get(_get_commodity_key(commodity_name))
+        if index is None:
+            return 0, 0
+        return self._commodities_starts[index], self._commodities_starts[index + 1]
+
+    def _get_matching_offers(
+        self,
+        offers: Iterable[int],
+        mode: FindCommodityMode,
+        min_quantity: int,
+        min_landing_pad_size: StationLandingPadSize,
+        updated_after: datetime.datetime,
+    ) -> list[int]:
+        """Get the offers with enough quantity, at recently updated and large enough stations."""
+        quantities = (
+            self._offers_supplies
+            if mode == FindCommodityMode.BUY
+            else self._offers_demands
+        )
+        stations = self._offers_stations
+        landing_pads, market_updated_at = self._landing_pads, self._market_updated_at
+        min_landing_pad = LANDING_PAD_SIZES.index(min_landing_pad_size)
+        min_updated_at = updated_after.timestamp()
+        return [
+            offer
+            for offer in offers
+            if quantities[offer] >= min_quantity
+            and landing_pads[stations[offer]] >= min_landing_pad
+            and market_updated_at[stations[offer]] >= min_updated_at
+        ]
+
+    def _get_distance(
+        self, origin: tuple[float, float, float], offer: int
+    ) -> tuple[float, float, int]:
+        """Get the sort key of an offer by distance: to the origin, then to arrival."""
+        station = self._offers_stations[offer]
+        distance = math.dist(
+            origin, (self._x[station], self._y[station], self._z[station])
+        )
+        return distance, self._distances_to_arrival[station], offer
+
+    def get_station_coordinates(self, station: int) -> tuple[float, float, float]:
+        """Get the coordinates of the system of the station at the given position."""
+        return self._x[station], self._y[station], self._z[station]
+
+    def get_station(self, station: int, distance: float) -> MarketStation:
+        """Get the station at the given position, distance ly away from the reference."""
+        return MarketStation(
+            distance_from_reference_system=round(distance, 2),
+            distance_to_arrival=self._distances_to_arrival[station],
+            is_fleet_carrier=bool(self._is_fleet_carrier[station]),
+            is_planetary=bool(self._is_planetary[station]),
+            market_updated_at=datetime.datetime.fromtimestamp(
+                self._market_updated_at[station], tz=datetime.UTC
+            ),
+            max_landing_pad_size=LANDING_PAD_SIZES[self._landing_pads[station]],
+            name=decode_string(self._names, self._name_offsets, station),
+            system_name=decode_string(
+                self._system_names, self._system_name_offsets, station
+            ),
+            type=self._station_types[self._types[station]],
+        )
+
+    def _get_offer(
+        self, offer: int, mode: FindCommodityMode, distance: float
+    ) -> MarketOffer:
+        return MarketOffer(
+            station=self.get_station(self._offers_stations[offer], distance),
+            price=(
+                self._offers_buy_prices[offer]
+                if mode == FindCommodityMode.BUY
+                else self._offers_sell_prices[offer]
+            ),
+            quantity=(
+                self._offers_supplies[offer]
+                if mode == FindCommodityMode.BUY
+                else self._offers_demands[offer]
+            ),
+        )
+
+    def _iter_offers_in_cube(
+        self, start: int, end: int, center: tuple[float, float, float], half_side: float
+    ) -> Iterator[int]:
+        """Iterate over the offers in [start, end[ in the cells overlapping the cube."""
+        for first_key, last_key in iter_cube_cell_key_ranges(*center, half_side):
+            first_offer = bisect.bisect_left(self._offers_cells, first_key, start, end)
+            last_offer = bisect.bisect_right(
+                self._offers_cells, last_key, first_offer, end
+            )
+            yield from range(first_offer, last_offer)
+
+    def _get_offers_in_cube_or_all(
+        self, start: int, end: int, center: tuple[float, float, float], half_side: float
+    ) -> Iterable[int]:
+        """Get the offers in [start, end[ in the cells overlapping the cube (or all)."""
+        if get_cube_columns_count(half_side) >= end - start:
+            return range(start, end)
+        return self._iter_offers_in_cube(start, end, center, half_side)
+
+    def get_quotes_within(
+        self,
+        origin: tuple[float, float, float],
+        radius: float,
+        min_landing_pad_size: StationLandingPadSize,
+        updated_after: datetime.datetime,
+    ) -> dict[str, list[MarketQuote]]:
+        """Get the quotes of the stations at most radius ly away from the origin.
+
+        Only the stations with large enough pads and recently updated markets are
+        included. Quotes are by commodity name.
+        """
+        distances: dict[int, float] = {}
+        quotes: dict[str, list[MarketQuote]] = {}
+        for index, commodity_name in enumerate(self._file.metadata["commodities"]):
+            start = self._commodities_starts[index]
+            end = self._commodities_starts[index + 1]
+            offers = self._get_matching_offers(
+                self._get_offers_in_cube_or_all(start, end, origin, radius),
+                FindCommodityMode.BUY,
+                0,
+                min_landing_pad_size,
+                updated_after,
+            )
+
+            commodity_quotes: list[MarketQuote] = []
+            for offer in offers:
+                station = self._offers_stations[offer]
+                distance = distances.get(station)
+                if distance is None:
+                    distance = math.dist(origin, self.get_station_coordinates(station))
+                    distances[station] = distance
+                if distance <= radius:
+                    commodity_quotes.append(
+                        MarketQuote(
+                            station,
+                            self._offers_buy_prices[offer],
+                            self._offers_supplies[offer],
+                            self._offers_sell_prices[offer],
+                            self._offers_demands[offer],
+                        )
+                    )
+            if commodity_quotes:
+                quotes[commodity_name] = commodity_quotes
+        return quotes
+
+    def get_nearest_offers(
+        self,
+        commodity_name: str,
+        mode: FindCommodityMode,
+        origin: tuple[float, float, float],
+        min_quantity: int,
+        min_landing_pad_size: StationLandingPadSize,
+        updated_after: datetime.datetime,
+        limit: int,
+    ) -> list[MarketOffer]:
+        """Get the stations buying or selling a commodity closest to the origin.
+
+        Offers are searched in a cube around the origin, grown until it contains enough
+        of them at most its half side away (so none closer can be missing), or until it
+        is cheaper to check all the offers for the commodity.
+        """
+        start, end = self._get_offers_range(commodity_name)
+        half_side = GRID_CELL_SIZE
+        while True:
+            if get_cube_columns_count(half_side) >= end - start:
+                offers: Iterable[int] = range(start, end)
+                max_distance = math.inf
+            else:
+                offers = self._iter_offers_in_cube(start, end, origin, half_side)
+                max_distance = half_side
+
+            distances = [
+                distance
+                for distance in map(
+                    functools.partial(self._get_distance, origin),
+                    self._get_matching_offers(
+                        offers, mode, min_quantity, min_landing_pad_size, updated_after
+                    ),
+                )
+                if distance[0] <= max_distance
+            ]
+            if len(distances) >= limit or max_distance == math.inf:
+                return [
+                    self._get_offer(offer, mode, distance)
+                    for distance, _, offer in heapq.nsmallest(limit, distances)
+                ]
+            half_side = get_grown_half_side(half_side, len(distances), limit)
+
+    def get_best_offers(
+        self,
+        commodity_name: str,
+        mode: FindCommodityMode,
+        updated_after: datetime.datetime,
+        limit: int,
+    ) -> list[MarketOffer]:
+        """Get the stations with the lowest buy prices or the highest sell prices.
+
+        Distances are from Sol, as with Spansh searches without a reference system.
+        """
+        start, end = self._get_offers_range(commodity_name)
+        offers = self._get_matching_offers(
+            range(start, end), mode, 1, StationLandingPadSize.SMALL, updated_after
+        )
+        if mode == FindCommodityMode.BUY:
+            best_offers = heapq.nsmallest(
+                limit, offers, key=self._offers_buy_prices.__getitem__
+            )
+        else:
+            best_offers = heapq.nlargest(
+                limit, offers, key=self._offers_sell_prices.__getitem__
+            )
+
+        return [
+            self._get_offer(offer, mode, self._get_distance((0, 0, 0), offer)[0])
+            for offer in best_offers
+        ]
+
+
+def _get_landing_pad_code(station: dict[str, Any]) -> int:
+    landing_pads = station.get("landingPads") or {}
+    if landing_pads.get("large"):
+        return LANDING_PAD_SIZES.index(StationLandingPadSize.LARGE)
+    if landing_pads.get("medium"):
+        return LANDING_PAD_SIZES.index(StationLandingPadSize.MEDIUM)
+    return LANDING_PAD_SIZES.index(StationLandingPadSize.SMALL)
+
+
+def _iter_dump_stations(system: dict[str, Any]) -> Iterator[dict[str, Any]]:
+    """Iterate over the stations of a system from a Spansh dump, orbiting or landed."""
+    yield from system.get("stations", ())
+    for body in system.get("bodies", ()):
+        yield from body.get("stations", ())
+
+
+class _MarketSnapshotBuilder:
+    """Columns of the market snapshot, filled from the systems of a dump."""
+
+    def __init__(self) -> None:
+        self.names: list[str] = []
+        self.system_names: list[str] = []
+        self.station_types: dict[str, int] = {}
+        self.x, self.y, self.z = array.array("f"), array.array("f"), array.array("f")
+        self.distances_to_arrival = array.array("f")
+        self.landing_pads = array.array("B")
+        self.types = array.array("H")
+        self.is_planetary = array.array("B")
+        self.is_fleet_carrier = array.array("B")
+        self.market_updated_at = array.array("q")
+        # For each commodity: its offers (station, cell, buy, sell, supply, demand)
+        self.offers: dict[str, list[tuple[int, int, int, int, int, int]]] = {}
+
+    def add_system(self, system: dict[str, Any]) -> None:
+        coordinates = system["coords"]
+        cell = get_cell_key(coordinates["x"], coordinates["y"], coordinates["z"])
+        for station in _iter_dump_stations(system):
+            market = station.get("market") or {}
+            if not market.get("commodities") or not market.get("updateTime"):
+                continue
+
+            position = len(self.names)
+            station_type = station.get("type") or "Unknown"
+            self.names.append(station["name"])
+            self.system_names.append(system["name"])
+            self.x.append(coordinates["x"])
+            self.y.append(coordinates["y"])
+            self.z.append(coordinates["z"])
+            self.distances_to_arrival.append(station.get("distanceToArrival") or 0)
+            self.landing_pads.append(_get_landing_pad_code(station))
+            self.types.append(
+                self.station_types.setdefault(station_type, len(self.station_types))
+            )
+            self.is_planetary.append(station_type in PLANETARY_STATION_TYPES)
+            self.is_fleet_carrier.append(
+                is_fleet_carrier(station.get("controllingFaction"))
+            )
+            self.market_updated_at.append(
+                int(parse_timestamp(market["updateTime"]).timestamp())
+            )
+
+            for commodity in market["commodities"]:
+                self.offers.setdefault(commodity["name"], []).append(
+                    (
+                        position,
+                        cell,
+                        commodity.get("buyPrice") or 0,
+                        commodity.get("sellPrice") or 0,
+                        commodity.get("supply") or 0,
+                        commodity.get("demand") or 0,
+                    )
+                )
+
+    def write(self, output_path: str | Path) -> None:
+        commodities = sorted(self.offers, key=_get_commodity_key)
+        commodities_starts = array.array("Q", [0])
+        offers_columns = [array.array(typecode) for typecode in "QqIIII"]
+        for commodity in commodities:
+            # Sort the offers by cell, for spatial queries
+            for offer in sorted(self.offers[commodity], key=lambda offer: offer[1]):
+                for column, value in zip(offers_columns, offer, strict=True):
+                    column.append(value)
+            commodities_starts.append(len(offers_columns[0]))
+
+        names, name_offsets = encode_strings(self.names)
+        system_names, system_name_offsets = encode_strings(self.system_names)
+        write_columns(
+            output_path,
+            {
+                "commodities_starts": commodities_starts,
+                "names": names,
+                "name_offsets": name_offsets,
+                "system_names": system_names,
+                "system_name_offsets": system_name_offsets,
+                "x": self.x,
+                "y": self.y,
+                "z": self.z,
+                "distances_to_arrival": self.distances_to_arrival,
+                "landing_pads": self.landing_pads,
+                "types": self.types,
+                "is_planetary": self.is_planetary,
+                "is_fleet_carrier": self.is_fleet_carrier,
+                "market_updated_at": self.market_updated_at,
+                **dict(
+                    zip(
+                        (
+                            "offers_stations",
+                            "offers_cells",
+                            "offers_buy_prices",
+                            "offers_sell_prices",
+                            "offers_supplies",
+                            "offers_demands",
+                        ),
+                        offers_columns,
+                        strict=True,
+                    )
+                ),
+            },
+            metadata={
+                "commodities": commodities,
+                "station_types": list(self.station_types),
+                "updated_at": max(self.market_updated_at, default=0),
+            },
+        )
+
+
+def build_market_snapshot(dump_path: str | Path, output_path: str | Path) -> int:
+    """Build the market snapshot file from a Spansh stations dump.
+
+    Return the number of stations with a market in the snapshot.
+    """
+    builder = _MarketSnapshotBuilder()
+    for system in iter_dump_items(dump_path):
+        builder.add_system(system)
+    builder.write(output_path)
+    return len(builder.names)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_market_snapshot(path: str, modified_at: int) -> MarketSnapshot | None:
+    try:
+        return MarketSnapshot(path)
+    except Exception:
+        logger.opt(exception=True).warning(
+            f"Could not load the market snapshot from {path}"
+        )
+        return None
+
+
+def get_market_snapshot() -> MarketSnapshot | None:
+    """Get the local market snapshot, or None if it is not configured or unavailable.
+
+    The snapshot is reloaded when its file is replaced by a new one.
+    """
+    if MARKET_SNAPSHOT_PATH is None:
+        return None
+
+    try:
+        modified_at = os.stat(MARKET_SNAPSHOT_PATH).st_mtime_ns
+    except OSError:
+        logger.warning(f"Market snapshot {MARKET_SNAPSHOT_PATH} not found")
+        return None
+    return _load_market_snapshot(MARKET_SNAPSHOT_PATH, modified_at)
@@ -0,0 +1,178 @@
+import asyncio
+import dataclasses
+import datetime
+import random
+from collections.abc import Awaitable, Callable, Iterable
+
+from loguru import logger
+
+from app.services.helpers.cache import (
+    AsyncCache,
+    services_cache,
+    track_cached_values_usage,
+)
+from app.services.helpers.cache_backends import CacheBackend
+
+LEADER_LEASE_KEY = "refresh_scheduler:leader"
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class RefreshJob:
+    name: str
+    refresh: Callable[[], Awaitable[object]]
+    interval: datetime.timedelta
+    # Run by every worker instead of the leader only, for the jobs refreshing a cache
+    # that is not shared between the workers
+    per_worker: bool = False
+
+
+class RefreshScheduler:
+    """Run refresh jobs in the background, at their interval.
+
+    - Intervals are randomly shortened or lengthened by up to jitter (as a fraction),
+      so that jobs started together do not keep calling the upstream APIs together
+    - After a failure, a job is retried sooner, with an exponential backoff capped by
+      its interval
+    - Jobs updating data shared by the workers (the database, or a shared cache) are
+      only run by the worker holding the leader lease, renewed while it runs. The
+      others try to take the lease over regularly, in case the leader stops. Without
+      a lease backend, those jobs are not run, as the workers could not agree on a
+      leader.
+    - The cache entries refreshed by the leader are announced to the other workers,
+      which drop their older copies (and the responses built from them)
+    """
+
+    LEADER_LEASE_DURATION = 60
+    # Period of the renewals of the lease by the leader, and of the attempts of the
+    # other workers to take it over
+    LEADER_LEASE_PERIOD = LEADER_LEASE_DURATION / 3
+    # Delay before the first runs, so that workers started together are spread out
+    STARTUP_DELAY = 10
+    RETRY_MIN_DELAY = 5
+
+    def __init__(
+        self,
+        jobs: Iterable[RefreshJob],
+        lease_backend: CacheBackend | None,
+        jitter: float = 0.1,
+        cache: AsyncCache = services_cache,
+    ) -> None:
+        self.jobs = tuple(jobs)
+        self.lease_backend = lease_backend
+        self.jitter = jitter
+        self.cache = cache
+        self.is_leader = False
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the background tasks."""
+        jobs = self.jobs
+        if self.lease_backend is not None:
+            self._tasks.append(asyncio.create_task(self._keep_leader_lease()))
+        elif skipped_jobs := [job.name for job in jobs if not job.per_worker]:
+            logger.warning(
+                f"Refresh jobs {', '.join(skipped_jobs)} skipped, "
+                "no leader can be elected without a lease backend"
+            )
+            jobs = tuple(job for job in jobs if job.per_worker)
+
+        self._tasks.extend(asyncio.create_task(self._run(job)) for job in jobs)
+
+    async def stop(self) -> None:
+        """Cancel the background tasks and give the leader lease up."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self.is_leader:
+            await self._release_leader_lease()
+        self.is_leader = False
+
+    def _get_jittered_delay(self, delay: float) -> float:
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)  # noqa: S311
+
+    async def _run(self, job: RefreshJob) -> None:
+        await asyncio.sleep(random.uniform(0, self.STARTUP_DELAY))  # noqa: S311
+
+        failures_count = 0
+        while True:
+            if not job.per_worker and not self.is_leader:
+                # Drop the copies of the entries refreshed by the leader, and check again
+                # once the leader lease may have been taken over
+                await self.cache.sync_refreshes(job.name)
+                await asyncio.sleep(self._get_jittered_delay(self.LEADER_LEASE_PERIOD))
+                continue
+
+            delay = job.interval.total_seconds()
+            try:
+                with track_cached_values_usage() as cached_values_usage:
+                    await job.refresh()
+            except Exception:
+                failures_count += 1
+                delay = min(delay, self.RETRY_MIN_DELAY * 2 ** (failures_count - 1))
+                logger.opt(exception=True).warning(
+                    f"Refresh job {job.name} failed {failures_count} times, "
+                    f"retrying in {delay:.0f} s"
+                )
+            else:
+                failures_count = 0
+                logger.debug(f"Refresh job {job.name} done")
+                if not job.per_worker:
+                    await self.cache.announce_refreshes(
+                        job.name, cached_values_usage.keys
+                    )
+
+            await asyncio.sleep(self._get_jittered_delay(delay))
+
+    async def _keep_leader_lease(self) -> None:
+        """Take or renew the leader lease, well before it expires."""
+        while True:
+            is_leader = await (
+                self._renew_leader_lease()
+                if self.is_leader
+                else self._acquire_leader_lease()
+            )
+            if is_leader != self.is_leader:
+                logger.info(
+                    "Refresh scheduler leader lease "
+                    f"{'acquired' if is_leader else 'lost'}"
+                )
+            self.is_leader = is_leader
+
+            await asyncio.sleep(self._get_jittered_delay(self.LEADER_LEASE_PERIOD))
+
+    async def _acquire_leader_lease(self) -> bool:
+        if self.lease_backend is None:
+            return False
+
+        try:
+            return await self.lease_backend.acquire_refresh_lease(
+                LEADER_LEASE_KEY, self.LEADER_LEASE_DURATION
+            )
+        except Exception:
+            logger.opt(exception=True).warning("Could not get the leader lease")
+            return False
+
+    async def _renew_leader_lease(self) -> bool:
+        if self.lease_backend is None:
+            return False
+
+        try:
+            return await self.lease_backend.renew_refresh_lease(
+                LEADER_LEASE_KEY, self.LEADER_LEASE_DURATION
+            )
+        except Exception:
+            # Another worker takes the lease over if it expires, so stop running the
+            # jobs as if it was lost
+            logger.opt(exception=True).warning("Could not renew the leader lease")
+            return False
+
+    async def _release_leader_lease(self) -> None:
+        if self.lease_backend is None:
+            return
+
+        try:
+            await self.lease_backend.release_refresh_lease(LEADER_LEASE_KEY)
+        except Exception:
+            logger.opt(exception=True).warning("Could not release the leader lease")
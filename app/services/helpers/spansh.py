@@ -1,18 +1,62 @@
 import datetime
-from enum import Enum
-from typing import Any
+from collections.abc import AsyncIterator, Collection, Iterable
+from enum import Flag, auto
+from typing import Any, cast
 
-from app.models.stations import StationLandingPadSize
+import niquests
 
+from app.helpers.niquests import get_shared_async_niquests_session
+from app.models.exceptions import ContentFetchingError
+from app.models.stations import StationLandingPadSize, StationService
+from app.services.helpers.json_stream import (
+    InvalidJsonStreamError,
+    iter_json_array_items,
+)
 
-class SpanshStationService(Enum):
-    BLACK_MARKET = "black market"
-    DOCK = "dock"
-    MISSIONS = "missions"
-    REFUEL = "refuel"
-    REPAIR = "repair"
-    RESTOCK = "restock"
-    UNIVERSAL_CARTOGRAPHICS = "universal cartographics"
+SPANSH_RESPONSE_CHUNK_SIZE = 64 * 1024
+
+# Fields of the stations search results that can be large, to drop when not needed
+SPANSH_STATION_HEAVY_FIELDS = ("market", "modules", "ships")
+
+
+class SpanshStationService(Flag):
+    BLACK_MARKET = auto()
+    DOCK = auto()
+    MARKET = auto()
+    MISSIONS = auto()
+    OUTFITTING = auto()
+    REFUEL = auto()
+    REPAIR = auto()
+    RESTOCK = auto()
+    SHIPYARD = auto()
+    UNIVERSAL_CARTOGRAPHICS = auto()
+
+
+# Services of the stations search results, by lowercase name
+SPANSH_STATION_SERVICES_BY_NAME = {
+    "black market": SpanshStationService.BLACK_MARKET,
+    "dock": SpanshStationService.DOCK,
+    "missions": SpanshStationService.MISSIONS,
+    "refuel": SpanshStationService.REFUEL,
+    "repair": SpanshStationService.REPAIR,
+    "restock": SpanshStationService.RESTOCK,
+    "universal cartographics": SpanshStationService.UNIVERSAL_CARTOGRAPHICS,
+}
+
+SPANSH_STATION_SERVICES_BY_STATION_SERVICE = {
+    StationService.BLACK_MARKET: SpanshStationService.BLACK_MARKET,
+    StationService.DOCKING: SpanshStationService.DOCK,
+    StationService.MARKET: SpanshStationService.MARKET,
+    StationService.MISSIONS: SpanshStationService.MISSIONS,
+    StationService.OUTFITTING: SpanshStationService.OUTFITTING,
+    StationService.REFUEL: SpanshStationService.REFUEL,
+    StationService.REPAIR: SpanshStationService.REPAIR,
+    StationService.RESTOCK: SpanshStationService.RESTOCK,
+    StationService.SHIPYARD: SpanshStationService.SHIPYARD,
+    StationService.UNIVERSAL_CARTOGRAPHICS: (
+        SpanshStationService.UNIVERSAL_CARTOGRAPHICS
+    ),
+}
 
 
 def get_station_max_landing_pad_size(station: dict[str, Any]) -> StationLandingPadSize:
@@ -24,21 +68,32 @@ def get_station_max_landing_pad_size(station: dict[str, Any]) -> StationLandingP
     return StationLandingPadSize.SMALL
 
 
-def station_has_service(
-    station: dict[str, Any], service_to_find: SpanshStationService
-) -> bool:
-    """Check if a station has a service."""
-    return (
-        next(
-            (
-                service
-                for service in station["services"]
-                if service["name"].lower() == service_to_find.value.lower()
-            ),
-            None,
+def get_station_services(station: dict[str, Any]) -> SpanshStationService:
+    """Get the services of a station, in a single pass over its services list."""
+    services = SpanshStationService(0)
+    for service in station.get("services", ()):
+        services |= SPANSH_STATION_SERVICES_BY_NAME.get(
+            service["name"].lower(), SpanshStationService(0)
         )
-        is not None
-    )
+
+    # The market, outfitting and shipyard have their own fields
+    if station.get("has_market", False):
+        services |= SpanshStationService.MARKET
+    if station.get("has_outfitting", False):
+        services |= SpanshStationService.OUTFITTING
+    if station.get("has_shipyard", False):
+        services |= SpanshStationService.SHIPYARD
+    return services
+
+
+def get_spansh_station_services(
+    services: Iterable[StationService],
+) -> SpanshStationService:
+    """Get the Spansh services flags matching the given station services."""
+    spansh_services = SpanshStationService(0)
+    for service in services:
+        spansh_services |= SPANSH_STATION_SERVICES_BY_STATION_SERVICE[service]
+    return spansh_services
 
 
 def get_request_body_common_filters() -> dict[str, Any]:
@@ -78,3 +133,31 @@ def get_formatted_reference_system(system: str) -> str:
     return (
         formatted_system.title() if formatted_system[0].islower() else formatted_system
     )
+
+
+async def iter_spansh_search_results(
+    url: str, body: dict[str, Any], omitted_fields: Collection[str] = ()
+) -> AsyncIterator[dict[str, Any]]:
+    """Search with the Spansh API, and iterate over the results as they are received.
+
+    The response is decoded incrementally, and the omitted fields of each result are
+    dropped as soon as it is decoded, so that the full response is never in memory.
+
+    :raises ContentFetchingException: Unable to retrieve the results
+    """
+    session = get_shared_async_niquests_session(url)
+    try:
+        response = cast(
+            "niquests.AsyncResponse", await session.post(url, json=body, stream=True)
+        )
+        try:
+            response.raise_for_status()
+            chunks = await response.iter_content(SPANSH_RESPONSE_CHUNK_SIZE)
+            async for item in iter_json_array_items(cast("Any", chunks), "results"):
+                for field in omitted_fields:
+                    item.pop(field, None)
+                yield item
+        finally:
+            await response.close()
+    except (niquests.exceptions.RequestException, InvalidJsonStreamError) as e:
+        raise ContentFetchingError() from e
@@ -0,0 +1,400 @@
+import array
+import bisect
+import functools
+import heapq
+import math
+import operator
+import pickle
+import tempfile
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from loguru import logger
+
+from app.config import SYSTEMS_INDEX_PATH
+from app.models.systems import NearbySystem, System
+from app.services.helpers.columnar import ColumnarFile, decode_string, write_columns
+from app.services.helpers.dumps import iter_dump_items
+from app.services.helpers.grid import (
+    GRID_CELL_SIZE,
+    get_cell_key,
+    get_cube_columns_count,
+    get_grown_half_side,
+    iter_cube_cell_key_ranges,
+)
+
+# Number of systems sorted in memory at once when building the index, the sorted
+# chunks being then merged from temporary files
+SYSTEMS_INDEX_CHUNK_SIZE = 1_000_000
+# Number of systems pickled together in the temporary files
+SYSTEMS_INDEX_CHUNK_BATCH_SIZE = 10_000
+
+# Sort key, name, x, y, z, population and permit of a system from a dump
+type DumpSystem = tuple[str, str, float, float, float, int, bool]
+
+
+def _get_sort_key(name: str) -> str:
+    return name.lower()
+
+
+class _Grid(NamedTuple):
+    """Columns of a grid: its non-empty cells, their starts and the systems in them."""
+
+    cells: memoryview
+    cells_starts: memoryview
+    cells_systems: memoryview
+
+
+class SystemsIndex:
+    """Local index of systems, built from a dump by build_systems_index().
+
+    Systems are stored sorted by name (case-insensitively) in a memory-mapped file,
+    one column per attribute, so that name lookups are binary searches that only
+    read a few names from the file.
+
+    For spatial queries, the file also contains a grid: the positions of the systems
+    sorted by cell, and the start of each (non-empty) cell in this list. As the cells
+    are sorted on (x, y, z), the cells of a column of the grid along z are contiguous.
+    A second grid only contains the populated systems.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self._file = ColumnarFile(path)
+        self._names = self._file.column("names")
+        self._name_offsets = self._file.column("name_offsets")
+        self._x = self._file.column("x")
+        self._y = self._file.column("y")
+        self._z = self._file.column("z")
+        self._population = self._file.column("population")
+        self._permit_required = self._file.column("permit_required")
+        self._populated = self._file.column("populated")
+        self._grid = _Grid(
+            self._file.column("cells"),
+            self._file.column("cells_starts"),
+            self._file.column("cells_systems"),
+        )
+        self._populated_grid = _Grid(
+            self._file.column("populated_cells"),
+            self._file.column("populated_cells_starts"),
+            self._file.column("populated_cells_systems"),
+        )
+
+    def __len__(self) -> int:
+        """Get the number of systems in the index."""
+        return len(self._name_offsets) - 1
+
+    def get_name(self, position: int) -> str:
+        """Get the name of the system at the given position."""
+        return decode_string(self._names, self._name_offsets, position)
+
+    def _get_first_position(self, key: str) -> int:
+        """Get the position of the first name whose sort key is not lower than key."""
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if _get_sort_key(self.get_name(middle)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find(self, name: str) -> int | None:
+        """Get the position of the system with the given name (ignoring case)."""
+        key = _get_sort_key(name)
+        position = self._get_first_position(key)
+        if position < len(self) and _get_sort_key(self.get_name(position)) == key:
+            return position
+        return None
+
+    def search_prefix(self, prefix: str, limit: int) -> list[str]:
+        """Get the names starting with the given prefix (ignoring case)."""
+        key = _get_sort_key(prefix)
+        names: list[str] = []
+        position = self._get_first_position(key)
+        while position < len(self) and len(names) < limit:
+            name = self.get_name(position)
+            if not _get_sort_key(name).startswith(key):
+                break
+            names.append(name)
+            position += 1
+        return names
+
+    def get_system(self, name: str) -> System | None:
+        """Get the system with the given name (ignoring case)."""
+        position = self.find(name)
+        if position is None:
+            return None
+
+        return System(
+            name=self.get_name(position),
+            x=self._x[position],
+            y=self._y[position],
+            z=self._z[position],
+            permit_required=bool(self._permit_required[position]),
+        )
+
+    def _get_nearby_system(self, position: int, distance: float) -> NearbySystem:
+        return NearbySystem(
+            name=self.get_name(position),
+            x=self._x[position],
+            y=self._y[position],
+            z=self._z[position],
+            permit_required=bool(self._permit_required[position]),
+            population=self._population[position],
+            distance_in_ly=round(distance, 2),
+        )
+
+    def _get_distances(
+        self, origin: System, positions: Iterable[int]
+    ) -> list[tuple[float, int]]:
+        """Get the distance from the origin of the systems at the given positions."""
+        x, y, z = self._x, self._y, self._z
+        origin_coordinates = (origin.x, origin.y, origin.z)
+        return [
+            (
+                math.dist(origin_coordinates, (x[position], y[position], z[position])),
+                position,
+            )
+            for position in positions
+        ]
+
+    def _get_positions_in_cube(
+        self, grid: _Grid, center: System, half_side: float
+    ) -> list[int]:
+        """Get the positions of the systems of the grid in the cells overlapping the cube."""
+        positions: list[int] = []
+        for first_key, last_key in iter_cube_cell_key_ranges(
+            center.x, center.y, center.z, half_side
+        ):
+            first_cell = bisect.bisect_left(grid.cells, first_key)
+            last_cell = bisect.bisect_right(grid.cells, last_key)
+            if first_cell < last_cell:
+                start = grid.cells_starts[first_cell]
+                end = grid.cells_starts[last_cell]
+                positions.extend(grid.cells_systems[start:end])
+        return positions
+
+    def get_systems_within(
+        self, origin: System, radius: float, limit: int
+    ) -> list[NearbySystem]:
+        """Get the systems at most radius ly away from the origin (excluding it), closest first."""
+        origin_position = self.find(origin.name)
+        distances = [
+            (distance, position)
+            for distance, position in self._get_distances(
+                origin, self._get_positions_in_cube(self._grid, origin, radius)
+            )
+            if distance <= radius and position != origin_position
+        ]
+        return [
+            self._get_nearby_system(position, distance)
+            for distance, position in heapq.nsmallest(limit, distances)
+        ]
+
+    def get_nearest_populated_systems(
+        self, origin: System, count: int
+    ) -> list[NearbySystem]:
+        """Get the count populated systems closest to the origin (excluding it).
+
+        Systems are searched in a cube around the origin, grown until it contains enough
+        of them at most its half side away (so none closer can be missing), or until it
+        is cheaper to check all the populated systems.
+        """
+        origin_position = self.find(origin.name)
+        half_side = GRID_CELL_SIZE
+        while True:
+            if get_cube_columns_count(half_side) >= len(self._populated):
+                positions: Iterable[int] = self._populated
+                max_distance = math.inf
+            else:
+                positions = self._get_positions_in_cube(
+                    self._populated_grid, origin, half_side
+                )
+                max_distance = half_side
+
+            distances = [
+                (distance, position)
+                for distance, position in self._get_distances(origin, positions)
+                if distance <= max_distance and position != origin_position
+            ]
+            if len(distances) >= count or max_distance == math.inf:
+                return [
+                    self._get_nearby_system(position, distance)
+                    for distance, position in heapq.nsmallest(count, distances)
+                ]
+            half_side = get_grown_half_side(half_side, len(distances), count)
+
+
+def _get_dump_system(item: dict[str, Any]) -> DumpSystem:
+    """Get a system from an EDSM or Spansh dump item."""
+    coordinates = item["coords"]
+    return (
+        _get_sort_key(item["name"]),
+        item["name"],
+        coordinates["x"],
+        coordinates["y"],
+        coordinates["z"],
+        item.get("population") or 0,
+        item.get("requirePermit", item.get("needsPermit", False)),
+    )
+
+
+def _write_sorted_chunk(systems: list[DumpSystem], path: Path) -> None:
+    # Stable sort, so that systems with the same name stay in the dump order
+    systems.sort(key=operator.itemgetter(0))
+    with open(path, "wb") as chunk_file:
+        for start in range(0, len(systems), SYSTEMS_INDEX_CHUNK_BATCH_SIZE):
+            pickle.dump(
+                systems[start : start + SYSTEMS_INDEX_CHUNK_BATCH_SIZE], chunk_file
+            )
+
+
+def _iter_chunk(path: Path) -> Iterator[DumpSystem]:
+    with open(path, "rb") as chunk_file:
+        while True:
+            try:
+                # Files are only written by _write_sorted_chunk() above
+                batch = pickle.load(chunk_file)  # noqa: S301
+            except EOFError:
+                return
+            yield from batch
+
+
+def _iter_sorted_dump_systems(
+    dump_path: str | Path, directory: Path
+) -> Iterator[DumpSystem]:
+    """Iterate over the systems of a dump sorted by name (ignoring case).
+
+    The dump is split in sorted chunks written in the directory, then merged, so that
+    dumps of the whole galaxy do not have to fit in memory. The first system is kept
+    for names used multiple times.
+    """
+    chunks_paths: list[Path] = []
+    systems: list[DumpSystem] = []
+    for item in iter_dump_items(dump_path):
+        systems.append(_get_dump_system(item))
+        if len(systems) >= SYSTEMS_INDEX_CHUNK_SIZE:
+            chunks_paths.append(directory / f"{len(chunks_paths)}.chunk")
+            _write_sorted_chunk(systems, chunks_paths[-1])
+            systems = []
+    if systems:
+        chunks_paths.append(directory / f"{len(chunks_paths)}.chunk")
+        _write_sorted_chunk(systems, chunks_paths[-1])
+    del systems
+
+    # The merge is stable too, chunks being in the dump order
+    sort_key: str | None = None
+    names: set[str] = set()
+    for system in heapq.merge(
+        *(_iter_chunk(path) for path in chunks_paths), key=operator.itemgetter(0)
+    ):
+        if system[0] != sort_key:
+            sort_key = system[0]
+            names.clear()
+        elif system[1] in names:
+            continue
+        names.add(system[1])
+        yield system
+
+
+def _build_grid(
+    cells_keys: array.array, positions: Iterable[int]
+) -> tuple[array.array, array.array, array.array]:
+    """Get the columns of the grid of the systems at the given positions.
+
+    The systems are sorted by cell with a counting sort, keeping their order in each
+    cell, so that only the arrays are held in memory.
+    """
+    positions_counts = Counter(cells_keys[position] for position in positions)
+    cells = array.array("q", sorted(positions_counts))
+    cells_starts = array.array("Q")
+    next_indexes: dict[int, int] = {}
+    start = 0
+    for cell in cells:
+        cells_starts.append(start)
+        next_indexes[cell] = start
+        start += positions_counts[cell]
+    cells_starts.append(start)
+
+    cells_systems = array.array("Q", bytes(8 * start))
+    for position in positions:
+        cell = cells_keys[position]
+        cells_systems[next_indexes[cell]] = position
+        next_indexes[cell] += 1
+    return cells, cells_starts, cells_systems
+
+
+def build_systems_index(dump_path: str | Path, output_path: str | Path) -> int:
+    """Build the systems index file from an EDSM or Spansh systems dump.
+
+    Return the number of systems in the index.
+    """
+    # Names are stored as encoded by encode_strings()
+    names, name_offsets = array.array("B"), array.array("Q", [0])
+    # Coordinates in the dumps are multiples of 1/32 ly, so floats are exact enough
+    x, y, z = array.array("f"), array.array("f"), array.array("f")
+    population, permit_required = array.array("Q"), array.array("B")
+    populated, cells_keys = array.array("Q"), array.array("q")
+
+    with tempfile.TemporaryDirectory(dir=Path(output_path).parent) as directory:
+        for position, system in enumerate(
+            _iter_sorted_dump_systems(dump_path, Path(directory))
+        ):
+            _, name, system_x, system_y, system_z, system_population, system_permit = (
+                system
+            )
+            names.frombytes(name.encode())
+            name_offsets.append(len(names))
+            x.append(system_x)
+            y.append(system_y)
+            z.append(system_z)
+            population.append(system_population)
+            permit_required.append(system_permit)
+            if system_population:
+                populated.append(position)
+            cells_keys.append(get_cell_key(x[-1], y[-1], z[-1]))
+
+    systems_count = len(name_offsets) - 1
+    cells, cells_starts, cells_systems = _build_grid(cells_keys, range(systems_count))
+    populated_cells, populated_cells_starts, populated_cells_systems = _build_grid(
+        cells_keys, populated
+    )
+    del cells_keys
+
+    write_columns(
+        output_path,
+        {
+            "names": names,
+            "name_offsets": name_offsets,
+            "x": x,
+            "y": y,
+            "z": z,
+            "population": population,
+            "permit_required": permit_required,
+            "populated": populated,
+            "cells": cells,
+            "cells_starts": cells_starts,
+            "cells_systems": cells_systems,
+            "populated_cells": populated_cells,
+            "populated_cells_starts": populated_cells_starts,
+            "populated_cells_systems": populated_cells_systems,
+        },
+    )
+    return systems_count
+
+
+@functools.cache
+def get_systems_index() -> SystemsIndex | None:
+    """Get the local systems index, or None if it is not configured or unavailable."""
+    if SYSTEMS_INDEX_PATH is None:
+        return None
+
+    try:
+        return SystemsIndex(SYSTEMS_INDEX_PATH)
+    except Exception:
+        logger.opt(exception=True).warning(
+            f"Could not load the systems index from {SYSTEMS_INDEX_PATH}"
+        )
+        return None
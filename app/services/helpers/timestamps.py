@@ -0,0 +1,24 @@
+import datetime
+import functools
+
+from dateutil.parser import parse
+
+# Timestamps are shared by many results (same update batch) and requests
+TIMESTAMPS_CACHE_MAX_ENTRIES = 4096
+
+
+@functools.lru_cache(maxsize=TIMESTAMPS_CACHE_MAX_ENTRIES)
+def parse_timestamp(value: str) -> datetime.datetime:
+    """Parse a timestamp from Spansh, Frontier or Inara.
+
+    These are ISO 8601 timestamps (like "2024-03-01 10:20:30+00"), parsed with
+    datetime.fromisoformat(), which is much faster than dateutil. Other formats are
+    parsed with dateutil.
+    The result is timezone-aware if the timestamp has an offset, naive otherwise.
+
+    :raises ValueError: Unable to parse the timestamp
+    """
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return parse(value)
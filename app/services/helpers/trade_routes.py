@@ -0,0 +1,259 @@
+import bisect
+import heapq
+import math
+from collections.abc import Callable, Collection, Iterable, Iterator
+from typing import NamedTuple
+
+from loguru import logger
+
+from app.services.helpers.grid import (
+    MIN_GRID_CELL_SIZE,
+    get_cell_key,
+    iter_cube_cell_key_ranges,
+)
+from app.services.helpers.market_snapshot import MarketQuote
+
+# Most pairs of stations compared for a search, so that a dense area does not keep a
+# worker thread busy for long: the best routes found until then are returned, pairs
+# being compared from the most promising sources
+MAX_COMPARED_STATIONS_PAIRS = 100_000
+
+
+class Trade(NamedTuple):
+    """Buying a commodity at a station to sell it at another one."""
+
+    profit: int
+    commodity_name: str
+    buy_price: int
+    sell_price: int
+    quantity: int
+
+
+class Route(NamedTuple):
+    """Trade from a source station to a destination one, and back for round trips."""
+
+    profit: int
+    source: int
+    destination: int
+    trade: Trade
+    return_trade: Trade | None
+
+
+class _Offer(NamedTuple):
+    """Commodity sold by a station, with the most profit that can be made of it."""
+
+    max_profit: int
+    commodity_name: str
+    buy_price: int
+    quantity: int
+
+
+class _Markets:
+    """Offers and bids of the stations of an area, indexed for trades searches.
+
+    Stations are positions in the market snapshot. They are sorted by cell of a grid
+    with cells of half the jump range, so that the stations one jump away from a
+    station are found with binary searches.
+    """
+
+    def __init__(
+        self,
+        quotes: dict[str, list[MarketQuote]],
+        get_coordinates: Callable[[int], tuple[float, float, float]],
+        jump_range: float,
+        cargo_capacity: int,
+    ) -> None:
+        self.jump_range = jump_range
+        # Offers of each station by decreasing max profit, and bids by commodity name
+        self.offers: dict[int, list[_Offer]] = {}
+        self.bids: dict[int, dict[str, tuple[int, int]]] = {}
+        for commodity_name, commodity_quotes in quotes.items():
+            max_sell_price = max(
+                (quote.sell_price for quote in commodity_quotes if quote.demand),
+                default=0,
+            )
+            for quote in commodity_quotes:
+                if quote.demand and quote.sell_price:
+                    self.bids.setdefault(quote.station, {})[commodity_name] = (
+                        quote.sell_price,
+                        quote.demand,
+                    )
+                if quote.supply and 0 < quote.buy_price < max_sell_price:
+                    quantity = min(cargo_capacity, quote.supply)
+                    self.offers.setdefault(quote.station, []).append(
+                        _Offer(
+                            (max_sell_price - quote.buy_price) * quantity,
+                            commodity_name,
+                            quote.buy_price,
+                            quantity,
+                        )
+                    )
+        for station_offers in self.offers.values():
+            station_offers.sort(reverse=True)
+
+        self.coordinates = {
+            station: get_coordinates(station)
+            for station in self.offers.keys() | self.bids.keys()
+        }
+        self._cell_size = max(jump_range / 2, MIN_GRID_CELL_SIZE)
+        cells = sorted(
+            (get_cell_key(*coordinates, self._cell_size), station)
+            for station, coordinates in self.coordinates.items()
+        )
+        self._cells_keys = [cell_key for cell_key, _ in cells]
+        self._cells_stations = [station for _, station in cells]
+
+    def get_max_profit(self, station: int) -> int:
+        """Get the most profit that can be made by buying a commodity at the station."""
+        station_offers = self.offers.get(station)
+        return station_offers[0].max_profit if station_offers else 0
+
+    def iter_stations_in_range(self, station: int) -> Iterator[int]:
+        """Iterate over the other stations at most one jump away from the station."""
+        center = self.coordinates[station]
+        for first_key, last_key in iter_cube_cell_key_ranges(
+            *center, self.jump_range, self._cell_size
+        ):
+            first = bisect.bisect_left(self._cells_keys, first_key)
+            last = bisect.bisect_right(self._cells_keys, last_key, first)
+            for other_station in self._cells_stations[first:last]:
+                if (
+                    other_station != station
+                    and math.dist(center, self.coordinates[other_station])
+                    <= self.jump_range
+                ):
+                    yield other_station
+
+    def get_best_trade(
+        self, seller: int, buyer: int, min_profit: int = 0
+    ) -> Trade | None:
+        """Get the most profitable trade between two stations, if more than min_profit.
+
+        Offers are checked by decreasing max profit, until none can be better.
+        """
+        buyer_bids = self.bids.get(buyer)
+        if buyer_bids is None:
+            return None
+
+        best_trade = None
+        for offer in self.offers.get(seller, ()):
+            if offer.max_profit <= min_profit:
+                break
+            bid = buyer_bids.get(offer.commodity_name)
+            if bid is None:
+                continue
+
+            sell_price, demand = bid
+            quantity = min(offer.quantity, demand)
+            profit = (sell_price - offer.buy_price) * quantity
+            if profit > min_profit:
+                best_trade = Trade(
+                    profit, offer.commodity_name, offer.buy_price, sell_price, quantity
+                )
+                min_profit = profit
+        return best_trade
+
+
+def _push_route(routes: list[Route], route: Route, limit: int) -> None:
+    if len(routes) < limit:
+        heapq.heappush(routes, route)
+    else:
+        heapq.heappushpop(routes, route)
+
+
+def get_best_routes(
+    quotes: dict[str, list[MarketQuote]],
+    sources: Collection[int],
+    get_coordinates: Callable[[int], tuple[float, float, float]],
+    jump_range: float,
+    cargo_capacity: int,
+    round_trip: bool,
+    limit: int,
+    max_compared_pairs: int = MAX_COMPARED_STATIONS_PAIRS,
+) -> list[Route]:
+    """Get the most profitable routes from the sources to a station one jump away.
+
+    Stations are positions in the market snapshot. Each trade buys as much as the
+    cargo, supply and demand allow. For round trips, a commodity is also bought at the
+    destination to be sold at the source.
+
+    Sources are searched by decreasing max profit (against the best sell prices of the
+    area), until none can beat the routes found. Their trades are only compared with
+    those of the stations in range, and only for the commodities that can beat them.
+    """
+    markets = _Markets(quotes, get_coordinates, jump_range, cargo_capacity)
+    # For round trips, the return trade is bought at the destination
+    max_return_profit = (
+        max(map(markets.get_max_profit, markets.coordinates), default=0)
+        if round_trip
+        else 0
+    )
+
+    # Best routes found, with the least profitable first
+    routes: list[Route] = []
+    compared_pairs = 0
+    for source in sorted(
+        (source for source in sources if source in markets.offers),
+        key=markets.get_max_profit,
+        reverse=True,
+    ):
+        min_profit = routes[0].profit if len(routes) == limit else 0
+        if markets.get_max_profit(source) + max_return_profit <= min_profit:
+            break
+
+        for destination in _iter_destinations(markets, source, sources, round_trip):
+            if compared_pairs == max_compared_pairs:
+                logger.warning(
+                    f"Trade routes search stopped after {compared_pairs} station pairs"
+                )
+                return sorted(routes, reverse=True)
+            compared_pairs += 1
+
+            min_profit = routes[0].profit if len(routes) == limit else 0
+            if not round_trip:
+                trade = markets.get_best_trade(source, destination, min_profit)
+                if trade is not None:
+                    _push_route(
+                        routes,
+                        Route(trade.profit, source, destination, trade, None),
+                        limit,
+                    )
+                continue
+
+            trade = markets.get_best_trade(
+                source,
+                destination,
+                max(0, min_profit - markets.get_max_profit(destination)),
+            )
+            if trade is None:
+                continue
+            return_trade = markets.get_best_trade(
+                destination, source, max(0, min_profit - trade.profit)
+            )
+            if return_trade is not None:
+                _push_route(
+                    routes,
+                    Route(
+                        trade.profit + return_trade.profit,
+                        source,
+                        destination,
+                        trade,
+                        return_trade,
+                    ),
+                    limit,
+                )
+
+    return sorted(routes, reverse=True)
+
+
+def _iter_destinations(
+    markets: _Markets, source: int, sources: Collection[int], round_trip: bool
+) -> Iterable[int]:
+    """Iterate over the stations in range of a source that buy commodities."""
+    for destination in markets.iter_stations_in_range(source):
+        if destination not in markets.bids:
+            continue
+        # Only keep one direction of the round trips between two sources
+        if round_trip and destination in sources and destination < source:
+            continue
+        yield destination
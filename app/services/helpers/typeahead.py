@@ -0,0 +1,127 @@
+import bisect
+import heapq
+import unicodedata
+from collections.abc import Iterable
+
+# Ranks of the matches, lower is better
+EXACT_MATCH = 0
+PREFIX_MATCH = 1
+WORD_PREFIX_MATCH = 2
+INFIX_MATCH = 3
+
+
+def fold_text(text: str) -> str:
+    """Fold a text for matching: lowercase, without accents and punctuation."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    characters = (
+        character if character.isalnum() else " "
+        for character in decomposed
+        if not unicodedata.combining(character)
+    )
+    return " ".join("".join(characters).split())
+
+
+def _get_trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class TypeaheadIndex:
+    """In-memory index for autocomplete, built once for a list of values.
+
+    Values are matched on their folded form (see fold_text), with the following
+    structures:
+    - folded values sorted for prefix search (a flattened prefix trie)
+    - folded values suffixes starting at each word, sorted for word prefix search
+    - trigrams of the folded values for infix search
+
+    Results are ranked: exact match, then prefix, word prefix and infix matches, each
+    group sorted by length then alphabetically.
+    """
+
+    def __init__(self, values: Iterable[str]) -> None:
+        self.values = tuple(dict.fromkeys(values))
+        self._folded_values = [fold_text(value) for value in self.values]
+
+        self._prefixes = sorted(
+            (folded_value, position)
+            for position, folded_value in enumerate(self._folded_values)
+        )
+
+        self._word_prefixes = sorted(
+            (folded_value[word_start:], position)
+            for position, folded_value in enumerate(self._folded_values)
+            for word_start in self._get_words_starts(folded_value)
+        )
+
+        self._trigrams: dict[str, set[int]] = {}
+        for position, folded_value in enumerate(self._folded_values):
+            for trigram in _get_trigrams(folded_value):
+                self._trigrams.setdefault(trigram, set()).add(position)
+
+    @staticmethod
+    def _get_words_starts(folded_value: str) -> list[int]:
+        return [
+            index + 1
+            for index, character in enumerate(folded_value)
+            if character == " "
+        ]
+
+    def search(
+        self, query: str, limit: int | None = None, infix: bool = False
+    ) -> list[str]:
+        """Get the values matching the query, best matches first.
+
+        Values are matched on their prefix, or anywhere if infix is True.
+        """
+        folded_query = fold_text(query)
+        if not folded_query:
+            return list(self.values[:limit])
+
+        ranks: dict[int, int] = {}
+        for position in self._search_sorted(self._prefixes, folded_query):
+            ranks[position] = (
+                EXACT_MATCH
+                if self._folded_values[position] == folded_query
+                else PREFIX_MATCH
+            )
+
+        if infix:
+            for position in self._search_sorted(self._word_prefixes, folded_query):
+                ranks.setdefault(position, WORD_PREFIX_MATCH)
+            for position in self._search_infix(folded_query):
+                ranks.setdefault(position, INFIX_MATCH)
+
+        def sort_key(position: int) -> tuple[int, int, str]:
+            folded_value = self._folded_values[position]
+            return ranks[position], len(folded_value), folded_value
+
+        if limit is None:
+            positions = sorted(ranks, key=sort_key)
+        else:
+            positions = heapq.nsmallest(limit, ranks, key=sort_key)
+        return [self.values[position] for position in positions]
+
+    def _search_sorted(
+        self, keys: list[tuple[str, int]], folded_query: str
+    ) -> Iterable[int]:
+        """Get the positions of the sorted keys starting with the query."""
+        index = bisect.bisect_left(keys, (folded_query,))
+        while index < len(keys) and keys[index][0].startswith(folded_query):
+            yield keys[index][1]
+            index += 1
+
+    def _search_infix(self, folded_query: str) -> Iterable[int]:
+        """Get the positions of the values containing the query."""
+        trigrams = _get_trigrams(folded_query)
+        if not trigrams:
+            candidates: Iterable[int] = range(len(self.values))
+        else:
+            candidates = set.intersection(
+                *(self._trigrams.get(trigram, set()) for trigram in trigrams)
+            )
+
+        return (
+            position
+            for position in candidates
+            if folded_query in self._folded_values[position]
+        )
@@ -1,79 +1,165 @@
+import asyncio
+import datetime
 from typing import Any
 
 import niquests
-from dateutil.parser import parse
 from loguru import logger
 
+from app.database.database import Session
+from app.database.news_article import StoredNewsArticle
 from app.helpers.frontier import get_frontier_api_url_for_language
-from app.helpers.niquests import get_async_niquests_session
+from app.helpers.html_text import get_text_from_html
+from app.helpers.jsonapi import JsonApiDocument, JsonApiResource, get_published_at
+from app.helpers.niquests import get_shared_async_niquests_session
 from app.models.exceptions import ContentFetchingError
 from app.models.language import Language
 from app.models.news import NewsArticle
+from app.services.helpers.article_search import (
+    get_search_terms,
+    search_articles,
+    store_articles,
+)
+from app.services.helpers.cache import async_cached
 
+NEWS_TTL = datetime.timedelta(minutes=10)
 
-def _get_picture_url_for_article(api_response: Any, article_id: str) -> str | None:
-    article = next((x for x in api_response["data"] if x["id"] == article_id), None)
-    if article is None:
-        return None
 
-    article_include_id = article["relationships"]["field_image_entity"]["data"]["id"]
+@async_cached(ttl=NEWS_TTL, stale_ttl=NEWS_TTL)
+async def _get_articles_from_cms(language: Language) -> dict[str, Any]:
+    """Get the latest news articles from the CMS (as a JSON:API document).
 
-    # Get related include item to get picture ID
-    related_include = next(
-        (x for x in api_response["included"] if x["id"] == article_include_id), None
+    :raises ContentFetchingException: Unable to retrieve the articles
+    """
+    url = (
+        f"{get_frontier_api_url_for_language(language)}/news_article"
+        "?include=field_image_entity.field_media_image,field_site&filter[hide_listing][condition][path]=field_hide_from_website_listings&filter[hide_listing][condition][operator]=%3D&filter[hide_listing][condition][value]=0&filter[field_featured_bool]=1&sort[sort-published][path]=published_at&sort[sort-published][direction]=DESC&filter[site][condition][path]=field_site.id&filter[site][condition][value]=79c77f84-e711-4897-bc3d-008af069ddbd"
     )
-    if related_include is None:
+
+    session = get_shared_async_niquests_session(url)
+    try:
+        api_response = await session.get(url)
+        api_response.raise_for_status()
+    except niquests.exceptions.RequestException as e:
+        raise ContentFetchingError() from e
+
+    return api_response.json()
+
+
+def _get_picture_url_for_article(
+    document: JsonApiDocument, article: JsonApiResource
+) -> str | None:
+    picture = document.resolve(article, "field_image_entity", "field_media_image")
+    return None if picture is None else picture["attributes"]["uri"]["url"]
+
+
+def _get_picture_url(document: JsonApiDocument, item: JsonApiResource) -> str | None:
+    try:
+        return _get_picture_url_for_article(document, item)
+    except Exception:
+        logger.error(f"Couldn't get picture for article {item['id']}")
         return None
-    article_picture_id = related_include["relationships"]["field_media_image"]["data"][
-        "id"
-    ]
 
-    # Get picture
-    picture = next(
-        (x for x in api_response["included"] if x["id"] == article_picture_id), None
+
+def _get_stored_article(
+    document: JsonApiDocument, item: JsonApiResource, language: Language
+) -> StoredNewsArticle:
+    """Get the article to store from a CMS article."""
+    content = item["attributes"]["body"]["value"]
+    return StoredNewsArticle(
+        title=item["attributes"]["title"],
+        content=content,
+        plain_content=get_text_from_html(content),
+        slug=item["attributes"]["field_slug"],
+        picture=_get_picture_url(document, item),
+        published_at=get_published_at(item),
+        id=item["id"],
+        language=language.value,
     )
-    return None if picture is None else picture["attributes"]["uri"]["url"]
 
 
 class NewsService:
     """Main class for the news service."""
 
+    NUMBER_OF_ARTICLES = 50
+
+    def _get_article(self, article: StoredNewsArticle) -> NewsArticle:
+        return NewsArticle(
+            content=article.content,
+            uri=f"https://www.elitedangerous.com/news/{article.slug}",
+            picture=article.picture,
+            title=article.title,
+            published_date=article.published_at.date(),
+        )
+
+    def _get_article_from_cms(
+        self, document: JsonApiDocument, item: JsonApiResource
+    ) -> NewsArticle:
+        attributes = item["attributes"]
+        return NewsArticle(
+            content=attributes["body"]["value"],
+            uri=f"https://www.elitedangerous.com/news/{attributes['field_slug']}",
+            picture=_get_picture_url(document, item),
+            title=attributes["title"],
+            published_date=get_published_at(item).date(),
+        )
+
     async def get_articles(self, language: Language) -> list[NewsArticle]:
         """Get the latest news articles.
 
         :raises ContentFetchingException: Unable to retrieve the articles
         """
-        url = (
-            f"{get_frontier_api_url_for_language(language)}/news_article"
-            "?include=field_image_entity.field_media_image,field_site&filter[hide_listing][condition][path]=field_hide_from_website_listings&filter[hide_listing][condition][operator]=%3D&filter[hide_listing][condition][value]=0&filter[field_featured_bool]=1&sort[sort-published][path]=published_at&sort[sort-published][direction]=DESC&filter[site][condition][path]=field_site.id&filter[site][condition][value]=79c77f84-e711-4897-bc3d-008af069ddbd"
-        )
+        document = JsonApiDocument(await _get_articles_from_cms(language))
+        return [self._get_article_from_cms(document, item) for item in document.data]
+
+    async def sync_articles(self, language: Language) -> int:
+        """Store the latest news articles (for search), and return their count.
 
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.get(url)
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
-
-        articles = api_response.json()
-
-        # Build response
-        response_list: list[NewsArticle] = []
-
-        for item in articles["data"]:
-            try:
-                picture = _get_picture_url_for_article(articles, item["id"])
-            except Exception:
-                logger.error(f"Couldn't get picture for article {item['id']}")
-                picture = None
-
-            new_item = NewsArticle(
-                content=item["attributes"]["body"]["value"],
-                uri=f"https://www.elitedangerous.com/news/{item['attributes']['field_slug']}",
-                picture=picture,
-                title=item["attributes"]["title"],
-                published_date=parse(item["attributes"]["published_at"]).date(),
+        :raises ContentFetchingException: Unable to retrieve the articles
+        """
+        document = JsonApiDocument(await _get_articles_from_cms.refresh(language))
+        await asyncio.to_thread(self._store_articles, document, language)
+
+        logger.info(f"{len(document.data)} news articles synced for {language.value}")
+        return len(document.data)
+
+    def _store_articles(self, document: JsonApiDocument, language: Language) -> None:
+        with Session.begin() as session:
+            store_articles(
+                session,
+                StoredNewsArticle,
+                [
+                    _get_stored_article(document, item, language)
+                    for item in document.data
+                ],
             )
-            response_list.append(new_item)
 
-        return response_list
+    async def search_articles(
+        self,
+        query: str,
+        language: Language,
+        published_after: datetime.date | None,
+        published_before: datetime.date | None,
+        page: int,
+    ) -> list[NewsArticle]:
+        """Search the stored news articles, best matches first."""
+        terms = get_search_terms(query)
+        if not terms:
+            return []
+
+        def search() -> list[NewsArticle]:
+            with Session() as session:
+                return [
+                    self._get_article(article)
+                    for article in search_articles(
+                        session,
+                        StoredNewsArticle,
+                        terms,
+                        language,
+                        published_after,
+                        published_before,
+                        limit=self.NUMBER_OF_ARTICLES,
+                        offset=(page - 1) * self.NUMBER_OF_ARTICLES,
+                    )
+                ]
+
+        return await asyncio.to_thread(search)
@@ -1,80 +1,147 @@
+from __future__ import annotations
+
 import csv
+import dataclasses
+import threading
+from collections.abc import AsyncIterator, Mapping
+from types import MappingProxyType
 from typing import Any
 
-import niquests
-from dateutil.parser import parse
+from loguru import logger
 
 from app.constants import DATA_PATH, SPANSH_STATIONS_SEARCH_URL
-from app.helpers.niquests import get_async_niquests_session
-from app.models.exceptions import ContentFetchingError, OutfittingNotFoundError
+from app.models.exceptions import OutfittingNotFoundError
 from app.models.outfitting import Outfitting, StationWithOutfittingDetails
 from app.models.stations import StationLandingPadSize
 from app.services.helpers.fleet_carriers import is_fleet_carrier
 from app.services.helpers.settlements import is_settlement
 from app.services.helpers.spansh import (
+    SPANSH_STATION_HEAVY_FIELDS,
     get_formatted_reference_system,
     get_max_age_values_for_request_body,
     get_request_body_common_filters,
     get_station_max_landing_pad_size,
+    iter_spansh_search_results,
 )
+from app.services.helpers.timestamps import parse_timestamp
+from app.services.helpers.typeahead import TypeaheadIndex
+
+
+def _get_display_name_for_outfitting(outfitting: Outfitting) -> str:
+    """
+    Get a display name for the specified outfitting item.
+    """
+    name = ""
+    if outfitting.outfitting_class:
+        name += f"[{outfitting.outfitting_class}{outfitting.outfitting_rating}] "
+
+    name += outfitting.name
+    if outfitting.mount:
+        guidance = f"{outfitting.guidance}, " if outfitting.guidance else ""
+        name += f" ({guidance}{outfitting.mount})"
+    elif outfitting.ship:
+        name += f" ({outfitting.ship})"
+
+    return name
+
+
+OUTFITTING_CSV_PATH = f"{DATA_PATH}/outfitting.csv"
+
+
+def _parse_outfitting_csv(path: str) -> list[Outfitting]:
+    items: list[Outfitting] = []
+    with open(path) as csv_file:
+        csv_reader = csv.DictReader(csv_file)
+        items.extend(
+            Outfitting(
+                id=int(row["id"]),
+                symbol=row["symbol"],
+                category=row["category"],
+                name=row["name"],
+                mount=row["mount"],
+                guidance=row["guidance"],
+                ship=row["ship"],
+                outfitting_class=int(row["class"]),
+                outfitting_rating=row["rating"],
+                display_name="",
+            )
+            for row in csv_reader
+        )
 
+    # Compute display names
+    for item in items:
+        item.display_name = _get_display_name_for_outfitting(item)
 
-class OutfittingService:
-    def __init__(self) -> None:
-        self.outfittings = self._parse_outfitting_csv()
-
-    def _parse_outfitting_csv(self) -> list[Outfitting]:
-        items: list[Outfitting] = []
-        with open(DATA_PATH + "/outfitting.csv") as csv_file:
-            csv_reader = csv.DictReader(csv_file)
-            items.extend(
-                Outfitting(
-                    id=int(row["id"]),
-                    symbol=row["symbol"],
-                    category=row["category"],
-                    name=row["name"],
-                    mount=row["mount"],
-                    guidance=row["guidance"],
-                    ship=row["ship"],
-                    outfitting_class=int(row["class"]),
-                    outfitting_rating=row["rating"],
-                    display_name="",
-                )
-                for row in csv_reader
-            )
+    return items
 
-        # Compute display names
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class OutfittingCatalog:
+    """Immutable list of the known outfitting items, indexed by display name."""
+
+    items: tuple[Outfitting, ...]
+    by_display_name: Mapping[str, Outfitting]
+    typeahead: TypeaheadIndex
+
+    @classmethod
+    def from_csv(cls, path: str) -> OutfittingCatalog:
+        """Build the catalog from an outfitting CSV file."""
+        items = tuple(_parse_outfitting_csv(path))
+        by_display_name: dict[str, Outfitting] = {}
         for item in items:
-            item.display_name = self._get_display_name_for_outfitting(item)
+            # Some items share a display name, the first one is kept
+            by_display_name.setdefault(item.display_name, item)
+        return cls(
+            items=items,
+            by_display_name=MappingProxyType(by_display_name),
+            typeahead=TypeaheadIndex(item.display_name for item in items),
+        )
 
-        return items
 
-    def _get_display_name_for_outfitting(self, outfitting: Outfitting) -> str:
-        """
-        Get a display name for the specified outfitting item.
-        """
-        name = ""
-        if outfitting.outfitting_class:
-            name += f"[{outfitting.outfitting_class}{outfitting.outfitting_rating}] "
+_catalog: OutfittingCatalog | None = None
+_catalog_lock = threading.Lock()
+
 
-        name += outfitting.name
-        if outfitting.mount:
-            guidance = f"{outfitting.guidance}, " if outfitting.guidance else ""
-            name += f" ({guidance}{outfitting.mount})"
-        elif outfitting.ship:
-            name += f" ({outfitting.ship})"
+def _load_outfitting_catalog() -> OutfittingCatalog:
+    """Build the catalog from the CSV file and swap it in, with the lock held."""
+    global _catalog
+    catalog = OutfittingCatalog.from_csv(OUTFITTING_CSV_PATH)
+    _catalog = catalog
+    return catalog
 
-        return name
 
-    def get_outfitting_typeahead(self, input_text: str) -> list[str]:
+def get_outfitting_catalog() -> OutfittingCatalog:
+    """Get the process-wide outfitting catalog, building it on first use."""
+    catalog = _catalog
+    if catalog is None:
+        with _catalog_lock:
+            catalog = _catalog or _load_outfitting_catalog()
+    return catalog
+
+
+def reload_outfitting_catalog() -> OutfittingCatalog:
+    """Rebuild the outfitting catalog from the CSV file (e.g. after a data update).
+
+    The new catalog is built before being swapped in, so concurrent requests keep
+    using the previous one until the reload is done.
+    """
+    with _catalog_lock:
+        catalog = _load_outfitting_catalog()
+    logger.info(f"Outfitting catalog reloaded with {len(catalog.items)} items")
+    return catalog
+
+
+class OutfittingService:
+    def __init__(self) -> None:
+        self.catalog = get_outfitting_catalog()
+
+    def get_outfitting_typeahead(
+        self, input_text: str, limit: int | None = None
+    ) -> list[str]:
         """
         Return a list of outfitting matching the input
         """
-        return [
-            item.display_name
-            for item in self.outfittings
-            if input_text.lower().strip() in item.display_name.lower()
-        ]
+        return self.catalog.typeahead.search(input_text, limit, infix=True)
 
     def _find_outfitting_generate_request_body(
         self,
@@ -101,13 +168,13 @@ class OutfittingService:
 
         return body
 
-    def _map_spansh_stations_to_model(
+    async def _map_spansh_stations_to_model(
         self,
-        api_response: niquests.Response,
+        results: AsyncIterator[dict[str, Any]],
         min_landing_pad_size: StationLandingPadSize,
     ) -> list[StationWithOutfittingDetails]:
         res: list[StationWithOutfittingDetails] = []
-        for item in api_response.json()["results"]:
+        async for item in results:
             station_landing_pad_size = get_station_max_landing_pad_size(item)
 
             if station_landing_pad_size > min_landing_pad_size:
@@ -118,7 +185,9 @@ class OutfittingService:
                     distance_from_reference_system=item["distance"],
                     distance_to_arrival=item["distance_to_arrival"],
                     is_planetary=item["is_planetary"],
-                    last_outfitting_update=parse(item["outfitting_updated_at"])
+                    last_outfitting_update=parse_timestamp(
+                        item["outfitting_updated_at"]
+                    )
                     if item.get("outfitting_updated_at")
                     else None,  # type: ignore
                     max_landing_pad_size=station_landing_pad_size,
@@ -143,23 +212,15 @@ class OutfittingService:
     ) -> list[StationWithOutfittingDetails]:
         """Get stations buying or selling a specific outfitting near a reference system."""
         # Get the searched outfitting
-        outfitting = next(
-            (item for item in self.outfittings if item.display_name == outfitting_name),
-            None,
-        )
+        outfitting = self.catalog.by_display_name.get(outfitting_name)
         if outfitting is None:
             raise OutfittingNotFoundError(outfitting_name)
 
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.post(
-                    SPANSH_STATIONS_SEARCH_URL,
-                    json=self._find_outfitting_generate_request_body(
-                        reference_system, outfitting, max_age_days
-                    ),
-                )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
-
-        return self._map_spansh_stations_to_model(api_response, min_landing_pad_size)
+        results = iter_spansh_search_results(
+            SPANSH_STATIONS_SEARCH_URL,
+            self._find_outfitting_generate_request_body(
+                reference_system, outfitting, max_age_days
+            ),
+            omitted_fields=SPANSH_STATION_HEAVY_FIELDS,
+        )
+        return await self._map_spansh_stations_to_model(results, min_landing_pad_size)
@@ -1,14 +1,22 @@
+import functools
+
 import niquests
-from dateutil.parser import parse
 
 from app.constants import STATIC_PATH
-from app.helpers.niquests import get_async_niquests_session
+from app.helpers.niquests import get_shared_async_niquests_session
 from app.models.exceptions import ContentFetchingError
 from app.models.ships import ShipModel, StationSellingShip
 from app.models.stations import StationLandingPadSize
 from app.services.helpers.fleet_carriers import is_fleet_carrier
 from app.services.helpers.settlements import is_settlement
 from app.services.helpers.spansh import get_formatted_reference_system
+from app.services.helpers.timestamps import parse_timestamp
+from app.services.helpers.typeahead import TypeaheadIndex
+
+
+@functools.cache
+def _get_ships_typeahead_index() -> TypeaheadIndex:
+    return TypeaheadIndex(ShipModel.get_display_names())
 
 
 class ShipsService:
@@ -20,13 +28,11 @@ class ShipsService:
         """Get the static path to a ship picture."""
         return f"/{STATIC_PATH}/images/ships/{ship_model.values[1]}.png"
 
-    async def get_ships_typeahead(self, input_text: str) -> list[str]:
+    async def get_ships_typeahead(
+        self, input_text: str, limit: int | None = None
+    ) -> list[str]:
         """Get ships names for autocomplete."""
-        return [
-            item
-            for item in ShipModel.get_display_names()
-            if item.lower().startswith(input_text.lower())
-        ]
+        return _get_ships_typeahead_index().search(input_text, limit)
 
     async def get_station_selling_ship(
         self, reference_system: str, ship_model: ShipModel
@@ -35,23 +41,23 @@ class ShipsService:
 
         :raises ContentFetchingException: Unable to retrieve the articles
         """
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.post(
-                    self.SHIPS_SEARCH_ENDPOINT,
-                    json={
-                        "filters": {"ships": {"value": [ship_model.values[0]]}},
-                        "sort": [{"distance": {"direction": "asc"}}],
-                        "size": 15,
-                        "page": 0,
-                        "reference_system": get_formatted_reference_system(
-                            reference_system
-                        ),
-                    },
-                )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        session = get_shared_async_niquests_session(self.SHIPS_SEARCH_ENDPOINT)
+        try:
+            api_response = await session.post(
+                self.SHIPS_SEARCH_ENDPOINT,
+                json={
+                    "filters": {"ships": {"value": [ship_model.values[0]]}},
+                    "sort": [{"distance": {"direction": "asc"}}],
+                    "size": 15,
+                    "page": 0,
+                    "reference_system": get_formatted_reference_system(
+                        reference_system
+                    ),
+                },
+            )
+            api_response.raise_for_status()
+        except niquests.exceptions.RequestException as e:
+            raise ContentFetchingError() from e
 
         stations = api_response.json()["results"]
 
@@ -69,7 +75,7 @@ class ShipsService:
                     )
                 ),
                 name=item["name"],
-                shipyard_updated_at=parse(item["shipyard_updated_at"]),
+                shipyard_updated_at=parse_timestamp(item["shipyard_updated_at"]),
                 system_name=item["system_name"],
                 is_planetary=item["is_planetary"],
                 is_fleet_carrier=is_fleet_carrier(
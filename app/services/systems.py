@@ -1,37 +1,71 @@
+import asyncio
 import math
-from datetime import UTC, datetime
+from collections.abc import Collection
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
 import niquests
-from dateutil.parser import parse
 
 from app.constants import SPANSH_STATIONS_SEARCH_URL
-from app.helpers.niquests import get_async_niquests_session
-from app.models.exceptions import ContentFetchingError, SystemNotFoundError
-from app.models.stations import StationDetails
+from app.helpers.concurrency import gather_or_cancel, map_bounded
+from app.helpers.niquests import get_shared_async_niquests_session
+from app.models.exceptions import (
+    ContentFetchingError,
+    SystemNotFoundError,
+    SystemsIndexUnavailableError,
+)
+from app.models.stations import StationDetails, StationService
 from app.models.systems import (
+    NearbySystem,
     System,
     SystemDetails,
     SystemDetailsFaction,
     SystemFactionHistory,
     SystemFactionHistoryDetails,
     SystemsDistance,
+    SystemsDistanceMatrix,
 )
+from app.services.helpers.cache import AsyncCache, async_cached
 from app.services.helpers.fleet_carriers import is_fleet_carrier
 from app.services.helpers.settlements import is_settlement
 from app.services.helpers.spansh import (
+    SPANSH_STATION_HEAVY_FIELDS,
     SpanshStationService,
+    get_spansh_station_services,
     get_station_max_landing_pad_size,
-    station_has_service,
+    get_station_services,
+    iter_spansh_search_results,
 )
+from app.services.helpers.systems_index import SystemsIndex, get_systems_index
+from app.services.helpers.timestamps import parse_timestamp
+
+SPANSH_TYPEAHEAD_URL = "https://spansh.co.uk/api/systems"
+SYSTEMS_TYPEAHEAD_LIMIT = 20
+
+
+@async_cached(ttl=timedelta(minutes=5), cache=AsyncCache(max_entries=1024))
+async def _get_systems_typeahead_from_spansh(input_text: str) -> list[str]:
+    url = f"{SPANSH_TYPEAHEAD_URL}?q={input_text}"
+    session = get_shared_async_niquests_session(url)
+    try:
+        api_response = await session.get(url)
+        api_response.raise_for_status()
+    except niquests.exceptions.RequestException as e:
+        raise ContentFetchingError() from e
+
+    data = api_response.json()
+    if data is None:
+        data = []
+    return data
 
 
 class SystemsService:
     """Main class for the systems service."""
 
     MIN_LENGTH_FOR_TYPEHEAD = 3
-    SPANSH_TYPEAHEAD_URL = "https://spansh.co.uk/api/systems"
+    MAX_CONCURRENT_SYSTEMS_LOOKUPS = 5
     SPANSH_SYSTEMS_SEARCH_URL = "https://spansh.co.uk/api/systems/search"
+    EDSM_SYSTEM_URL = "https://www.edsm.net/api-v1/system"
     EDSM_SYSTEM_FACTIONS_URL = "https://www.edsm.net/api-system-v1/factions"
 
     async def get_systems_typeahead(self, input_text: str) -> list[str]:
@@ -43,28 +77,31 @@ class SystemsService:
         if len(input_text) < self.MIN_LENGTH_FOR_TYPEHEAD:
             return []
 
-        url = f"{self.SPANSH_TYPEAHEAD_URL}?q={input_text}"
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.get(url)
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        # First try the local index, then Spansh for systems missing from it
+        systems_index = get_systems_index()
+        if systems_index is not None:
+            names = systems_index.search_prefix(input_text, SYSTEMS_TYPEAHEAD_LIMIT)
+            if names:
+                return names
 
-        data = api_response.json()
-        if data is None:
-            data = []
-        return data
+        return await _get_systems_typeahead_from_spansh(input_text.strip().lower())
 
     async def _get_system(self, system_name: str) -> System:
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.get(
-                    f"https://www.edsm.net/api-v1/system?systemName={system_name}&showCoordinates=1&showPermit=1"
-                )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        # Coordinates never change, so use the local index if the system is in it
+        systems_index = get_systems_index()
+        if systems_index is not None:
+            system = systems_index.get_system(system_name)
+            if system is not None:
+                return system
+
+        session = get_shared_async_niquests_session(self.EDSM_SYSTEM_URL)
+        try:
+            api_response = await session.get(
+                f"{self.EDSM_SYSTEM_URL}?systemName={system_name}&showCoordinates=1&showPermit=1"
+            )
+            api_response.raise_for_status()
+        except niquests.exceptions.RequestException as e:
+            raise ContentFetchingError() from e
 
         json_content = api_response.json()
 
@@ -87,52 +124,127 @@ class SystemsService:
         :raises ContentFetchingException: Unable to retrieve the data
         :raises SystemNotFoundException: Unable to retrieve the system
         """
-        first_system = await self._get_system(first_system_name)
-        second_system = await self._get_system(second_system_name)
+        first_system, second_system = await gather_or_cancel(
+            self._get_system(first_system_name), self._get_system(second_system_name)
+        )
+
+        return SystemsDistance(
+            distance_in_ly=self._get_distance(first_system, second_system),
+            first_system=first_system,
+            second_system=second_system,
+        )
+
+    async def get_systems_distance_matrix(
+        self, systems_names: list[str]
+    ) -> SystemsDistanceMatrix:
+        """Get distances between each pair of the specified systems.
+
+        :raises ContentFetchingException: Unable to retrieve the data
+        :raises SystemNotFoundException: Unable to retrieve one of the systems
+        """
+        # Only lookup each system once even if specified multiple times
+        unique_names = list(dict.fromkeys(systems_names))
+        fetched_systems = await map_bounded(
+            self._get_system, unique_names, self.MAX_CONCURRENT_SYSTEMS_LOOKUPS
+        )
+        systems_by_name = dict(zip(unique_names, fetched_systems, strict=True))
+        systems = [systems_by_name[name] for name in systems_names]
+
+        return SystemsDistanceMatrix(
+            systems=systems,
+            distances_in_ly=[
+                [self._get_distance(first, second) for second in systems]
+                for first in systems
+            ],
+        )
 
+    def _get_distance(self, first_system: System, second_system: System) -> float:
         distance = math.dist(
             [first_system.x, first_system.y, first_system.z],
             [second_system.x, second_system.y, second_system.z],
         )
+        return round(distance, 2)
 
-        return SystemsDistance(
-            distance_in_ly=round(distance, 2),
-            first_system=first_system,
-            second_system=second_system,
+    def _get_local_system(self, system_name: str) -> tuple[SystemsIndex, System]:
+        """Get the local systems index and the specified system from it.
+
+        :raises SystemsIndexUnavailableError: The local systems index is not available
+        :raises SystemNotFoundException: Unable to retrieve the system
+        """
+        systems_index = get_systems_index()
+        if systems_index is None:
+            raise SystemsIndexUnavailableError()
+
+        system = systems_index.get_system(system_name)
+        if system is None:
+            raise SystemNotFoundError(system_name)
+        return systems_index, system
+
+    async def get_nearby_systems(
+        self, system_name: str, radius_in_ly: float, limit: int
+    ) -> list[NearbySystem]:
+        """Get the systems around a specified system, closest first.
+
+        :raises SystemsIndexUnavailableError: The local systems index is not available
+        :raises SystemNotFoundException: Unable to retrieve the system
+        """
+        systems_index, system = self._get_local_system(system_name)
+        return await asyncio.to_thread(
+            systems_index.get_systems_within, system, radius_in_ly, limit
         )
 
-    async def get_system_details(self, system_name: str) -> SystemDetails:
-        """Get system details.
+    async def get_nearest_populated_systems(
+        self, system_name: str, count: int
+    ) -> list[NearbySystem]:
+        """Get the populated systems closest to a specified system, closest first.
+
+        :raises SystemsIndexUnavailableError: The local systems index is not available
+        :raises SystemNotFoundException: Unable to retrieve the system
+        """
+        systems_index, system = self._get_local_system(system_name)
+        return await asyncio.to_thread(
+            systems_index.get_nearest_populated_systems, system, count
+        )
+
+    async def _get_spansh_system(self, system_name: str) -> dict[str, Any]:
+        """Get the raw system data from Spansh.
 
         :raises ContentFetchingException: Unable to retrieve the data
         :raises SystemNotFoundException: Unable to retrieve the system
         """
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.post(
-                    self.SPANSH_SYSTEMS_SEARCH_URL,
-                    json={
-                        "filters": {"name": {"value": system_name}},
-                        "sort": [],
-                        "size": 1,
-                        "page": 0,
-                    },
-                )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        session = get_shared_async_niquests_session(self.SPANSH_SYSTEMS_SEARCH_URL)
+        try:
+            api_response = await session.post(
+                self.SPANSH_SYSTEMS_SEARCH_URL,
+                json={
+                    "filters": {"name": {"value": system_name}},
+                    "sort": [],
+                    "size": 1,
+                    "page": 0,
+                },
+            )
+            api_response.raise_for_status()
+        except niquests.exceptions.RequestException as e:
+            raise ContentFetchingError() from e
 
         json_content = api_response.json()
 
         if json_content is None or len(json_content["results"]) == 0:
             raise SystemNotFoundError(system_name)
 
-        result = json_content["results"][0]
+        return json_content["results"][0]
 
-        try:
-            factions = await self.__get_systems_factions_details(system_name)
-        except ContentFetchingError:
-            factions = []
+    async def get_system_details(self, system_name: str) -> SystemDetails:
+        """Get system details.
+
+        :raises ContentFetchingException: Unable to retrieve the data
+        :raises SystemNotFoundException: Unable to retrieve the system
+        """
+        # Factions are optional, so fetch them alongside the system
+        result, factions = await gather_or_cancel(
+            self._get_spansh_system(system_name),
+            self._get_systems_factions_details_if_available(system_name),
+        )
 
         return SystemDetails(
             allegiance=result.get("allegiance"),
@@ -154,61 +266,68 @@ class SystemsService:
             factions=factions,
         )
 
-    async def get_system_stations(self, system_name: str) -> list[StationDetails]:
-        """Get system stations.
+    async def _get_system_stations_from_spansh(
+        self, system_name: str
+    ) -> list[dict[str, Any]]:
+        """Get the raw stations of the system from Spansh, without their heavy fields.
 
         :raises ContentFetchingException: Unable to retrieve the data
-        :raises SystemNotFoundException: Unable to retrieve the system
         """
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.post(
-                    SPANSH_STATIONS_SEARCH_URL,
-                    json={
-                        "filters": {"system_name": {"value": system_name}},
-                        "sort": [{"distance": {"direction": "asc"}}],
-                        "size": 200,
-                        "page": 0,
-                    },
-                )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        results = iter_spansh_search_results(
+            SPANSH_STATIONS_SEARCH_URL,
+            {
+                "filters": {"system_name": {"value": system_name}},
+                "sort": [{"distance": {"direction": "asc"}}],
+                "size": 200,
+                "page": 0,
+            },
+            omitted_fields=SPANSH_STATION_HEAVY_FIELDS,
+        )
+        return [item async for item in results]
 
-        # We need the system too
-        system = await self.get_system_details(system_name)
+    async def get_system_stations(
+        self, system_name: str, services: Collection[StationService] = ()
+    ) -> list[StationDetails]:
+        """Get system stations, only keeping the ones with all the given services.
 
-        # Check that the system has stations
-        json_content = api_response.json()
-        if json_content is None or len(json_content["results"]) == 0:
-            return []
+        :raises ContentFetchingException: Unable to retrieve the data
+        :raises SystemNotFoundException: Unable to retrieve the system
+        """
+        # We need the system too (only for the permit, so factions are not fetched)
+        spansh_stations, system = await gather_or_cancel(
+            self._get_system_stations_from_spansh(system_name),
+            self._get_spansh_system(system_name),
+        )
 
+        required_services = get_spansh_station_services(services)
         stations: list[StationDetails] = []
-        for item in json_content["results"]:
+        for item in spansh_stations:
             # Skip station if unknown type
             # This allows to skip settlements with low informations
             if "type" not in item:
                 continue
 
+            station_services = get_station_services(item)
+            if required_services not in station_services:
+                continue
+
             station_landing_pad_size = get_station_max_landing_pad_size(item)
             stations.append(
                 StationDetails(
                     distance_to_arrival=item["distance_to_arrival"],
-                    has_blackmarket=station_has_service(
-                        item, SpanshStationService.BLACK_MARKET
-                    ),
-                    has_docking=station_has_service(item, SpanshStationService.DOCK),
-                    has_market=item.get("has_market", False),
-                    has_missions=station_has_service(
-                        item, SpanshStationService.MISSIONS
+                    has_blackmarket=(
+                        SpanshStationService.BLACK_MARKET in station_services
                     ),
-                    has_outfitting=item.get("has_outfitting", False),
-                    has_restock=station_has_service(item, SpanshStationService.RESTOCK),
-                    has_refuel=station_has_service(item, SpanshStationService.REFUEL),
-                    has_repair=station_has_service(item, SpanshStationService.REPAIR),
-                    has_shipyard=item.get("has_shipyard", False),
-                    has_universal_cartographics=station_has_service(
-                        item, SpanshStationService.UNIVERSAL_CARTOGRAPHICS
+                    has_docking=SpanshStationService.DOCK in station_services,
+                    has_market=SpanshStationService.MARKET in station_services,
+                    has_missions=SpanshStationService.MISSIONS in station_services,
+                    has_outfitting=SpanshStationService.OUTFITTING in station_services,
+                    has_restock=SpanshStationService.RESTOCK in station_services,
+                    has_refuel=SpanshStationService.REFUEL in station_services,
+                    has_repair=SpanshStationService.REPAIR in station_services,
+                    has_shipyard=SpanshStationService.SHIPYARD in station_services,
+                    has_universal_cartographics=(
+                        SpanshStationService.UNIVERSAL_CARTOGRAPHICS in station_services
                     ),
                     is_fleet_carrier=is_fleet_carrier(
                         item.get("controlling_minor_faction")
@@ -216,42 +335,51 @@ class SystemsService:
                     is_planetary=item["is_planetary"],
                     is_settlement=is_settlement(item["type"]),
                     last_market_update=(
-                        parse(item["market_updated_at"])
+                        parse_timestamp(item["market_updated_at"])
                         if item.get("market_updated_at")
                         else None
                     ),
                     last_outfitting_update=(
-                        parse(item["outfitting_updated_at"])
+                        parse_timestamp(item["outfitting_updated_at"])
                         if item.get("outfitting_updated_at")
                         else None
                     ),
                     last_shipyard_update=(
-                        parse(item["shipyard_updated_at"])
+                        parse_timestamp(item["shipyard_updated_at"])
                         if item.get("shipyard_updated_at")
                         else None
                     ),
                     max_landing_pad_size=station_landing_pad_size,
                     name=item["name"],
                     system_name=item["system_name"],
-                    system_permit_required=system.permit_required,
+                    system_permit_required=system["needs_permit"],
                     type=item["type"],
                 )
             )
 
         return stations
 
+    async def _get_systems_factions_details_if_available(
+        self, system_name: str
+    ) -> list[SystemDetailsFaction]:
+        """Get system factions details, or an empty list if they cannot be fetched."""
+        try:
+            return await self.__get_systems_factions_details(system_name)
+        except ContentFetchingError:
+            return []
+
     async def __get_systems_factions_details(
         self, system_name: str
     ) -> list[SystemDetailsFaction]:
         """Get system factions details."""
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.get(
-                    f"{self.EDSM_SYSTEM_FACTIONS_URL}?systemName={system_name}"
-                )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        session = get_shared_async_niquests_session(self.EDSM_SYSTEM_FACTIONS_URL)
+        try:
+            api_response = await session.get(
+                f"{self.EDSM_SYSTEM_FACTIONS_URL}?systemName={system_name}"
+            )
+            api_response.raise_for_status()
+        except niquests.exceptions.RequestException as e:
+            raise ContentFetchingError() from e
 
         json_content = api_response.json()
 
@@ -319,14 +447,14 @@ class SystemsService:
         :raises ContentFetchingException: Unable to retrieve the data
         :raises SystemNotFoundException: Unable to retrieve the system
         """
-        async with get_async_niquests_session() as session:
-            try:
-                api_response = await session.get(
-                    f"https://www.edsm.net/api-system-v1/factions?systemName={system_name}&showHistory=1"
-                )
-                api_response.raise_for_status()
-            except niquests.exceptions.RequestException as e:
-                raise ContentFetchingError() from e
+        session = get_shared_async_niquests_session(self.EDSM_SYSTEM_FACTIONS_URL)
+        try:
+            api_response = await session.get(
+                f"{self.EDSM_SYSTEM_FACTIONS_URL}?systemName={system_name}&showHistory=1"
+            )
+            api_response.raise_for_status()
+        except niquests.exceptions.RequestException as e:
+            raise ContentFetchingError() from e
 
         json_content = api_response.json()
 
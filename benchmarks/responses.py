@@ -0,0 +1,226 @@
+"""Benchmark the serialization of large API responses.
+
+Compare the endpoints of /systems/{system_name}/stations and /commodities/prices
+(validation against the response_model, then serialization with the pydantic-core
+serializer of the response_model) with the same endpoints returning an
+UntypedJSONResponse, which skips the validation and serializes the models with
+pydantic_core.to_json(). Services return fixed data so that only the API overhead
+is measured.
+
+Since FastAPI serializes response models with pydantic-core, and the validation of
+dataclass instances does not rebuild them, the endpoints return models rather than
+a custom response class.
+
+Usage: python -m benchmarks.responses [--requests 200]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import time
+from collections.abc import Collection
+from typing import Any
+
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.responses import JSONResponse
+from loguru import logger
+from pydantic_core import to_json
+from starlette.types import ASGIApp, Message
+
+from app.models.commodities import Commodity, CommodityPrice, CommodityPricesSort
+from app.models.stations import StationDetails, StationLandingPadSize, StationService
+from app.routers import commodities, systems
+from app.routers.helpers.cache import response_cache
+from app.services.commodities import CommoditiesService
+from app.services.systems import SystemsService
+
+STATIONS_COUNT = 200
+COMMODITIES_COUNT = 400
+
+
+def get_stations() -> list[StationDetails]:
+    """Get stations like the ones of a large system."""
+    now = datetime.datetime.now(tz=datetime.UTC)
+    return [
+        StationDetails(
+            distance_to_arrival=index * 12.5,
+            has_blackmarket=index % 2 == 0,
+            has_docking=True,
+            has_market=True,
+            has_missions=True,
+            has_outfitting=index % 3 == 0,
+            has_refuel=True,
+            has_repair=True,
+            has_restock=True,
+            has_shipyard=index % 4 == 0,
+            has_universal_cartographics=True,
+            is_fleet_carrier=False,
+            is_planetary=index % 5 == 0,
+            is_settlement=False,
+            last_market_update=now,
+            last_outfitting_update=now,
+            last_shipyard_update=None,
+            max_landing_pad_size=StationLandingPadSize.LARGE,
+            name=f"Station {index}",
+            system_name="Shinrarta Dezhra",
+            system_permit_required=True,
+            type="Coriolis Starport",
+        )
+        for index in range(STATIONS_COUNT)
+    ]
+
+
+def get_commodities_prices() -> list[CommodityPrice]:
+    """Get prices for as many commodities as in the game."""
+    return [
+        CommodityPrice(
+            commodity=Commodity(
+                id=index,
+                name=f"Commodity {index}",
+                api_name=f"commodity{index}",
+                category="Metals",
+                is_rare=False,
+            ),
+            average_buy_price=index * 10,
+            average_sell_price=index * 11,
+            minimum_buy_price=index * 9,
+            maximum_sell_price=index * 12,
+        )
+        for index in range(COMMODITIES_COUNT)
+    ]
+
+
+class FakeSystemsService(SystemsService):
+    async def get_system_stations(
+        self, system_name: str, services: Collection[StationService] = ()
+    ) -> list[StationDetails]:
+        """Get fixed stations."""
+        return STATIONS
+
+
+class FakeCommoditiesService(CommoditiesService):
+    async def get_commodities_prices(
+        self,
+        filter: str | None,
+        category: str | None = None,
+        is_rare: bool | None = None,
+        sort: CommodityPricesSort | None = None,
+        descending: bool = False,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[CommodityPrice]:
+        """Get fixed prices."""
+        return PRICES
+
+
+STATIONS = get_stations()
+PRICES = get_commodities_prices()
+
+
+class UntypedJSONResponse(JSONResponse):
+    """JSON response serializing its content without the response_model."""
+
+    def render(self, content: Any) -> bytes:
+        """Serialize the content with the pydantic-core encoder."""
+        return to_json(content)
+
+
+# The same endpoints, returning an UntypedJSONResponse. Both versions are served by
+# the same application so that routing costs the same.
+untyped_router = APIRouter(prefix="/untyped")
+
+
+@untyped_router.get(
+    "/systems/{system_name}/stations", response_model=list[StationDetails]
+)
+async def get_system_stations(
+    system_name: str, systems_service: SystemsService = Depends()
+) -> UntypedJSONResponse:
+    """Get the stations of the system, without validation."""
+    return UntypedJSONResponse(await systems_service.get_system_stations(system_name))
+
+
+@untyped_router.get("/commodities/prices", response_model=list[CommodityPrice])
+async def get_commodities_prices(
+    filter: str | None = None, commodities_service: CommoditiesService = Depends()
+) -> UntypedJSONResponse:
+    """Get the commodities prices, without validation."""
+    return UntypedJSONResponse(await commodities_service.get_commodities_prices(filter))
+
+
+benchmark_app = FastAPI()
+benchmark_app.include_router(untyped_router)
+benchmark_app.include_router(systems.router)
+benchmark_app.include_router(commodities.router)
+benchmark_app.dependency_overrides[SystemsService] = FakeSystemsService
+benchmark_app.dependency_overrides[CommoditiesService] = FakeCommoditiesService
+
+
+async def request(application: ASGIApp, path: str) -> bytes:
+    """Send a GET request to the application, and get the response body."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    body = bytearray()
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await application(scope, receive, send)
+    return bytes(body)
+
+
+async def measure(application: ASGIApp, path: str, requests_count: int) -> float:
+    """Get the mean duration of a request in milliseconds."""
+    await request(application, path)
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        await request(application, path)
+    return (time.perf_counter() - start) * 1000 / requests_count
+
+
+async def run(requests_count: int) -> None:
+    """Run the benchmark and log the results."""
+    # Measure the serialization, not the response cache
+    response_cache.enabled = False
+    for path in ["/systems/Shinrarta Dezhra/stations", "/commodities/prices"]:
+        untyped_path = f"{untyped_router.prefix}{path}"
+        untyped_body = await request(benchmark_app, untyped_path)
+        if json.loads(untyped_body) != json.loads(await request(benchmark_app, path)):
+            logger.error(f"{path}: different responses")
+
+        response_model_duration = await measure(benchmark_app, path, requests_count)
+        untyped_duration = await measure(benchmark_app, untyped_path, requests_count)
+        logger.info(
+            f"{path}: response_model {response_model_duration:.2f} ms, "
+            f"UntypedJSONResponse {untyped_duration:.2f} ms "
+            f"({response_model_duration / untyped_duration:.2f}x)"
+        )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    arguments = parser.parse_args()
+    asyncio.run(run(arguments.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark the parsing of the timestamps of upstream APIs.
+
+Compare dateutil with parse_timestamp(), on distinct timestamps (first parsing) and
+on the same timestamps again (served by its cache), in the formats of Spansh,
+Frontier and Inara.
+
+Usage: python -m benchmarks.timestamps [--timestamps 1000]
+"""
+
+import argparse
+import datetime
+import time
+from collections.abc import Callable
+
+from dateutil.parser import parse
+from loguru import logger
+
+from app.services.helpers.timestamps import parse_timestamp
+
+TIMESTAMPS_FORMATS = {
+    "Spansh": "%Y-%m-%d %H:%M:%S+00",
+    "Frontier": "%Y-%m-%dT%H:%M:%S+00:00",
+    "Inara": "%Y-%m-%dT%H:%M:%SZ",
+}
+
+
+def get_timestamps(timestamp_format: str, count: int) -> list[str]:
+    """Get distinct timestamps, one minute apart."""
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+    return [
+        (start + datetime.timedelta(minutes=index)).strftime(timestamp_format)
+        for index in range(count)
+    ]
+
+
+def measure(function: Callable[[str], datetime.datetime], values: list[str]) -> float:
+    """Get the mean duration of a call in microseconds."""
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return (time.perf_counter() - start) * 1_000_000 / len(values)
+
+
+def main() -> None:
+    """Run the benchmark and log the results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timestamps", type=int, default=1000)
+    arguments = parser.parse_args()
+
+    for name, timestamp_format in TIMESTAMPS_FORMATS.items():
+        timestamps = get_timestamps(timestamp_format, arguments.timestamps)
+        if any(parse(value) != parse_timestamp(value) for value in timestamps):
+            logger.error(f"{name}: different timestamps")
+
+        parse_timestamp.cache_clear()
+        dateutil_duration = measure(parse, timestamps)
+        first_duration = measure(parse_timestamp, timestamps)
+        cached_duration = measure(parse_timestamp, timestamps)
+        logger.info(
+            f"{name}: dateutil {dateutil_duration:.2f} us, "
+            f"parse_timestamp {first_duration:.2f} us "
+            f"({dateutil_duration / first_duration:.0f}x), "
+            f"cached {cached_duration:.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,35 @@
 #!/usr/bin/env python
 
+import asyncio
+from collections.abc import Coroutine
+from pathlib import Path
+from typing import Any
+
 import typer
 
+from app.helpers.niquests import close_shared_async_niquests_sessions
+from app.models.language import Language
 from app.services.community_goals import CommunityGoalsService
+from app.services.galnet import GalnetService
+from app.services.helpers.market_snapshot import build_market_snapshot
+from app.services.helpers.systems_index import build_systems_index
+from app.services.news import NewsService
 
 cli_app = typer.Typer()
 
 
+def _run_async(coroutine: Coroutine[Any, Any, None]) -> None:
+    """Run a coroutine, then release the upstream connections it used."""
+
+    async def run() -> None:
+        try:
+            await coroutine
+        finally:
+            await close_shared_async_niquests_sessions()
+
+    asyncio.run(run())
+
+
 @cli_app.callback()
 def main() -> None:
     """Initialize the CLI."""
@@ -17,7 +40,55 @@ def main() -> None:
 def community_goals_notifications() -> None:
     """Send FCM notifications for community goals state change."""
     community_goals_service = CommunityGoalsService()
-    community_goals_service.send_notifications()
+    _run_async(community_goals_service.send_notifications())
+
+
+@cli_app.command()
+def galnet_sync(languages: list[Language] | None = None) -> None:
+    """Store the Galnet articles published since the last sync (all languages by default)."""
+    galnet_service = GalnetService()
+
+    async def sync() -> None:
+        for language in languages or list(Language):
+            synced_count = await galnet_service.sync_articles(language)
+            typer.echo(f"{synced_count} articles synced for {language.value}")
+
+    _run_async(sync())
+
+
+@cli_app.command()
+def news_sync(languages: list[Language] | None = None) -> None:
+    """Store the latest news articles, for search (all languages by default)."""
+    news_service = NewsService()
+
+    async def sync() -> None:
+        for language in languages or list(Language):
+            synced_count = await news_service.sync_articles(language)
+            typer.echo(f"{synced_count} articles synced for {language.value}")
+
+    _run_async(sync())
+
+
+@cli_app.command()
+def build_systems_index_file(dump_path: Path, output_path: Path) -> None:
+    """Build the local systems index (see SYSTEMS_INDEX_PATH) from a systems dump.
+
+    Works with the EDSM and Spansh systems JSON dumps, gzipped or not.
+    """
+    systems_count = build_systems_index(dump_path, output_path)
+    typer.echo(f"{systems_count} systems written to {output_path}")
+
+
+@cli_app.command()
+def build_market_snapshot_file(dump_path: Path, output_path: Path) -> None:
+    """Build the local market snapshot (see MARKET_SNAPSHOT_PATH) from a stations dump.
+
+    Works with the Spansh galaxy stations JSON dump, gzipped or not. Run it again
+    with a newer dump to refresh the snapshot: the file is replaced atomically and
+    reloaded by the API.
+    """
+    stations_count = build_market_snapshot(dump_path, output_path)
+    typer.echo(f"{stations_count} stations written to {output_path}")
 
 
 if __name__ == "__main__":
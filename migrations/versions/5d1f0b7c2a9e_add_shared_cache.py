@@ -0,0 +1,40 @@
+"""Add shared cache
+
+Revision ID: 5d1f0b7c2a9e
+Revises: 1becfd037193
+Create Date: 2026-10-18 10:12:41.503118
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d1f0b7c2a9e"
+down_revision = "1becfd037193"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "cached_value",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("value", sa.LargeBinary(), nullable=False),
+        sa.Column("stored_at", sa.Float(), nullable=False),
+        sa.Column("ttl", sa.Float(), nullable=False),
+        sa.Column("stale_ttl", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+    op.create_table(
+        "cache_lease",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("owner", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def downgrade():
+    op.drop_table("cache_lease")
+    op.drop_table("cached_value")
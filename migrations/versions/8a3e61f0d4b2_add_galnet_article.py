@@ -0,0 +1,40 @@
+"""Add galnet article
+
+Revision ID: 8a3e61f0d4b2
+Revises: 5d1f0b7c2a9e
+Create Date: 2026-10-18 16:02:17.281904
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8a3e61f0d4b2"
+down_revision = "5d1f0b7c2a9e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "galnet_article",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("language", sa.String(), nullable=False),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("slug", sa.Text(), nullable=False),
+        sa.Column("picture_name", sa.Text(), nullable=True),
+        sa.Column("published_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id", "language"),
+    )
+    op.create_index(
+        "ix_galnet_article_language_published_at",
+        "galnet_article",
+        ["language", "published_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_galnet_article_language_published_at", "galnet_article")
+    op.drop_table("galnet_article")
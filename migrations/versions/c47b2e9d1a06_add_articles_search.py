@@ -0,0 +1,83 @@
+"""Add articles search
+
+Revision ID: c47b2e9d1a06
+Revises: 8a3e61f0d4b2
+Create Date: 2026-10-18 16:41:05.118342
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c47b2e9d1a06"
+down_revision = "8a3e61f0d4b2"
+branch_labels = None
+depends_on = None
+
+SEARCHABLE_TABLES = ["galnet_article", "news_article"]
+
+
+def _create_full_text_index(table: str) -> None:
+    # Names are the constants above, not user input
+    fts_table = f"{table}_fts"
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts_table} USING fts5(title, content, "
+        f"content='{table}', content_rowid='rowid', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts_table}_insert AFTER INSERT ON {table} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}(rowid, title, content) "
+        "VALUES (new.rowid, new.title, new.content); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts_table}_delete AFTER DELETE ON {table} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}({fts_table}, rowid, title, content) "
+        "VALUES ('delete', old.rowid, old.title, old.content); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts_table}_update AFTER UPDATE ON {table} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}({fts_table}, rowid, title, content) "
+        "VALUES ('delete', old.rowid, old.title, old.content); "
+        f"INSERT INTO {fts_table}(rowid, title, content) "
+        "VALUES (new.rowid, new.title, new.content); END"
+    )
+
+    # Index the articles already stored
+    op.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")  # noqa: S608
+
+
+def upgrade():
+    op.create_table(
+        "news_article",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("language", sa.String(), nullable=False),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("slug", sa.Text(), nullable=False),
+        sa.Column("picture", sa.Text(), nullable=True),
+        sa.Column("published_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id", "language"),
+    )
+    op.create_index(
+        "ix_news_article_language_published_at",
+        "news_article",
+        ["language", "published_at"],
+    )
+
+    # Full-text search is only available on SQLite, other databases use LIKE
+    if op.get_bind().dialect.name == "sqlite":
+        for table in SEARCHABLE_TABLES:
+            _create_full_text_index(table)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        for table in SEARCHABLE_TABLES:
+            for trigger in ("insert", "delete", "update"):
+                op.execute(f"DROP TRIGGER {table}_fts_{trigger}")
+            op.execute(f"DROP TABLE {table}_fts")
+
+    op.drop_index("ix_news_article_language_published_at", "news_article")
+    op.drop_table("news_article")
@@ -0,0 +1,200 @@
+"""Add articles search id
+
+Revision ID: e9b4d27c3f18
+Revises: c47b2e9d1a06
+Create Date: 2026-10-18 18:20:47.530916
+
+"""
+
+from html.parser import HTMLParser
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e9b4d27c3f18"
+down_revision = "c47b2e9d1a06"
+branch_labels = None
+depends_on = None
+
+# Searchable tables, with the name of their picture column
+SEARCHABLE_TABLES = {"galnet_article": "picture_name", "news_article": "picture"}
+
+# Text extraction of app.helpers.html_text when this migration was written, copied so
+# that the migration does not change with the app
+IGNORED_TAGS = {"script", "style", "template"}
+INLINE_TAGS = {
+    "a",
+    "abbr",
+    "b",
+    "code",
+    "em",
+    "i",
+    "mark",
+    "s",
+    "small",
+    "span",
+    "strong",
+    "sub",
+    "sup",
+    "u",
+}
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._ignored_depth = 0
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in IGNORED_TAGS:
+            self._ignored_depth += 1
+        if tag not in INLINE_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in IGNORED_TAGS and self._ignored_depth:
+            self._ignored_depth -= 1
+        if tag not in INLINE_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data: str) -> None:
+        if not self._ignored_depth:
+            self.parts.append(data)
+
+
+def _get_text_from_html(value: str) -> str:
+    extractor = _TextExtractor()
+    extractor.feed(value)
+    extractor.close()
+    return " ".join("".join(extractor.parts).split())
+
+
+def _get_table_columns(picture_column: str) -> list[sa.Column]:
+    """Get the columns common to the old and new tables."""
+    return [
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("language", sa.String(), nullable=False),
+        sa.Column("title", sa.Text(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("slug", sa.Text(), nullable=False),
+        sa.Column(picture_column, sa.Text(), nullable=True),
+        sa.Column("published_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def _create_full_text_index(table: str, rowid_column: str, content_column: str) -> None:
+    # Names are the constants above, not user input
+    fts_table = f"{table}_fts"
+    op.execute(
+        f"CREATE VIRTUAL TABLE {fts_table} USING fts5(title, {content_column}, "
+        f"content='{table}', content_rowid='{rowid_column}', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts_table}_insert AFTER INSERT ON {table} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}(rowid, title, {content_column}) "
+        f"VALUES (new.{rowid_column}, new.title, new.{content_column}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts_table}_delete AFTER DELETE ON {table} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}({fts_table}, rowid, title, {content_column}) "
+        f"VALUES ('delete', old.{rowid_column}, old.title, old.{content_column}); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER {fts_table}_update AFTER UPDATE ON {table} BEGIN "  # noqa: S608
+        f"INSERT INTO {fts_table}({fts_table}, rowid, title, {content_column}) "
+        f"VALUES ('delete', old.{rowid_column}, old.title, old.{content_column}); "
+        f"INSERT INTO {fts_table}(rowid, title, {content_column}) "
+        f"VALUES (new.{rowid_column}, new.title, new.{content_column}); END"
+    )
+
+    # Index the articles already stored
+    op.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")  # noqa: S608
+
+
+def _drop_full_text_index(table: str) -> None:
+    for trigger in ("insert", "delete", "update"):
+        op.execute(f"DROP TRIGGER {table}_fts_{trigger}")
+    op.execute(f"DROP TABLE {table}_fts")
+
+
+def _replace_table(table: str, new_table: sa.Table, picture_column: str) -> None:
+    """Replace the table by the new one (named {table}_new), with the same rows.
+
+    The primary key of a table cannot be changed in place on SQLite.
+    """
+    columns = ", ".join(column.name for column in _get_table_columns(picture_column))
+    # Oldest articles first, so that new ids follow the publication order
+    op.execute(
+        f"INSERT INTO {new_table.name}({columns}) "  # noqa: S608
+        f"SELECT {columns} FROM {table} ORDER BY published_at"
+    )
+
+    op.drop_index(f"ix_{table}_language_published_at", table)
+    op.drop_table(table)
+    op.rename_table(new_table.name, table)
+    op.create_index(
+        f"ix_{table}_language_published_at", table, ["language", "published_at"]
+    )
+
+
+def upgrade():
+    is_sqlite = op.get_bind().dialect.name == "sqlite"
+    for table, picture_column in SEARCHABLE_TABLES.items():
+        if is_sqlite:
+            _drop_full_text_index(table)
+
+        new_table = op.create_table(
+            f"{table}_new",
+            sa.Column("search_id", sa.Integer(), nullable=False),
+            *_get_table_columns(picture_column),
+            # Filled below, once the rows are copied
+            sa.Column("plain_content", sa.Text(), nullable=False, server_default=""),
+            sa.PrimaryKeyConstraint("search_id"),
+            sa.UniqueConstraint("id", "language", name=f"uq_{table}_id_language"),
+        )
+        _replace_table(table, new_table, picture_column)
+
+        bind = op.get_bind()
+        articles = sa.table(
+            table,
+            sa.column("search_id"),
+            sa.column("content"),
+            sa.column("plain_content"),
+        )
+        rows = bind.execute(sa.select(articles.c.search_id, articles.c.content)).all()
+        if rows:
+            bind.execute(
+                articles.update()
+                .where(articles.c.search_id == sa.bindparam("row_search_id"))
+                .values(plain_content=sa.bindparam("row_plain_content")),
+                [
+                    {
+                        "row_search_id": search_id,
+                        "row_plain_content": _get_text_from_html(content),
+                    }
+                    for search_id, content in rows
+                ],
+            )
+
+        if is_sqlite:
+            _create_full_text_index(table, "search_id", "plain_content")
+
+
+def downgrade():
+    is_sqlite = op.get_bind().dialect.name == "sqlite"
+    for table, picture_column in SEARCHABLE_TABLES.items():
+        if is_sqlite:
+            _drop_full_text_index(table)
+
+        new_table = op.create_table(
+            f"{table}_new",
+            *_get_table_columns(picture_column),
+            sa.PrimaryKeyConstraint("id", "language"),
+        )
+        _replace_table(table, new_table, picture_column)
+
+        if is_sqlite:
+            _create_full_text_index(table, "rowid", "content")